@@ -0,0 +1,23 @@
+"""Put the flat tools/ modules on the import path, as running a tool from tools/ does, and build test ROMs."""
+
+import os
+import sys
+
+TOOLS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools")
+sys.path.insert(0, TOOLS_DIR)
+
+import pytest  # noqa: E402
+
+from assembler import assemble_file  # noqa: E402
+
+
+@pytest.fixture
+def build_rom(tmp_path):
+    """Return a function assembling source text into a ROM file in tmp_path and returning its path."""
+    def build(source: str, name: str = "program") -> str:
+        source_file = tmp_path / f"{name}.asm"
+        source_file.write_text(source, encoding='utf-8')
+        rom = str(tmp_path / f"{name}.bin")
+        assemble_file(str(source_file), rom)
+        return rom
+    return build
@@ -0,0 +1,91 @@
+"""Round trips of assembly source through the assembler and the disassembler."""
+
+import os
+
+import pytest
+
+from assembler import Assembler, AssemblyError, assemble_file
+from disassembler import write_disassembly
+from linker import ENTRY_JUMP
+from memory_map import CODE_SEGMENT_START
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples")
+
+# Entry label after the first instruction, forward and backward branches, and a self-modifying store
+BRANCHING_SOURCE = """\
+section meta
+@meta version: 1.0
+@meta entry: start
+
+section data
+@real count: 100
+@array table: 1, 2, 3
+
+section code
+helper:
+    ret
+start:
+    mov #0, %R0
+    mov [table], %R2
+loop:
+    call outer
+    mov [loop], %R1
+    mov %R1, [loop]
+    add %R0, 1
+    cmp %R0, count
+    jl loop
+    hlt
+outer:
+    call helper
+    ret
+"""
+
+
+def _round_trip(source_file: str, work_dir: str) -> None:
+    """Assemble a source, disassemble the ROM and reassemble the disassembly; both ROMs must match."""
+    rom = os.path.join(work_dir, "first.bin")
+    disassembly = os.path.join(work_dir, "first.asm")
+    again = os.path.join(work_dir, "second.bin")
+
+    assemble_file(source_file, rom)
+    write_disassembly(rom, disassembly)
+    assemble_file(disassembly, again)
+
+    with open(rom, 'rb') as first, open(again, 'rb') as second:
+        assert first.read() == second.read()
+
+
+def test_print_example_round_trips(tmp_path):
+    _round_trip(os.path.join(EXAMPLES_DIR, "print.asm"), str(tmp_path))
+
+
+def test_labels_reals_and_entry_jump_round_trip(tmp_path):
+    source = tmp_path / "branching.asm"
+    source.write_text(BRANCHING_SOURCE, encoding='utf-8')
+    _round_trip(str(source), str(tmp_path))
+
+
+def test_entry_jump_and_symbols(tmp_path):
+    source = tmp_path / "branching.asm"
+    source.write_text(BRANCHING_SOURCE, encoding='utf-8')
+    program = assemble_file(str(source), str(tmp_path / "branching.bin"))
+
+    # "ret" comes before the entry label, so execution starts with a jump to it
+    assert program.code[0] == ENTRY_JUMP
+    assert program.code[1] == program.entry == program.symbols["start"]
+    assert program.symbols["helper"] == CODE_SEGMENT_START + 2
+
+    # A @real name is its value; its data word still holds that value
+    assert program.symbols["count"] == 100
+    assert list(program.data) == [100, 1, 2, 3]
+
+
+@pytest.mark.parametrize("version", ["1", "1.0", "1.0.0", "0.9"])
+def test_supported_versions(version):
+    Assembler().assemble(f"section meta\n@meta version: {version}\n\nsection code\n    hlt\n")
+
+
+@pytest.mark.parametrize("version", ["1.1", "1.0.1", "2"])
+def test_newer_versions_are_rejected(version):
+    with pytest.raises(AssemblyError, match="newer than this assembler supports"):
+        Assembler().assemble(f"section meta\n@meta version: {version}\n\nsection code\n    hlt\n")
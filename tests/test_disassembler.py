@@ -0,0 +1,74 @@
+"""Disassembly paths: the in-memory writer, the streaming writer and the output cache agree."""
+
+import os
+import shutil
+
+import pytest
+
+from assembler import assemble_file
+from disassembler import (
+    STREAM_CHUNK_WORDS, VERSION, cached_disassembly, create_dummy_rom, disassemble_rom, disassemble_rom_stream, write_disassembly,
+    write_disassembly_stream,
+)
+from output_cache import OutputCache
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples")
+
+
+@pytest.fixture(params=["print example", "small dummy", "multi-chunk dummy"])
+def rom(request, tmp_path):
+    path = str(tmp_path / "rom.bin")
+    if request.param == "print example":
+        assemble_file(os.path.join(EXAMPLES_DIR, "print.asm"), path)
+    elif request.param == "small dummy":
+        create_dummy_rom(path, 200, seed=1)
+    else:
+        # More words than one stream chunk, and more lines than one stream flush
+        create_dummy_rom(path, 25000, seed=2)
+        assert os.path.getsize(path) > STREAM_CHUNK_WORDS * 8
+    return path
+
+
+def _read(path: str) -> str:
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def test_stream_matches_in_memory(rom, tmp_path):
+    plain, stream = str(tmp_path / "plain.asm"), str(tmp_path / "stream.asm")
+    assert write_disassembly(rom, plain) == write_disassembly_stream(rom, stream) > 0
+    assert _read(plain) == _read(stream)
+
+
+@pytest.mark.parametrize("writer", [write_disassembly, write_disassembly_stream])
+def test_cache_hits_match_a_fresh_disassembly(rom, tmp_path, writer):
+    expected = str(tmp_path / "expected.asm")
+    write_disassembly(rom, expected)
+    cache = OutputCache(VERSION, str(tmp_path / "cache"))
+
+    miss, hit = str(tmp_path / "miss.asm"), str(tmp_path / "hit.asm")
+    assert cached_disassembly(writer, rom, miss, cache) > 0
+    assert cached_disassembly(writer, rom, hit, cache) == 0
+    assert cache.hits == 1
+    assert _read(miss) == _read(hit) == _read(expected)
+
+    # A copy of the ROM at another path hits the same entry, titled with its own path
+    copy = str(tmp_path / "copy.bin")
+    shutil.copyfile(rom, copy)
+    from_copy, fresh = str(tmp_path / "from_copy.asm"), str(tmp_path / "fresh.asm")
+    assert cached_disassembly(writer, copy, from_copy, cache) == 0
+    write_disassembly(copy, fresh)
+    assert _read(from_copy) == _read(fresh)
+
+
+def test_command_line_paths_agree(rom, tmp_path, capsys):
+    cache = OutputCache(VERSION, str(tmp_path / "cache"))
+    outputs = [str(tmp_path / f"{name}.asm") for name in ("plain", "stream", "cached", "cached_stream")]
+
+    disassemble_rom(rom, outputs[0])
+    disassemble_rom_stream(rom, outputs[1])
+    disassemble_rom(rom, outputs[2], cache)
+    disassemble_rom_stream(rom, outputs[3], cache)
+
+    assert "Disassembly written to" in capsys.readouterr().out
+    assert len({_read(output) for output in outputs}) == 1
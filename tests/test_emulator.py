@@ -0,0 +1,107 @@
+"""The interpreter: arithmetic fast paths, run budgets and instruction counts around faults."""
+
+import random
+
+import pytest
+
+from disassembler import encode_instruction
+from emulator import BINARY_OPERATIONS, FLAGS, IMM, PC, REG, SIGN_BIT, WORD_MASK, Machine
+from memory import MemoryFault
+from memory_map import CODE_SEGMENT_START
+from opcode_table import opcode_to_binary
+
+# Values on either side of the sign and carry boundaries
+EDGE_VALUES = [0, 1, 2, SIGN_BIT - 1, SIGN_BIT, SIGN_BIT + 1, WORD_MASK - 1, WORD_MASK]
+
+LOOP_SOURCE = """\
+section code
+main:
+    mov #0, %R0
+    mov #3, %R1
+    mov #0, %R2
+loop:
+    add %R2, %R1
+    add %R0, #1
+    cmp %R0, #1000
+    jl loop
+    hlt
+"""
+
+# Three instructions, then a store outside memory
+FAULT_SOURCE = """\
+section code
+main:
+    nop
+    add %R0, #1
+    nop
+    mov 1, [0x7FFFFFFFFF]
+    hlt
+"""
+
+
+@pytest.mark.parametrize("name, mode", [("add", IMM), ("add", REG), ("sub", IMM), ("sub", REG),
+                                        ("cmp", IMM), ("cmp", REG)])
+def test_fast_paths_match_operations(name, mode):
+    machine = Machine()
+    regs = machine.regs
+    rng = random.Random(name + str(mode))
+
+    # cmp sets the flags of a subtraction and keeps its first operand
+    operation = BINARY_OPERATIONS["sub" if name == "cmp" else name]
+
+    for _ in range(5000):
+        a = rng.choice(EDGE_VALUES + [rng.getrandbits(64), rng.getrandbits(62)])
+        b = rng.choice(EDGE_VALUES + [rng.getrandbits(64), rng.getrandbits(62), a])
+        flags = rng.getrandbits(8)
+
+        operand = 1 if mode == REG else b
+        handler = machine.build_handler(0, encode_instruction(opcode_to_binary(name), [REG, mode]), [0, operand])
+        regs[0], regs[1], regs[FLAGS] = a, b, flags
+        assert handler() == 3
+
+        result, result_flags = operation(a, b)
+        assert regs[0] == (a if name == "cmp" else result)
+        assert regs[FLAGS] == (flags & ~0xF) | result_flags
+
+
+def test_loop_runs_to_hlt(build_rom):
+    machine = Machine()
+    machine.load_rom(build_rom(LOOP_SOURCE))
+
+    assert machine.run() == 3 + 4 * 1000 + 1
+    assert machine.halted
+    assert machine.regs[0] == 1000
+    assert machine.regs[2] == 3000
+
+
+def test_run_keeps_to_its_budget(build_rom):
+    machine = Machine()
+    machine.load_rom(build_rom(LOOP_SOURCE))
+
+    for budget in (1, 7, 100, 1000):
+        assert machine.run(budget) == budget
+    assert machine.run() == 3 + 4 * 1000 + 1 - 1108
+    assert machine.instructions == 3 + 4 * 1000 + 1
+
+
+def test_fault_counts_completed_instructions(build_rom):
+    machine = Machine()
+    machine.load_rom(build_rom(FAULT_SOURCE))
+
+    with pytest.raises(MemoryFault):
+        machine.run()
+    assert machine.instructions == 3
+    assert not machine.halted
+
+    # PC is left on the faulting instruction, after nop, add with two operands, nop
+    assert machine.regs[PC] == CODE_SEGMENT_START + 5
+
+
+def test_fault_after_a_partial_budget(build_rom):
+    machine = Machine()
+    machine.load_rom(build_rom(FAULT_SOURCE))
+
+    assert machine.run(2) == 2
+    with pytest.raises(MemoryFault):
+        machine.run(10)
+    assert machine.instructions == 3
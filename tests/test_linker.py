@@ -0,0 +1,88 @@
+"""Linking objects: section placement, cross-file relocations and symbol errors."""
+
+import pytest
+
+from assembler import Assembler
+from linker import ENTRY_JUMP, ENTRY_JUMP_WORDS, LinkError, link_objects
+from memory_map import CODE_SEGMENT_START, DATA_SEGMENT_START
+
+MAIN_SOURCE = """\
+section meta
+@meta entry: main
+
+section data
+@real limit: 3
+
+section code
+done:
+    hlt
+main:
+    mov #0, %R0
+    mov [table], %R1
+    call helper
+    jmp done
+"""
+
+HELPER_SOURCE = """\
+section data
+@array table: 7, 8, 9
+@real step: limit
+
+section code
+helper:
+    add %R0, step
+    ret
+"""
+
+
+def _objects(*sources: str):
+    return [Assembler().assemble_object(source, f"file{index}.asm") for index, source in enumerate(sources)]
+
+
+def test_relocations_resolve_across_objects():
+    main, helper = _objects(MAIN_SOURCE, HELPER_SOURCE)
+
+    # Every reference to another file's symbol is left to the linker
+    assert {relocation.symbol for relocation in main.relocations} == {"table", "helper", "done"}
+    assert {relocation.symbol for relocation in helper.relocations} == {"limit", "step"}
+
+    program = link_objects([main, helper])
+    code_base = CODE_SEGMENT_START + ENTRY_JUMP_WORDS
+
+    # Sections are concatenated in link order, after the entry jump
+    assert program.symbols["done"] == code_base
+    assert program.symbols["main"] == program.entry == code_base + 1
+    assert program.symbols["helper"] == code_base + len(main.code)
+    assert program.symbols["table"] == DATA_SEGMENT_START + len(main.data)
+    assert program.symbols["step"] == program.symbols["limit"] == 3
+    assert program.code[:ENTRY_JUMP_WORDS].tolist() == [ENTRY_JUMP, program.entry]
+
+    # Each relocated word holds its symbol's value
+    for obj, code_offset, data_offset in ((main, ENTRY_JUMP_WORDS, 0), (helper, ENTRY_JUMP_WORDS + len(main.code),
+                                                                         len(main.data))):
+        for relocation in obj.relocations:
+            if relocation.section == "code":
+                word = program.code[code_offset + relocation.index]
+            else:
+                word = program.data[data_offset + relocation.index]
+            assert word == program.symbols[relocation.symbol]
+
+
+def test_link_order_moves_symbols():
+    helper, main = _objects(HELPER_SOURCE, MAIN_SOURCE)
+    program = link_objects([helper, main])
+
+    assert program.symbols["helper"] == CODE_SEGMENT_START + ENTRY_JUMP_WORDS
+    assert program.symbols["table"] == DATA_SEGMENT_START
+    table = next(relocation for relocation in main.relocations if relocation.symbol == "table")
+    assert program.code[ENTRY_JUMP_WORDS + len(helper.code) + table.index] == program.symbols["table"]
+
+
+def test_undefined_symbol():
+    with pytest.raises(LinkError, match="undefined symbol 'helper'"):
+        link_objects(_objects(MAIN_SOURCE.replace("mov [table], %R1", "nop")))
+
+
+def test_duplicate_symbol():
+    with pytest.raises(LinkError, match="'table' is already defined"):
+        link_objects(_objects(MAIN_SOURCE, HELPER_SOURCE, HELPER_SOURCE.replace("helper:", "other:")))
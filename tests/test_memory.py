@@ -0,0 +1,63 @@
+"""The paged memory model: lazy pages, faults and block copies across page boundaries."""
+
+import random
+
+import pytest
+
+from memory import PAGE_WORDS, DictMemory, MemoryFault, PagedMemory
+from memory_map import DATA_SEGMENT_START, MEMORY_MAP
+
+
+def test_unwritten_words_read_zero_without_allocating():
+    memory = PagedMemory()
+    assert memory.read(DATA_SEGMENT_START) == 0
+    assert memory.read(memory.size - 1) == 0
+    assert memory.resident_bytes == 0
+
+
+def test_write_allocates_one_page_and_masks_to_a_word():
+    memory = PagedMemory()
+    memory.write(DATA_SEGMENT_START + 5, (1 << 64) + 7)
+    assert memory.read(DATA_SEGMENT_START + 5) == 7
+    assert memory.resident_bytes == PAGE_WORDS * 8
+
+
+@pytest.mark.parametrize("address", [-1, PagedMemory().size, 1 << 40])
+def test_accesses_outside_memory_fault(address):
+    memory = PagedMemory()
+    with pytest.raises(MemoryFault):
+        memory.read(address)
+    with pytest.raises(MemoryFault):
+        memory.write(address, 1)
+
+
+def test_blocks_cross_page_boundaries():
+    memory = PagedMemory()
+    start = DATA_SEGMENT_START + PAGE_WORDS - 3
+    words = list(range(1, 11))
+    memory.load(start, words)
+
+    assert memory.read_block(start, len(words)).tolist() == words
+    assert memory.read(start + 9) == 10
+    assert memory.read_block(start - 2, 2).tolist() == [0, 0]
+
+
+def test_blocks_must_fit_in_one_region():
+    memory = PagedMemory()
+    end = MEMORY_MAP["DS"].end
+    with pytest.raises(MemoryFault, match="crosses the end"):
+        memory.load(end - 2, [1, 2, 3])
+    with pytest.raises(MemoryFault, match="crosses the end"):
+        memory.read_block(end - 2, 3)
+
+
+def test_paged_memory_matches_dict_memory():
+    paged, reference = PagedMemory(), DictMemory()
+    rng = random.Random(9)
+    addresses = [DATA_SEGMENT_START + rng.randrange(4 * PAGE_WORDS) for _ in range(200)]
+    for address in addresses:
+        value = rng.getrandbits(64)
+        paged.write(address, value)
+        reference.write(address, value)
+    for address in addresses + [DATA_SEGMENT_START + offset for offset in range(0, 4 * PAGE_WORDS, 97)]:
+        assert paged.read(address) == reference.read(address)
@@ -0,0 +1,81 @@
+"""Port I/O: input scripts, their replay timing and one-byte console reads from port 0x05."""
+
+import pytest
+
+from emulator import Machine
+from port_io import read_input_script, replay_input
+
+# Two setup instructions, then five per iteration, each starting with a read of port 0x01
+POLL_SOURCE = """\
+section code
+main:
+    mov #0, %R0
+    mov #0, %R2
+loop:
+    in 0x01, %R1
+    add %R2, %R1
+    add %R0, #1
+    cmp %R0, #40
+    jl loop
+    hlt
+"""
+
+CONSOLE_SOURCE = """\
+section code
+main:
+    in 0x05, %R0
+    in 0x05, %R1
+    in 0x05, %R2
+    in 0x05, %R3
+    hlt
+"""
+
+
+def _script(tmp_path, text: str):
+    path = tmp_path / "input.txt"
+    path.write_text(text, encoding='utf-8')
+    return read_input_script(str(path))
+
+
+def test_script_is_read_in_time_order(tmp_path):
+    script = _script(tmp_path, "# time port value\n30 0x01 7\n\n0x0A 5 0x41  # a character\n")
+    assert script.times.tolist() == [10, 30]
+    assert script.ports.tolist() == [5, 1]
+    assert script.values.tolist() == [0x41, 7]
+
+
+@pytest.mark.parametrize("text, message", [("10 0x06 1\n", "not an input port"), ("10 1\n", "expected")])
+def test_bad_script_lines(tmp_path, text, message):
+    with pytest.raises(ValueError, match=message):
+        _script(tmp_path, text)
+
+
+@pytest.mark.parametrize("at", [2 + 5 * 10, 2 + 5 * 10 + 1, 2 + 5 * 10 - 1])
+def test_writes_land_before_the_instruction_at_their_time(build_rom, tmp_path, at):
+    machine = Machine()
+    machine.load_rom(build_rom(POLL_SOURCE))
+    replay_input(machine, _script(tmp_path, f"{at} 0x01 3\n"), 10 ** 6)
+
+    # The in of iteration i runs once 2 + 5 * i instructions have executed
+    reads = sum(1 for iteration in range(40) if 2 + 5 * iteration >= at)
+    assert machine.halted
+    assert machine.regs[2] == 3 * reads
+
+
+def test_replay_stops_at_the_budget(build_rom, tmp_path):
+    machine = Machine()
+    machine.load_rom(build_rom(POLL_SOURCE))
+    replay_input(machine, _script(tmp_path, "20 0x01 3\n500 0x01 4\n"), 100)
+    assert machine.instructions == 100
+    assert machine.ports[0x01] == 3
+
+
+def test_console_input_is_read_one_byte_at_a_time(build_rom, tmp_path):
+    machine = Machine()
+    machine.load_rom(build_rom(CONSOLE_SOURCE))
+    machine.console_input += b"hi"
+
+    # A scripted write to port 0x05 is read once, ahead of the queued bytes
+    replay_input(machine, _script(tmp_path, "1 0x05 0x41\n"), 10 ** 6)
+    assert machine.regs[:4] == [ord("h"), 0x41, ord("i"), 0]
+    assert machine.ports[0x05] == 0
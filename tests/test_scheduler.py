@@ -0,0 +1,104 @@
+"""The event scheduler: timer re-arming after iret, empty IVT entries and host interrupts."""
+
+from emulator import SP, Machine
+from memory_map import DATA_SEGMENT_START, MEMORY_MAP
+from scheduler import EventScheduler
+
+PERIOD = 40
+
+# A timer handler that runs longer than the period
+TIMER_SOURCE = """\
+section data
+@array ticks: 0
+
+section code
+main:
+    mov timer, [0x0]
+    mov #0x0, %R0
+loop:
+    add %R0, #0x1
+    cmp %R0, #0x100
+    jl loop
+    hlt
+
+timer:
+    add [ticks], #0x1
+    mov #0x0, %R1
+spin:
+    add %R1, #0x1
+    cmp %R1, #0x20
+    jl spin
+    iret
+"""
+
+NO_HANDLER_SOURCE = """\
+section code
+main:
+    mov #0x0, %R0
+loop:
+    add %R0, #0x1
+    cmp %R0, #0x100
+    jl loop
+    hlt
+"""
+
+
+def test_timer_rearms_one_period_after_iret(build_rom):
+    machine = Machine()
+    machine.load_rom(build_rom(TIMER_SOURCE))
+    scheduler = EventScheduler(machine)
+    scheduler.set_timer(PERIOD)
+
+    # Step one instruction at a time, noting the pending deadline after each
+    steps = [(machine.instructions, scheduler.next_deadline())]
+    while not machine.halted:
+        scheduler.run(1)
+        steps.append((machine.instructions, scheduler.next_deadline()))
+
+    fired = []
+    armed = []
+    for (before, pending), (after, deadline) in zip(steps, steps[1:]):
+        if pending is not None and deadline is None:
+            fired.append((before, pending))
+        elif pending is None and deadline is not None:
+            armed.append((after, deadline))
+
+    # The handler outlasts the period, yet interrupts do not pile up: each is taken at its deadline
+    assert len(fired) == machine.memory.read(DATA_SEGMENT_START) > 2
+    assert all(before == deadline for before, deadline in fired)
+
+    # Every re-arm counts a full period from the iret that ended the handler
+    assert len(armed) == len(fired)
+    assert all(deadline == after + PERIOD for after, deadline in armed)
+
+
+def test_empty_ivt_entry_is_a_nop(build_rom):
+    rom = build_rom(NO_HANDLER_SOURCE)
+    plain = Machine()
+    plain.load_rom(rom)
+    plain.run()
+
+    machine = Machine()
+    machine.load_rom(rom)
+    scheduler = EventScheduler(machine)
+    scheduler.set_timer(PERIOD)
+    assert scheduler.run() == plain.instructions
+
+    # No frame was pushed, and the timer is still armed one period ahead
+    assert machine.regs == plain.regs
+    assert machine.regs[SP] == MEMORY_MAP["SS"].end
+    assert machine.instructions < scheduler.next_deadline() <= machine.instructions + PERIOD
+
+
+def test_host_interrupt_runs_after_its_delay(build_rom):
+    machine = Machine()
+    machine.load_rom(build_rom(TIMER_SOURCE))
+    scheduler = EventScheduler(machine)
+
+    # The handler address is stored by the first instruction, so raise the interrupt after it
+    scheduler.raise_interrupt(0, delay=10)
+    assert scheduler.run(10) == 10
+    assert machine.memory.read(DATA_SEGMENT_START) == 0
+    scheduler.run()
+    assert machine.memory.read(DATA_SEGMENT_START) == 1
+    assert machine.halted
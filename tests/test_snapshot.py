@@ -0,0 +1,99 @@
+"""Machine snapshots: restoring registers, ports, console and copy-on-write memory."""
+
+from emulator import Machine
+from memory import PAGE_WORDS, PagedMemory
+from memory_map import DATA_SEGMENT_START
+
+# Stores to data and a port every iteration, then console output and one byte of input
+PROGRAM_SOURCE = """\
+section data
+@array buf: 0, 0
+
+section code
+main:
+    mov #0, %R0
+loop:
+    add %R0, #1
+    mov %R0, [buf]
+    out %R0, 0x01
+    cmp %R0, #50
+    jl loop
+    out #0x4B4F, 0x04
+    in 0x05, %R3
+    hlt
+"""
+
+# Overwrites its own add with a nop once it has run
+SELF_MODIFYING_SOURCE = """\
+section code
+main:
+    add %R0, #1
+    mov [patch], %R1
+    mov %R1, [main]
+    mov #2, %R2
+    jmp main
+patch:
+    nop
+"""
+
+
+def _state(machine: Machine):
+    return (list(machine.regs), list(machine.ports), bytes(machine.console), bytes(machine.console_input),
+            machine.halted, machine.instructions, machine.memory.read(DATA_SEGMENT_START))
+
+
+def test_restore_replays_the_same_run(build_rom):
+    machine = Machine()
+    machine.load_rom(build_rom(PROGRAM_SOURCE))
+    machine.console_input += b"xy"
+
+    machine.run(60)
+    snapshot = machine.snapshot()
+    middle = _state(machine)
+
+    machine.run()
+    finished = _state(machine)
+    assert machine.halted and finished[3] == b"y"
+
+    # Any number of restores from one snapshot
+    for _ in range(2):
+        machine.restore(snapshot)
+        assert _state(machine) == middle
+        machine.run()
+        assert _state(machine) == finished
+
+
+def test_shared_pages_are_copied_on_write():
+    memory = PagedMemory()
+    address = DATA_SEGMENT_START + 3
+    memory.write(address, 1)
+    image = memory.snapshot()
+
+    # Reads use the image's page; a write copies it and leaves the image alone
+    assert memory.read(address) == 1
+    memory.write(address, 2)
+    memory.write(address + PAGE_WORDS, 3)
+    assert memory.read(address) == 2
+    assert image[address // PAGE_WORDS][address % PAGE_WORDS] == 1
+    assert memory.changed_words(image, DATA_SEGMENT_START, DATA_SEGMENT_START + 2 * PAGE_WORDS) == [
+        address, address + PAGE_WORDS]
+
+    memory.restore(image)
+    assert memory.read(address) == 1
+    assert memory.read(address + PAGE_WORDS) == 0
+    assert memory.changed_words(image, DATA_SEGMENT_START, DATA_SEGMENT_START + 2 * PAGE_WORDS) == []
+
+
+def test_restore_invalidates_rewritten_code(build_rom):
+    machine = Machine()
+    machine.load_rom(build_rom(SELF_MODIFYING_SOURCE))
+    snapshot = machine.snapshot()
+
+    # The second pass runs the nop written over the add
+    machine.run(9)
+    assert machine.regs[0] == 1
+
+    # Restored code is the add again, not the handler decoded from the nop
+    machine.restore(snapshot)
+    machine.run(1)
+    assert machine.regs[0] == 1
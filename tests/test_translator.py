@@ -0,0 +1,139 @@
+"""The translation tier against the interpreter: random loops, run budgets and faults inside blocks."""
+
+import random
+
+import pytest
+
+from emulator import Machine
+from memory import MemoryFault
+from memory_map import DATA_SEGMENT_START
+from translator import BlockTranslator
+
+# Registers the random bodies compute in; R5 holds the address of buf and R6 counts iterations
+WORK_REGISTERS = ["%R0", "%R1", "%R2", "%R3", "%R4"]
+BUF_WORDS = 4
+
+BINARY = ["add", "sub", "mul", "and", "or", "xor"]
+SHIFTS = ["shl", "shr", "rol", "ror"]
+UNARY = ["inc", "dec", "neg", "not", "bswap"]
+
+# Walks a pointer out of memory, over two blocks or in a self-loop
+FAULT_SOURCES = {
+    "two blocks": """\
+section code
+main:
+    mov #0x100000, %R1
+loop:
+    add %R0, #1
+    add %R1, #0x100000
+    mov %R0, [R1]
+    add %R2, #1
+    jmp next
+next:
+    jmp loop
+""",
+    "self-loop": """\
+section code
+main:
+    mov #0x100000, %R1
+loop:
+    add %R0, #1
+    add %R1, #0x100000
+    mov %R0, [R1]
+    add %R2, #1
+    jmp loop
+""",
+}
+
+
+def _source(rng: random.Random) -> str:
+    """A loop of random instructions over registers and buf, with inner branches and extra blocks."""
+    def writable() -> str:
+        return rng.choice(WORK_REGISTERS + WORK_REGISTERS + ["[buf]", "[R5]"])
+
+    def source() -> str:
+        if rng.random() < 0.2:
+            return f"#{rng.getrandbits(rng.choice((4, 63, 64))):#x}"
+        return writable()
+
+    lines = ["section data", "@array buf: " + ", ".join(["0"] * BUF_WORDS), "", "section code", "main:"]
+    lines += [f"    mov #{rng.getrandbits(64):#x}, {register}" for register in WORK_REGISTERS]
+    lines += ["    mov buf, %R5", "    mov #0, %R6", "loop:"]
+
+    for number in range(rng.randint(1, 10)):
+        kind = rng.random()
+        if kind < 0.3:
+            lines.append(f"    {rng.choice(BINARY)} {writable()}, {source()}")
+        elif kind < 0.4:
+            lines.append(f"    {rng.choice(BINARY)} {source()}, {source()}, {rng.choice(WORK_REGISTERS)}")
+        elif kind < 0.5:
+            lines.append(f"    {rng.choice(SHIFTS)} #{rng.randrange(70)}, {writable()}")
+        elif kind < 0.6:
+            lines.append(f"    {rng.choice(UNARY)} {writable()}")
+        elif kind < 0.7:
+            lines.append(f"    mov {source()}, {writable()}")
+        elif kind < 0.77:
+            lines.append(f"    cmp {source()}, {source()}")
+        elif kind < 0.82:
+            lines += [f"    push {source()}", f"    pop {writable()}"]
+        elif kind < 0.92:
+            # A forward branch on the flags of the instructions before it
+            lines += [f"    {rng.choice(['jz', 'jnz', 'jl', 'jle', 'jg', 'jge'])} skip{number}",
+                      f"    xor {rng.choice(WORK_REGISTERS)}, {source()}", f"skip{number}:"]
+        else:
+            # Another block inside the loop
+            lines += [f"    jmp split{number}", f"split{number}:"]
+
+    lines += ["    add %R6, #1", f"    cmp %R6, #{rng.randint(20, 200)}", "    jl loop", "    hlt"]
+    return "\n".join(lines) + "\n"
+
+
+def _state(machine: Machine):
+    return list(machine.regs), machine.memory.read_block(DATA_SEGMENT_START, BUF_WORDS).tolist(), machine.instructions
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_random_loops_match_the_interpreter(build_rom, seed):
+    rng = random.Random(seed)
+    rom = build_rom(_source(rng))
+
+    interpreted = Machine()
+    interpreted.load_rom(rom)
+    interpreted.run()
+    assert interpreted.halted
+
+    # Whole runs, and runs in uneven slices as a frontend or the scheduler makes them
+    for slice_ in (-1, rng.randint(1, 50)):
+        machine = Machine()
+        machine.load_rom(rom)
+        translator = BlockTranslator(machine, threshold=2, loop_iterations=rng.choice((1, 3, 256)))
+        translator.install()
+        while not machine.halted:
+            machine.run(slice_)
+        assert translator.translated
+        assert _state(machine) == _state(interpreted)
+
+
+def test_budgets_hold_inside_self_loops(build_rom):
+    machine = Machine()
+    machine.load_rom(build_rom(FAULT_SOURCES["self-loop"].replace("mov %R0, [R1]", "nop")))
+    BlockTranslator(machine, threshold=1).install()
+
+    # A looping block stops before another pass would go past the budget, so the overshoot is under one pass
+    for budget in (1, 5, 7, 1000, 3, 60000):
+        assert budget <= machine.run(budget) < budget + 5
+
+
+@pytest.mark.parametrize("name", sorted(FAULT_SOURCES))
+def test_faults_inside_blocks_count_like_the_interpreter(build_rom, name):
+    rom = build_rom(FAULT_SOURCES[name])
+    results = []
+    for translate in (False, True):
+        machine = Machine()
+        machine.load_rom(rom)
+        if translate:
+            BlockTranslator(machine, threshold=2).install()
+        with pytest.raises(MemoryFault):
+            machine.run()
+        results.append((list(machine.regs), machine.instructions))
+    assert results[0] == results[1]
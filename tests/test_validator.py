@@ -0,0 +1,76 @@
+"""The ROM validator against the operand rules of instruction-table.md."""
+
+from array import array
+from itertools import product
+
+import pytest
+
+from addressing_table import addressing_mode_to_code
+from disassembler import encode_instruction
+from memory_map import CODE_SEGMENT_START
+from opcode_table import opcode_to_binary
+from operand_table import OPERAND_TABLE
+from validator import validate_instruction_words
+
+IMM = addressing_mode_to_code("IMM")
+REG = addressing_mode_to_code("REG")
+MEM = addressing_mode_to_code("MEM")
+PORT = addressing_mode_to_code("PORT")
+
+
+def _word(name: str, *modes: int) -> int:
+    return encode_instruction(opcode_to_binary(name), modes)
+
+
+def _messages(*words: int):
+    return [violation.message for violation in validate_instruction_words(array('Q', words))]
+
+
+def test_every_allowed_form_is_valid():
+    words = []
+    for name, spec in OPERAND_TABLE.items():
+        for count in range(spec.min_operands, len(spec.modes) + 1):
+            allowed = [[mode for mode in range(16) if mask >> mode & 1] for mask in spec.modes[:count]]
+            words += [_word(name, *modes) for modes in product(*allowed)]
+    assert validate_instruction_words(array('Q', words)) == []
+
+
+def test_in_takes_a_port_first():
+    assert _messages(_word("in", PORT, REG)) == []
+    assert _messages(_word("in", IMM, REG)) == ["in operand 1 cannot be IMM (allowed: PORT)"]
+    assert _messages(_word("out", REG, PORT)) == []
+    assert _messages(_word("out", PORT, REG)) == [
+        "out operand 1 cannot be PORT (allowed: IMM, REG, MEM, IND)",
+        "out operand 2 cannot be REG (allowed: PORT)",
+    ]
+
+
+@pytest.mark.parametrize("word, message", [
+    (_word("hlt", REG), "hlt takes 0 operands, found 1"),
+    (_word("add", REG), "add takes 2-3 operands, found 1"),
+    (_word("mov", REG, REG, REG), "mov takes 2 operands, found 3"),
+])
+def test_operand_counts(word, message):
+    assert message in _messages(word)
+
+
+def test_modes_beyond_the_operand_count():
+    word = _word("jmp", IMM) | MEM << 28
+    assert _messages(word) == ["mode 2 is MEM but the instruction has 1 operands"]
+
+
+def test_reserved_bits_must_be_zero():
+    assert _messages(_word("nop") | 1 << 36) == ["reserved bits 36-63 are 0x1"]
+    assert _messages(_word("nop") | 0xABC << 40) == ["reserved bits 36-63 are 0xABC0"]
+
+
+def test_designation_and_unknown_opcodes():
+    assert _messages(_word("nop") & ~0xF | 0x3) == ["missing 0xF designation (found 0x3)"]
+    assert _messages(0xF | 0x1234 << 4) == ["unknown opcode 0x1234"]
+
+
+def test_violations_report_instruction_index_and_pc():
+    words = array('Q', [_word("mov", IMM, REG), _word("nop"), _word("in", IMM, REG)])
+    (violation,) = validate_instruction_words(words)
+    assert violation.index == 2
+    assert violation.pc == CODE_SEGMENT_START + 3 + 1
@@ -0,0 +1,439 @@
+"""Two-pass assembler for Viso-Fox assembly source (see assembly.md)."""
+
+import argparse
+import re
+import sys
+import time
+
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from register_table import REVERSE_REGISTER_LUT
+from addressing_table import REVERSE_ADDRESSING_MODE_LUT
+from opcode_table import MNEMONIC_LUT
+from operand_table import OPERAND_TABLE
+from disassembler import INSTRUCTION_LAYOUT
+from linker import AssembledProgram, LinkError, ObjectFile, ObjectSymbol, Relocation, link_objects, link_rom
+
+# Version of the assembler and the newest assembly syntax it accepts
+VERSION = "1.0.0"
+ASSEMBLY_VERSION = (1, 0)
+
+WORD_MASK = 0xFFFFFFFFFFFFFFFF
+
+# Addressing mode codes
+IMM = REVERSE_ADDRESSING_MODE_LUT["IMM"]
+REG = REVERSE_ADDRESSING_MODE_LUT["REG"]
+MEM = REVERSE_ADDRESSING_MODE_LUT["MEM"]
+IND = REVERSE_ADDRESSING_MODE_LUT["IND"]
+PORT = REVERSE_ADDRESSING_MODE_LUT["PORT"]
+
+# Instruction word fields, from the shared bit layout
+DESIGNATION = INSTRUCTION_LAYOUT["DESIGNATION"][1]
+OPCODE_SHIFT = INSTRUCTION_LAYOUT["OPCODE"][0]
+OPERAND_COUNT_SHIFT = INSTRUCTION_LAYOUT["OPERAND_COUNT"][0]
+MODE_SHIFTS = tuple(INSTRUCTION_LAYOUT[field][0] for field in ("MODE1", "MODE2", "MODE3"))
+
+# Registers by their uppercase names, as the assembly syntax requires
+REGISTERS: Dict[str, int] = {name.upper(): index for name, index in REVERSE_REGISTER_LUT.items()}
+
+# Built-in constants from assembly.md
+BUILTIN_CONSTANTS: Dict[str, int] = {
+    "TRUE": 1,
+    "FALSE": 0,
+    "NULL": 0,
+    **REGISTERS,
+    **{f"PORT_{port}": port for port in range(16)},
+    "NL": 13,
+    "TAB": 9,
+    "DQUOTE": 34,
+}
+
+# Precompiled line patterns
+SECTION_RE = re.compile(r"section\s+(meta|data|code)$")
+META_RE = re.compile(r"@meta\s+(version|entry|replace)\s*:?\s*(.*)$")
+DATA_RE = re.compile(r"@(real|array)\s+([A-Za-z_]\w*)\s*:?\s*(.*)$")
+LABEL_RE = re.compile(r"([A-Za-z_]\w*):\s*(.*)$")
+INSTRUCTION_RE = re.compile(r"([a-z]+)(?:\s+(.*))?$")
+SYMBOL_RE = re.compile(r"[A-Za-z_]\w*$")
+LIST_ITEM_RE = re.compile(r'\s*(?:"([^"]*)"|([^,"]+?))\s*(?:,|$)')
+OPERAND_RE = re.compile(r'#?"[^"]*"|[^,\s][^,]*')
+CHARACTER_RE = re.compile(r'"(.)"$')
+
+
+class AssemblyError(Exception):
+    """Raised for invalid assembly source, with the offending line number."""
+
+    def __init__(self, line: int, message: str) -> None:
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+def parse_value(token: str) -> Optional[int]:
+    """
+    Parse a numeric or single-character literal.
+
+    Args:
+        token (str): Decimal, 0x hex, 0b binary or 0o octal number, or a one-character string.
+
+    Returns:
+        Optional[int]: The 64-bit value, or None if the token is not a literal.
+    """
+    try:
+        value = int(token, 0)
+    except ValueError:
+        match = CHARACTER_RE.match(token)
+        if match is None:
+            return None
+        value = ord(match.group(1))
+    return value & WORD_MASK if value >= -(1 << 63) and value <= WORD_MASK else None
+
+
+def strip_comment(line: str) -> str:
+    """Remove a ';' comment from a line, ignoring ';' inside string literals."""
+    if '"' not in line:
+        return line.split(';', 1)[0]
+
+    quoted = False
+    for index, character in enumerate(line):
+        if character == '"':
+            quoted = not quoted
+        elif character == ';' and not quoted:
+            return line[:index]
+    return line
+
+
+class Assembler:
+    """
+    Assemble Viso-Fox source in two passes.
+
+    The first pass tokenizes every line with precompiled regexes, lays out the
+    data and code sections, records label and variable addresses and encodes
+    each instruction (addressing modes follow from operand syntax alone, and
+    repeated instruction text is encoded once). Operands naming a symbol get
+    a placeholder and a relocation. The result is an ObjectFile; the second
+    pass, in linker.link_objects, patches the relocations from the symbol
+    table of every object being linked.
+
+    Symbol values follow assembly.md: a label or @array name is its address,
+    while a @real name is its value (its address is still reserved in the
+    data section).
+    """
+
+    def __init__(self) -> None:
+        self.data: List[int] = []
+        self.code: List[int] = []
+        self.relocations: List[Relocation] = []
+        self.symbols: Dict[str, ObjectSymbol] = {}
+        self.replacements: Dict[str, str] = {}
+        self.entry: Optional[str] = None
+        self._replace_re: Optional["re.Pattern[str]"] = None
+        self._encoded: Dict[str, Tuple[Tuple[int, ...], Tuple[Tuple[int, str], ...]]] = {}
+
+    def assemble(self, source: str, name: str = "<source>") -> AssembledProgram:
+        """
+        Assemble and link a whole source file on its own.
+
+        Args:
+            source (str): The assembly source text.
+            name (str): The source's name, for errors.
+
+        Returns:
+            AssembledProgram: The encoded sections and symbol table.
+
+        Raises:
+            AssemblyError: If the source is invalid.
+            LinkError: If a symbol is undefined or the entry label is invalid.
+        """
+        return link_objects([self.assemble_object(source, name)])
+
+    def assemble_object(self, source: str, name: str = "<source>") -> ObjectFile:
+        """
+        Assemble a source file into an object, leaving symbols for the linker.
+
+        Args:
+            source (str): The assembly source text.
+            name (str): The source's name, recorded in the object for errors.
+
+        Returns:
+            ObjectFile: The encoded sections with their symbol and relocation tables.
+
+        Raises:
+            AssemblyError: If the source is invalid.
+        """
+        start = time.perf_counter()
+        section: Optional[str] = None
+        for number, line in enumerate(source.splitlines(), 1):
+            if ';' in line:
+                line = strip_comment(line)
+            line = line.strip()
+            if not line:
+                continue
+
+            if line.startswith("section"):
+                match = SECTION_RE.match(line)
+                if match is None:
+                    raise AssemblyError(number, f"invalid section directive '{line}'")
+                section = match.group(1)
+                continue
+
+            if section == "meta":
+                self._meta(number, line)
+                continue
+
+            if self._replace_re is not None:
+                line = self._replace_re.sub(lambda match: self.replacements[match.group(0)], line)
+
+            if section == "code":
+                self._code_line(number, line)
+            elif section == "data":
+                self._data_line(number, line)
+            else:
+                raise AssemblyError(number, "statement outside of a section")
+
+        return ObjectFile(name, array('Q', self.data), array('Q', self.code), self.symbols,
+                          self.relocations, self.entry, time.perf_counter() - start)
+
+    def _meta(self, number: int, line: str) -> None:
+        match = META_RE.match(line)
+        if match is None:
+            raise AssemblyError(number, f"invalid meta directive '{line}'")
+
+        directive, argument = match.group(1), match.group(2).strip()
+        if directive == "version":
+            try:
+                version = tuple(int(part) for part in argument.split("."))
+            except ValueError:
+                raise AssemblyError(number, f"invalid version '{argument}'")
+            # Missing parts count as zero, so 1.0.0 is the same version as 1.0
+            supported = ASSEMBLY_VERSION + (0,) * (len(version) - len(ASSEMBLY_VERSION))
+            if version + (0,) * (len(ASSEMBLY_VERSION) - len(version)) > supported:
+                raise AssemblyError(number, f"assembly version {argument} is newer than this assembler supports")
+        elif directive == "entry":
+            if SYMBOL_RE.match(argument) is None:
+                raise AssemblyError(number, f"invalid entry label '{argument}'")
+            self.entry = argument
+        else:
+            parts = argument.split()
+            if len(parts) != 2:
+                raise AssemblyError(number, "replace takes exactly two strings without spaces")
+            self.replacements[parts[0]] = parts[1]
+
+            # Longest match first, so overlapping strings replace predictably
+            pattern = "|".join(re.escape(old) for old in sorted(self.replacements, key=len, reverse=True))
+            self._replace_re = re.compile(pattern)
+
+    def _data_line(self, number: int, line: str) -> None:
+        match = DATA_RE.match(line)
+        if match is None:
+            raise AssemblyError(number, f"invalid data directive '{line}'")
+
+        kind, name, items = match.groups()
+
+        if kind == "real":
+            # The name stands for the value, which still occupies a data word
+            value, symbol = self._value(number, items.strip())
+            self._define(number, name, ObjectSymbol("real", value, symbol, number))
+            self._data_value(number, items.strip())
+            return
+
+        self._define(number, name, ObjectSymbol("data", len(self.data), None, number))
+
+        # @array: strings expand to one word per character
+        position = 0
+        while position < len(items):
+            item = LIST_ITEM_RE.match(items, position)
+            if item is None or item.end() == position:
+                raise AssemblyError(number, f"invalid array item in '{items}'")
+            position = item.end()
+
+            text, token = item.groups()
+            if text is not None:
+                self.data.extend(map(ord, text))
+                continue
+            self._data_value(number, token)
+
+    def _data_value(self, number: int, token: str) -> None:
+        """Append one data word, leaving a relocation if it names a symbol."""
+        value, symbol = self._value(number, token)
+        if symbol is not None:
+            self.relocations.append(Relocation("data", len(self.data), symbol, number))
+        self.data.append(value)
+
+    def _code_line(self, number: int, line: str) -> None:
+        if ':' in line:
+            label = LABEL_RE.match(line)
+            if label is not None:
+                name, line = label.groups()
+                self._define(number, name, ObjectSymbol("code", len(self.code), None, number))
+                if not line:
+                    return
+
+        # Identical instruction text always encodes the same way, so reuse it
+        encoded = self._encoded.get(line)
+        if encoded is None:
+            encoded = self._encoded[line] = self._encode(number, line)
+        words, symbols = encoded
+
+        code = self.code
+        for slot, symbol in symbols:
+            self.relocations.append(Relocation("code", len(code) + slot, symbol, number))
+        code.extend(words)
+
+    def _encode(self, number: int, line: str) -> Tuple[Tuple[int, ...], Tuple[Tuple[int, str], ...]]:
+        """
+        Encode one instruction.
+
+        Args:
+            number (int): The source line number, for errors.
+            line (str): The instruction text, without label or comment.
+
+        Returns:
+            Tuple[Tuple[int, ...], Tuple[Tuple[int, str], ...]]: The instruction
+            and operand words, and (word offset, symbol) of each operand to fix up.
+        """
+        match = INSTRUCTION_RE.match(line)
+        if match is None:
+            raise AssemblyError(number, f"invalid instruction '{line}'")
+        mnemonic, operand_text = match.groups()
+
+        spec = OPERAND_TABLE.get(mnemonic)
+        if spec is None:
+            raise AssemblyError(number, f"unknown instruction '{mnemonic}'")
+
+        if not operand_text:
+            operands: List[str] = []
+        elif '"' in operand_text:
+            operands = [operand.strip() for operand in OPERAND_RE.findall(operand_text)]
+        else:
+            operands = [operand.strip() for operand in operand_text.split(',')]
+
+        count = len(operands)
+        if not spec.min_operands <= count <= len(spec.modes):
+            expected = (str(spec.min_operands) if spec.min_operands == len(spec.modes)
+                        else f"{spec.min_operands} to {len(spec.modes)}")
+            raise AssemblyError(number, f"'{mnemonic}' takes {expected} operands, got {count}")
+
+        # Header word with the same bit layout the disassembler decodes
+        word = DESIGNATION | MNEMONIC_LUT[mnemonic] << OPCODE_SHIFT | count << OPERAND_COUNT_SHIFT
+        words = [word]
+        symbols = []
+        for slot, operand in enumerate(operands):
+            mode, value, symbol = self._operand(number, operand, spec.modes[slot])
+            if not spec.modes[slot] >> mode & 1:
+                raise AssemblyError(number, f"operand {slot + 1} of '{mnemonic}' cannot be '{operand}'")
+            words[0] |= mode << MODE_SHIFTS[slot]
+            if symbol is not None:
+                symbols.append((slot + 1, symbol))
+            words.append(value)
+
+        return tuple(words), tuple(symbols)
+
+    def _operand(self, number: int, operand: str, allowed: int) -> Tuple[int, int, Optional[str]]:
+        """
+        Work out an operand's addressing mode and value.
+
+        Returns:
+            Tuple[int, int, Optional[str]]: The mode, the value (0 if a symbol
+            must be resolved) and the symbol to resolve, if any.
+        """
+        if not operand:
+            raise AssemblyError(number, "empty operand")
+
+        first = operand[0]
+        if first == '%':
+            register = REGISTERS.get(operand[1:])
+            if register is None:
+                raise AssemblyError(number, f"unknown register '{operand}'")
+            return REG, register, None
+
+        if first == '[':
+            if operand[-1] != ']':
+                raise AssemblyError(number, f"unterminated memory operand '{operand}'")
+            inner = operand[1:-1].strip()
+            name = inner[1:] if inner.startswith('%') else inner
+            register = REGISTERS.get(name)
+            if register is not None:
+                return IND, register, None
+            if inner.startswith('%'):
+                raise AssemblyError(number, f"unknown register '{inner}'")
+            value, symbol = self._value(number, inner)
+            return MEM, value, symbol
+
+        if first == '#':
+            value, symbol = self._value(number, operand[1:])
+            return IMM, value, symbol
+
+        # A bare value is immediate where allowed, otherwise a port or register number
+        value, symbol = self._value(number, operand)
+        if allowed >> IMM & 1:
+            return IMM, value, symbol
+        if allowed >> PORT & 1:
+            return PORT, value, symbol
+        if operand in REGISTERS:
+            return REG, REGISTERS[operand], None
+        return IMM, value, symbol
+
+    def _value(self, number: int, token: str) -> Tuple[int, Optional[str]]:
+        value = parse_value(token)
+        if value is not None:
+            return value, None
+        constant = BUILTIN_CONSTANTS.get(token)
+        if constant is not None:
+            return constant, None
+        if SYMBOL_RE.match(token) is None:
+            raise AssemblyError(number, f"invalid operand '{token}'")
+        return 0, token
+
+    def _define(self, number: int, name: str, symbol: ObjectSymbol) -> None:
+        if name in self.symbols or name in BUILTIN_CONSTANTS:
+            raise AssemblyError(number, f"'{name}' is already defined")
+        self.symbols[name] = symbol
+
+
+def assemble_file(source_file: str, output_file: str) -> AssembledProgram:
+    """
+    Assemble a source file into a VFOX ROM.
+
+    Args:
+        source_file (str): The assembly source.
+        output_file (str): The ROM file to write.
+
+    Returns:
+        AssembledProgram: The assembled program.
+    """
+    with open(source_file, 'r', encoding='utf-8') as f:
+        source = f.read()
+
+    return link_rom([Assembler().assemble_object(source, source_file)], output_file)
+
+
+def main() -> None:
+    """Assemble a source file from the command line."""
+    parser = argparse.ArgumentParser(description="Assemble Viso-Fox assembly into a VFOX ROM.")
+    parser.add_argument('source', help="assembly source file")
+    parser.add_argument('output', help="ROM file to write")
+    parser.add_argument('--version', action='version', version=f"assembler version {VERSION}")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        program = assemble_file(args.source, args.output)
+    except FileNotFoundError:
+        print(f"Error: File '{args.source}' not found.")
+        sys.exit(1)
+    except AssemblyError as error:
+        print(f"Error: {args.source}: {error}")
+        sys.exit(1)
+    except LinkError as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    print(f"Assembled {args.source} to {args.output} in {elapsed:.3f}s")
+    print(f"Code: {len(program.code):,} words, Data: {len(program.data):,} words, "
+          f"Symbols: {len(program.symbols):,}")
+
+
+if __name__ == "__main__":
+    main()
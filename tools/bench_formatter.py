@@ -0,0 +1,85 @@
+"""Benchmark comparing per-field operand formatting with the table-driven formatter."""
+
+import argparse
+import random
+import time
+
+from array import array
+from typing import Callable, Iterator, List, Sequence
+
+from register_table import binary_to_register
+from addressing_table import code_to_addressing_mode
+from opcode_table import binary_to_opcode
+from disassembler import (
+    DecodedColumns, assembly_lines, create_dummy_instruction, create_dummy_pack, decode_columns
+)
+
+
+def legacy_assembly_lines(columns: DecodedColumns, code_section: Sequence[int]) -> Iterator[str]:
+    """Format instructions with the original string-dispatch chain (the baseline)."""
+    for opcode_bits, operand_count, mode1, mode2, mode3, start in zip(
+            columns.opcode, columns.operand_count,
+            columns.mode1, columns.mode2, columns.mode3, columns.starts):
+        opcode = binary_to_opcode(opcode_bits)
+        modes = [mode1, mode2, mode3]
+
+        operands_text: List[str] = []
+        for j in range(operand_count):
+            operand = code_section[start + 1 + j]
+            mode_str = code_to_addressing_mode(modes[j])
+
+            if mode_str == "REG":
+                operand_str = f"%{binary_to_register(operand)}"
+            elif mode_str == "IND":
+                operand_str = f"[{binary_to_register(operand)}]"
+            elif mode_str == "MEM":
+                operand_str = f"[0x{operand:X}]"
+            elif mode_str == "IMM":
+                operand_str = f"#{hex(operand)}"
+            elif mode_str == "PORT":
+                operand_str = f"0x{operand:X}"
+            else:
+                operand_str = f"0x{operand:X}"
+
+            operands_text.append(operand_str)
+
+        if operands_text:
+            yield f"\t{opcode} {', '.join(operands_text)}\n"
+        else:
+            yield f"\t{opcode}\n"
+
+
+def time_lines(formatter: Callable[[DecodedColumns, Sequence[int]], Iterator[str]],
+               columns: DecodedColumns, code_section: Sequence[int]) -> float:
+    """Return the lines per second produced by a formatter."""
+    start = time.perf_counter()
+    lines = list(formatter(columns, code_section))
+    elapsed = time.perf_counter() - start
+    return len(lines) / elapsed
+
+
+def main() -> None:
+    """Generate a seeded code section and report formatting throughput."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--instructions', type=int, default=200_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    code_section = array('Q')
+    for _ in range(args.instructions):
+        code_section.extend(create_dummy_pack(create_dummy_instruction()))
+
+    columns = decode_columns(code_section)
+
+    before = time_lines(legacy_assembly_lines, columns, code_section)
+    after = time_lines(assembly_lines, columns, code_section)
+
+    print(f"Instructions: {len(columns.starts)}")
+    print(f"Before (string dispatch): {before:,.0f} lines/s")
+    print(f"After (formatter tables): {after:,.0f} lines/s")
+    print(f"Speedup: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""Reproducible benchmarks of ROM generation, decoding and disassembly, with JSON results and regression checks."""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from disassembler import (
+    ROMImage, assembly_lines, convert_to_instructions, create_dummy_instruction, create_dummy_pack,
+    decode_columns, decode_instruction, read_rom_header, write_debug_view, write_disassembly, write_rom,
+)
+
+# Version of the benchmark suite; bump when stages change so results stay comparable
+VERSION = "1.0.0"
+
+# ROM sizes in instructions
+SIZES: Dict[str, int] = {"1k": 1_000, "1m": 1_000_000, "10m": 10_000_000}
+
+# Default seed, regression threshold and header reads per timing
+DEFAULT_SEED = 0
+DEFAULT_THRESHOLD = 0.10
+HEADER_READS = 1000
+
+# decode_instruction builds a dict per word, so it is timed on a prefix of the code
+DECODE_INSTRUCTION_LIMIT = 100_000
+
+Stage = Tuple[float, int]  # seconds, words processed
+
+
+def generate_rom(filename: str, instructions: int, seed: int) -> Stage:
+    """
+    Write a fixed-seed dummy ROM with create_dummy_instruction and create_dummy_pack.
+
+    Args:
+        filename (str): The ROM file to write.
+        instructions (int): Number of instructions.
+        seed (int): Seed of the generators.
+
+    Returns:
+        Stage: Seconds taken and words written.
+    """
+    start = time.perf_counter()
+    random.seed(seed)
+    code = array('Q')
+    for _ in range(instructions):
+        code.extend(create_dummy_pack(create_dummy_instruction()))
+    data = [random.randint(0, 0xFFFFFFFF) for _ in range(16)]
+    write_rom(data, [code], filename)
+    return time.perf_counter() - start, len(data) + len(code)
+
+
+def _timed(function: Callable[[], int]) -> Stage:
+    start = time.perf_counter()
+    words = function()
+    return time.perf_counter() - start, words
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, or None where unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def benchmark_rom(filename: str, repeats: int, work_dir: str) -> Dict[str, object]:
+    """
+    Time each stage of reading and disassembling a ROM.
+
+    Run in a fresh worker process per ROM so the peak RSS belongs to that ROM.
+
+    Args:
+        filename (str): The ROM file.
+        repeats (int): Runs of each stage; the fastest is kept.
+        work_dir (str): Directory for the disassembly and debug output.
+
+    Returns:
+        Dict[str, object]: "stages" (name -> seconds, words) and "peak_rss_bytes".
+    """
+    def header_read() -> int:
+        for _ in range(HEADER_READS):
+            with open(filename, 'rb') as f:
+                read_rom_header(f)
+        return HEADER_READS * 3
+
+    def section_load() -> int:
+        with ROMImage(filename) as rom:
+            data = array('Q', rom.data_section)
+            code = array('Q', rom.code_section)
+        return len(data) + len(code)
+
+    with ROMImage(filename) as rom:
+        code = array('Q', rom.code_section)
+    columns = decode_columns(code)
+
+    def decode() -> int:
+        decode_columns(code)
+        return len(code)
+
+    def convert() -> int:
+        convert_to_instructions(code)
+        return len(code)
+
+    def decode_words() -> int:
+        headers = columns.starts[:DECODE_INSTRUCTION_LIMIT]
+        for start in headers:
+            decode_instruction(code[start])
+        return len(headers)
+
+    def format_lines() -> int:
+        deque(assembly_lines(columns, code), maxlen=0)
+        return len(code)
+
+    disassembly = os.path.join(work_dir, "bench.asm")
+    debug_view = os.path.join(work_dir, "bench.debug")
+
+    def write() -> int:
+        write_disassembly(filename, disassembly)
+        return len(code)
+
+    def debug_write() -> int:
+        with open(debug_view, 'w', encoding='utf-8') as out:
+            write_debug_view(filename, out)
+        return len(code)
+
+    stages: Dict[str, Stage] = {}
+    for name, function in (("header_read", header_read), ("section_load", section_load),
+                           ("decode", decode), ("convert_to_instructions", convert),
+                           ("decode_instruction", decode_words), ("format", format_lines),
+                           ("disassemble_write", write), ("debug_write", debug_write)):
+        stages[name] = min((_timed(function) for _ in range(repeats)), key=lambda stage: stage[0])
+
+    for path in (disassembly, debug_view):
+        if os.path.exists(path):
+            os.remove(path)
+
+    return {"stages": stages, "peak_rss_bytes": _peak_rss_bytes()}
+
+
+def _stage_result(stage: Stage) -> Dict[str, float]:
+    seconds, words = stage
+    return {"seconds": seconds, "words": words, "words_per_second": words / max(seconds, 1e-9)}
+
+
+def run_suite(sizes: List[str], seed: int, repeats: int, work_dir: str, reuse_roms: bool) -> Dict[str, object]:
+    """
+    Generate (or reuse) each ROM and benchmark it in its own process.
+
+    Args:
+        sizes (List[str]): Keys of SIZES to run.
+        seed (int): Seed of the ROM generators.
+        repeats (int): Runs of each stage.
+        work_dir (str): Directory for the ROMs and outputs.
+        reuse_roms (bool): Reuse previously generated ROMs instead of timing generation.
+
+    Returns:
+        Dict[str, object]: The results document written as JSON.
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    results: Dict[str, object] = {}
+
+    for size in sizes:
+        instructions = SIZES[size]
+        rom = os.path.join(work_dir, f"bench-{size}-seed{seed}.bin")
+
+        generated: Optional[Stage] = None
+        if not (reuse_roms and os.path.exists(rom)):
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                generated = executor.submit(generate_rom, rom, instructions, seed).result()
+
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            measured = executor.submit(benchmark_rom, rom, repeats, work_dir).result()
+
+        stages = {}
+        if generated is not None:
+            stages["generate"] = _stage_result(generated)
+        stages.update((name, _stage_result(stage)) for name, stage in measured["stages"].items())
+
+        results[size] = {
+            "instructions": instructions,
+            "rom_bytes": os.path.getsize(rom),
+            "stages": stages,
+            "peak_rss_bytes": measured["peak_rss_bytes"],
+        }
+
+    return {
+        "version": VERSION,
+        "seed": seed,
+        "repeats": repeats,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare_results(baseline: Dict[str, object], current: Dict[str, object],
+                    threshold: float) -> List[str]:
+    """
+    Find stages that got slower than a baseline by more than a threshold.
+
+    Args:
+        baseline (Dict[str, object]): Earlier results.
+        current (Dict[str, object]): New results.
+        threshold (float): Allowed slowdown as a fraction, e.g. 0.10 for 10%.
+
+    Returns:
+        List[str]: One message per regressed stage; empty if none regressed.
+    """
+    regressions = []
+    for size, result in current["results"].items():
+        previous = baseline.get("results", {}).get(size)
+        if previous is None:
+            continue
+        for name, stage in result["stages"].items():
+            before = previous["stages"].get(name)
+            if before is None:
+                continue
+            change = stage["seconds"] / max(before["seconds"], 1e-9) - 1.0
+            if change > threshold:
+                regressions.append(f"{size} {name}: {before['seconds']:.4f}s -> {stage['seconds']:.4f}s "
+                                   f"({change:+.1%})")
+    return regressions
+
+
+def print_results(document: Dict[str, object]) -> None:
+    """Print a results document as a table."""
+    for size, result in document["results"].items():
+        rss = result["peak_rss_bytes"]
+        peak = f", peak RSS {rss / (1024 * 1024):,.1f} MiB" if rss is not None else ""
+        print(f"---- {size}: {result['instructions']:,} instructions, {result['rom_bytes']:,} bytes{peak} ----")
+        for name, stage in result["stages"].items():
+            print(f"{name:>24}: {stage['seconds']:>10.4f}s {stage['words_per_second']:>16,.0f} words/s")
+
+
+def main() -> None:
+    """Run the benchmark suite from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default=",".join(SIZES),
+                        help=f"comma-separated ROM sizes to run (default: {','.join(SIZES)})")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="seed of the ROM generators")
+    parser.add_argument('--repeats', type=int, default=1, help="runs of each stage; the fastest is kept")
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), "vfox-bench"),
+                        help="directory for generated ROMs and outputs")
+    parser.add_argument('--reuse-roms', action='store_true',
+                        help="reuse ROMs generated by an earlier run and skip the generate stage")
+    parser.add_argument('--output', metavar='FILE', help="write the results as JSON")
+    parser.add_argument('--compare', metavar='FILE', help="fail if a stage is slower than in these results")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"allowed slowdown for --compare as a fraction (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument('--version', action='version', version=f"bench_suite version {VERSION}")
+    args = parser.parse_args()
+
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        print(f"Error: Unknown size '{unknown[0]}', expected one of {', '.join(SIZES)}.")
+        sys.exit(1)
+
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.compare, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            print(f"Error: File '{args.compare}' not found.")
+            sys.exit(1)
+        except ValueError as error:
+            print(f"Error: {args.compare}: {error}")
+            sys.exit(1)
+
+    document = run_suite(sizes, args.seed, max(args.repeats, 1), args.work_dir, args.reuse_roms)
+    print_results(document)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2)
+        print(f"Results written to '{args.output}'.")
+
+    if baseline is not None:
+        regressions = compare_results(baseline, document, args.threshold)
+        if regressions:
+            print(f"---- {len(regressions)} stages regressed by more than {args.threshold:.0%} ----")
+            for message in regressions:
+                print(message)
+            sys.exit(1)
+        print(f"No stage regressed by more than {args.threshold:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Incremental multi-file build: assemble each source to a cached object, then link one VFOX ROM."""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set
+
+from assembler import VERSION, Assembler, AssemblyError
+from linker import (
+    OBJECT_VERSION, AssembledProgram, LinkError, ObjectFile,
+    link_rom, object_imports, read_object, write_object,
+)
+from output_cache import OutputCache
+
+# Environment variable overriding the object cache directory, separate from the disassembler's
+OBJECT_CACHE_DIR_ENV = "VFOX_OBJECT_CACHE_DIR"
+
+# Default object cache location and the suffix of object entries
+DEFAULT_OBJECT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "vfox-assembler")
+OBJECT_ENTRY_SUFFIX = ".vfo"
+
+# Suffix of the dependency manifest written next to the ROM
+MANIFEST_SUFFIX = ".deps"
+
+
+class BuildError(Exception):
+    """Raised when a source in a build fails to assemble."""
+
+
+class BuildReport(NamedTuple):
+    """Outcome of a build."""
+    program: AssembledProgram
+    assembled: List[str]      # sources assembled because their object was not cached
+    reused: List[str]         # sources whose cached object was used
+    dependents: List[str]     # reused sources importing symbols from an assembled one
+    saved_seconds: float      # assembly time of the reused objects, less the time to load them
+    elapsed: float
+
+
+def _load_manifest(filename: str) -> Dict[str, Dict[str, object]]:
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _assemble(source_file: str) -> ObjectFile:
+    with open(source_file, 'r', encoding='utf-8') as f:
+        source = f.read()
+    return Assembler().assemble_object(source, source_file)
+
+
+def build(sources: Sequence[str], output_file: str, cache: Optional[OutputCache]) -> BuildReport:
+    """
+    Build a ROM from several sources, reassembling only what changed.
+
+    Each source is keyed by its content hash (and the assembler version). A
+    cached object is reused as is; any other source is assembled and its
+    object cached. Cross-file references are relocations resolved by the
+    linker, so an object never embeds another file's symbol values: files
+    depending on a changed file keep their objects and are re-resolved at
+    link time. They are listed in the report, using the dependency manifest
+    saved with the ROM.
+
+    Args:
+        sources (Sequence[str]): Source files, in link order.
+        output_file (str): The ROM file to write.
+        cache (Optional[OutputCache]): The object cache, or None to assemble everything.
+
+    Returns:
+        BuildReport: What was assembled and reused, and the time the cache saved.
+
+    Raises:
+        BuildError: If a source fails to assemble.
+        LinkError: If the objects cannot be linked.
+    """
+    start = time.perf_counter()
+    objects: List[ObjectFile] = []
+    keys: List[Optional[str]] = []
+    assembled: List[str] = []
+    reused: List[str] = []
+    saved: float = 0.0
+
+    for source_file in sources:
+        key = cache.key(source_file, "object") if cache is not None else None
+        cached = cache.lookup(key) if key is not None else None
+        obj: Optional[ObjectFile] = None
+
+        if cached is not None:
+            load_start = time.perf_counter()
+            try:
+                obj = read_object(cached)._replace(source=source_file)
+            except (OSError, ValueError):
+                obj = None
+            else:
+                saved += obj.assembly_seconds - (time.perf_counter() - load_start)
+                reused.append(source_file)
+
+        if obj is None:
+            try:
+                obj = _assemble(source_file)
+            except AssemblyError as error:
+                raise BuildError(f"{source_file}: {error}") from error
+            assembled.append(source_file)
+            if key is not None:
+                fd, temp_path = tempfile.mkstemp(suffix=OBJECT_ENTRY_SUFFIX)
+                os.close(fd)
+                write_object(obj, temp_path)
+                cache.store(key, temp_path, move=True)
+
+        objects.append(obj)
+        keys.append(key)
+
+    program = link_rom(objects, output_file)
+
+    # Dependency manifest: what each source exports and imports
+    manifest_file = output_file + MANIFEST_SUFFIX
+    previous = _load_manifest(manifest_file)
+    manifest = {
+        obj.source: {"key": key, "exports": sorted(obj.symbols), "imports": object_imports(obj)}
+        for obj, key in zip(objects, keys)
+    }
+
+    # Symbols provided, before or after this build, by sources that were assembled
+    changed_exports: Set[str] = set()
+    for source_file in assembled:
+        changed_exports.update(manifest[source_file]["exports"])
+        changed_exports.update(previous.get(source_file, {}).get("exports", ()))
+    dependents = [source_file for source_file in reused
+                  if changed_exports.intersection(manifest[source_file]["imports"])]
+
+    try:
+        with open(manifest_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1)
+    except OSError:
+        pass
+
+    return BuildReport(program, assembled, reused, dependents, max(saved, 0.0), time.perf_counter() - start)
+
+
+def main() -> None:
+    """Build a ROM from assembly sources from the command line."""
+    parser = argparse.ArgumentParser(description="Assemble and link Viso-Fox sources into a VFOX ROM, "
+                                                 "reusing cached objects of unchanged files.")
+    parser.add_argument('output', help="ROM file to write")
+    parser.add_argument('sources', nargs='+', help="assembly source files, in link order")
+    parser.add_argument('--cache-dir', help=f"object cache directory (default: ${OBJECT_CACHE_DIR_ENV} "
+                                            f"or {DEFAULT_OBJECT_CACHE_DIR})")
+    parser.add_argument('--no-cache', action='store_true', help="assemble every source")
+    parser.add_argument('--version', action='version', version=f"build version {VERSION}")
+    args = parser.parse_args()
+
+    cache: Optional[OutputCache] = None
+    if not args.no_cache:
+        directory = args.cache_dir or os.environ.get(OBJECT_CACHE_DIR_ENV) or DEFAULT_OBJECT_CACHE_DIR
+        cache = OutputCache(f"{VERSION}/{OBJECT_VERSION}", directory, suffix=OBJECT_ENTRY_SUFFIX)
+
+    try:
+        report = build(args.sources, args.output, cache)
+    except FileNotFoundError as error:
+        print(f"Error: File '{error.filename}' not found.")
+        sys.exit(1)
+    except (BuildError, LinkError) as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+
+    program = report.program
+    print(f"Built {args.output} from {len(args.sources)} sources in {report.elapsed:.3f}s")
+    print(f"Code: {len(program.code):,} words, Data: {len(program.data):,} words, "
+          f"Symbols: {len(program.symbols):,}")
+    print(f"Assembled: {len(report.assembled)}, Reused: {len(report.reused)}, "
+          f"Dependents relinked: {len(report.dependents)}")
+    for source_file in report.assembled:
+        print(f"  assembled {source_file}")
+    for source_file in report.dependents:
+        print(f"  relinked  {source_file}")
+    if report.reused:
+        print(f"Cache saved {report.saved_seconds:.3f}s of assembly")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Utility module for recovering control flow and synthesizing labels from decoded code."""
+
+from array import array
+from bisect import bisect_left
+from typing import Dict, NamedTuple, Optional, Sequence
+
+from addressing_table import REVERSE_ADDRESSING_MODE_LUT
+from opcode_table import MNEMONIC_LUT
+from memory_map import CODE_SEGMENT_START
+
+# Instructions whose first operand is a jump or call target
+BRANCH_OPCODES = frozenset(
+    MNEMONIC_LUT[name] for name in ("jmp", "jz", "jnz", "jl", "jle", "jg", "jge", "call")
+)
+
+# Instructions after which execution does not simply fall through
+BLOCK_END_OPCODES = BRANCH_OPCODES | frozenset(
+    MNEMONIC_LUT[name] for name in ("ret", "int", "iret", "hlt")
+)
+
+# Addressing modes whose target address is known without running the code
+DIRECT_TARGET_MODES = frozenset(REVERSE_ADDRESSING_MODE_LUT[name] for name in ("IMM", "MEM"))
+
+
+class ControlFlow(NamedTuple):
+    """Basic blocks and synthesized labels of a decoded code section."""
+    block_starts: array       # 'Q', instruction index of each basic block, ascending
+    labels: Dict[int, str]    # code word offset -> label name, for every direct target
+
+
+def label_name(offset: int) -> str:
+    """Return the synthesized label for an instruction at a code word offset."""
+    return f"label_{CODE_SEGMENT_START + offset:x}"
+
+
+def branch_target(opcode: int, operand_count: int, mode1: int, operand: int) -> Optional[int]:
+    """
+    Return the code word offset a branch or call directly targets.
+
+    Args:
+        opcode (int): The instruction opcode.
+        operand_count (int): The instruction operand count.
+        mode1 (int): Addressing mode of the first operand.
+        operand (int): The first operand (ignored unless there is one).
+
+    Returns:
+        Optional[int]: The target offset, or None if the instruction is not a
+        direct (IMM/MEM) branch or call into the code segment.
+    """
+    if opcode not in BRANCH_OPCODES or operand_count == 0 or mode1 not in DIRECT_TARGET_MODES:
+        return None
+
+    offset = operand - CODE_SEGMENT_START
+    return offset if offset >= 0 else None
+
+
+def analyse_control_flow(opcodes: Sequence[int], operand_counts: Sequence[int], modes1: Sequence[int],
+                         starts: Sequence[int], code_section: Sequence[int]) -> ControlFlow:
+    """
+    Split a decoded code section into basic blocks and label its branch targets.
+
+    Runs in linear time plus a sort of the distinct targets: each target is
+    mapped to its instruction with a binary search of the sorted start offsets.
+    Targets landing inside an instruction's operands get no label.
+
+    Args:
+        opcodes (Sequence[int]): Opcode column of the decoded code section.
+        operand_counts (Sequence[int]): Operand count column.
+        modes1 (Sequence[int]): Addressing mode column of the first operand.
+        starts (Sequence[int]): Ascending word offset of each instruction.
+        code_section (Sequence[int]): The code section as 64-bit words.
+
+    Returns:
+        ControlFlow: Block start indexes and labels by code word offset.
+    """
+    count = len(starts)
+
+    # Collect the direct targets and the instructions that end a block
+    targets = set()
+    leaders = {0} if count else set()
+    for index, (opcode, operand_count, mode1, start) in enumerate(zip(
+            opcodes, operand_counts, modes1, starts)):
+        if opcode not in BLOCK_END_OPCODES:
+            continue
+        if index + 1 < count:
+            leaders.add(index + 1)
+        if operand_count:
+            target = branch_target(opcode, operand_count, mode1, code_section[start + 1])
+            if target is not None:
+                targets.add(target)
+
+    # Map each target to the instruction starting exactly at it
+    labels: Dict[int, str] = {}
+    for target in sorted(targets):
+        index = bisect_left(starts, target)
+        if index < count and starts[index] == target:
+            labels[target] = label_name(target)
+            leaders.add(index)
+
+    return ControlFlow(array('Q', sorted(leaders)), labels)
@@ -1,18 +1,92 @@
 """Utility functions and disassembler for VFOX ROM files."""
 
 import argparse
+import io
+import mmap
+import os
+import shutil
+import struct
 import sys
+import tempfile
+import time
 
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from io import BufferedReader, BufferedWriter
-from typing import Dict, List, NamedTuple
+from itertools import accumulate, compress
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, TextIO, Tuple
 import random
 
-from register_table import REGISTER_LUT, binary_to_register
-from addressing_table import ADDRESSING_MODE_LUT, code_to_addressing_mode
-from opcode_table import OPCODE_LUT, binary_to_opcode
+from register_table import REGISTER_LUT
+from addressing_table import ADDRESSING_MODE_LUT, REVERSE_ADDRESSING_MODE_LUT
+from opcode_table import OPCODE_LUT
+from operand_format import (
+    ASSEMBLY_OPERAND_FORMATTERS, ASSEMBLY_PREFIX, DEBUG_OPERAND_FORMATTERS, MODE_TRIPLE_TEXT,
+    assembly_prefix, format_operands, mnemonic_text
+)
+from output_cache import OutputCache
+from operand_table import OPERAND_TABLE
+from memory_map import CODE_SEGMENT_START
+from control_flow import (
+    BLOCK_END_OPCODES, BRANCH_OPCODES, ControlFlow, analyse_control_flow, branch_target, label_name
+)
+from validator import Violation, validate_instruction_words
 
 # Version of the disassembler
-VERSION = "1.0.0"
+VERSION = "1.1.0"
+
+# Words read per chunk and lines written per flush in streaming mode
+STREAM_CHUNK_WORDS = 1 << 16
+STREAM_FLUSH_LINES = 1 << 14
+
+# Addressing mode of a direct memory operand
+MEM_MODE = REVERSE_ADDRESSING_MODE_LUT["MEM"]
+
+# ROM files picked up from a batch directory and the suffix of their output
+BATCH_ROM_SUFFIX = ".bin"
+BATCH_OUTPUT_SUFFIX = ".asm"
+
+# Raw sidecar of an InstructionStream: magic, version, base PC, instruction and operand counts
+STREAM_SIDECAR_MAGIC = b"VFIS"
+STREAM_SIDECAR_VERSION = 1
+STREAM_SIDECAR_HEADER = struct.Struct("<4sIQQQ")
+
+# Typecode of the uint32 operand offsets of an InstructionStream
+OFFSET_TYPECODE = 'I' if array('I').itemsize == 4 else 'L'
+
+# Bit layout of an instruction word: field -> (shift, mask)
+INSTRUCTION_LAYOUT: Dict[str, Tuple[int, int]] = {
+    "DESIGNATION": (0, 0xF),         # bits 0–3
+    "OPCODE": (4, 0xFFFF),           # bits 4–19 (16 bits)
+    "OPERAND_COUNT": (20, 0xF),      # bits 20–23
+    "MODE1": (24, 0xF),              # bits 24–27
+    "MODE2": (28, 0xF),              # bits 28–31
+    "MODE3": (32, 0xF),              # bits 32–35
+    "RESERVED": (36, 0xFFFFFFF)      # bits 36–63 (28 bits)
+}
+
+# Keys of the lookup tables, for the dummy generators
+OPCODE_CODES: Tuple[int, ...] = tuple(OPCODE_LUT)
+ADDRESSING_MODE_CODES: Tuple[int, ...] = tuple(ADDRESSING_MODE_LUT)
+REGISTER_CODES: Tuple[int, ...] = tuple(REGISTER_LUT)
+
+# Operand mixes of generated ROMs: any opcode with 0-3 operands of any mode,
+# or only operand counts and modes instruction-table.md allows
+DUMMY_MIXES = ("any", "valid")
+
+# Sources of generated operand words: a 32-bit value, a register index or a port
+OPERAND_VALUE = 0
+OPERAND_REGISTER = 1
+OPERAND_PORT = 2
+OPERAND_SOURCES: Dict[int, int] = {
+    REVERSE_ADDRESSING_MODE_LUT["IMM"]: OPERAND_VALUE,
+    REVERSE_ADDRESSING_MODE_LUT["REG"]: OPERAND_REGISTER,
+    REVERSE_ADDRESSING_MODE_LUT["MEM"]: OPERAND_VALUE,
+    REVERSE_ADDRESSING_MODE_LUT["IND"]: OPERAND_REGISTER,
+    REVERSE_ADDRESSING_MODE_LUT["PORT"]: OPERAND_PORT,
+}
 
 class ROMHeader (NamedTuple):
     """A simple ROM header structure."""
@@ -28,15 +102,31 @@ Usage: disassembler <command> [arguments]
 
 Commands:
 \t--create-dummy <out.bin>       Create a dummy ROM file with random data (not a valid ROM).
+\t--seed <n>                     With --create-dummy, seed for a reproducible ROM (ROM i of a batch uses n + i).
+\t--instructions <n>             With --create-dummy, number of instructions (default: 10-20).
+\t--mix <any|valid>              With --create-dummy, any operand modes or only those instruction-table.md allows.
+\t--opcode-weights <w>           With --create-dummy, weights such as "mov=4,add=2" (unlisted opcodes are left out).
+\t--mode-weights <w>             With --create-dummy, weights such as "REG=3,IMM=1" (unlisted modes weigh 1).
+\t--count <n>                    With --create-dummy, write n ROMs into the <out> directory in parallel.
 \t--debug <out.bin>              Show debug view of a ROM file.
-\t--disassembly <source> <out>   Generate an assembly file from a ROM (no labels except main).
+\t--validate <rom.bin>           Check every instruction against instruction-table.md and list violations.
+\t--disassembly <source> <out>   Generate an assembly file from a ROM (labels for direct branch targets).
+\t--stream                       With --disassembly, stream the ROM using bounded memory.
+\t--batch <dir|manifest>         Disassemble many ROMs in parallel, writing .asm files next to them.
+\t--jobs <n>                     With --batch or --count, number of worker processes (default: CPU count).
+\t--no-cache                     Always decode the ROM instead of reusing cached output.
 \t--version                      Show version number.
 \t--help                         Show this help message.
 
 Examples:
 \tdisassembler --create-dummy test.bin
+\tdisassembler --create-dummy big.bin --seed 1 --instructions 5000000 --mix valid
+\tdisassembler --create-dummy corpus/ --count 1000 --seed 7 --opcode-weights "mov=4,add=2,jmp=1"
 \tdisassembler --debug test.bin
+\tdisassembler --validate test.bin
 \tdisassembler --disassembly test.bin out.asm
+\tdisassembler --disassembly huge.bin out.asm --stream
+\tdisassembler --batch roms/ --jobs 8
 """)
 
 def main() -> None:
@@ -44,8 +134,19 @@ def main() -> None:
     parser = argparse.ArgumentParser(add_help=False)
 
     parser.add_argument('--create-dummy', nargs=1)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--instructions', type=int)
+    parser.add_argument('--mix', choices=DUMMY_MIXES, default="any")
+    parser.add_argument('--opcode-weights')
+    parser.add_argument('--mode-weights')
+    parser.add_argument('--count', type=int, default=0)
     parser.add_argument('--debug', nargs=1)
+    parser.add_argument('--validate', nargs=1)
     parser.add_argument('--disassembly', nargs=2)
+    parser.add_argument('--stream', action='store_true')
+    parser.add_argument('--batch', nargs=1)
+    parser.add_argument('--jobs', type=int, default=0)
+    parser.add_argument('--no-cache', action='store_true')
     parser.add_argument('--version', action='store_true')
     parser.add_argument('--help', action='store_true')
 
@@ -56,18 +157,38 @@ def main() -> None:
 
     args = parser.parse_args()
 
+    cache: Optional[OutputCache] = None if args.no_cache else OutputCache(VERSION)
+
     if args.help:
         show_help()
     elif args.version:
         print(f"disassembler version {VERSION}")
     elif args.create_dummy:
-        create_dummy_rom(args.create_dummy[0])
+        try:
+            opcode_weights = parse_weights(args.opcode_weights) if args.opcode_weights else None
+            mode_weights = parse_weights(args.mode_weights) if args.mode_weights else None
+            if args.count:
+                create_dummy_batch(args.create_dummy[0], args.count, args.instructions, args.seed or 0,
+                                   args.mix, opcode_weights, mode_weights, args.jobs)
+            else:
+                create_dummy_rom(args.create_dummy[0], args.instructions, args.seed,
+                                 args.mix, opcode_weights, mode_weights)
+        except ValueError as error:
+            print(f"Error: {error}")
+            sys.exit(1)
     elif args.debug:
-        debug_read_rom(args.debug[0])
+        debug_read_rom(args.debug[0], cache)
+    elif args.validate:
+        validate_rom_file(args.validate[0])
+    elif args.batch:
+        disassemble_batch(args.batch[0], args.jobs, args.stream, cache)
     elif args.disassembly:
         # raise NotImplementedError("Disassembly functionality is not implemented yet.")
         source, output = args.disassembly
-        disassemble_rom(source, output)
+        if args.stream:
+            disassemble_rom_stream(source, output, cache)
+        else:
+            disassemble_rom(source, output, cache)
     else:
         print("Invalid command. Use --help to see usage.")
         sys.exit(1)
@@ -106,6 +227,62 @@ def read_rom_header(file: BufferedReader) -> ROMHeader:
 
     return ROMHeader(magic_number, version, data_start, code_start)
 
+class ROMImage:
+    """
+    A memory-mapped, zero-copy view of a ROM file.
+
+    The data and code sections are exposed as sequences of 64-bit words backed
+    directly by the mapped file, so no per-word Python objects are created
+    until a word is actually indexed. Use as a context manager so the mapping
+    is released once the views are no longer needed.
+    """
+
+    def __init__(self, filename: str) -> None:
+        with open(filename, 'rb') as f:
+            self.header: ROMHeader = read_rom_header(f)
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        size = len(self._mmap)
+        data_start = min(self.header.data_start, size)
+        code_start = min(max(self.header.code_start, data_start), size)
+
+        # Only whole words are part of a section
+        data_end = data_start + ((code_start - data_start) // 8) * 8
+        code_end = code_start + ((size - code_start) // 8) * 8
+
+        self._raw = memoryview(self._mmap)
+        self.data_section: Sequence[int] = _word_view(self._raw[data_start:data_end])
+        self.code_section: Sequence[int] = _word_view(self._raw[code_start:code_end])
+
+    def close(self) -> None:
+        """Release the section views and unmap the file."""
+        for view in (self.data_section, self.code_section):
+            if isinstance(view, memoryview):
+                view.release()
+        self._raw.release()
+
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Slices still held by the caller keep the mapping alive until collected
+            pass
+
+    def __enter__(self) -> "ROMImage":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+def _word_view(raw: memoryview) -> Sequence[int]:
+    """View little-endian bytes as unsigned 64-bit words without copying."""
+    if sys.byteorder == 'little':
+        return raw.cast('Q')
+
+    # Big-endian hosts cannot reinterpret the mapping in place
+    words = array('Q', raw.tobytes())
+    words.byteswap()
+    return words
+
 def create_dummy_pack(instruction: int) -> List[int]:
     """Create dummy operands for the dummy instruction."""
     dummy_pack: List[int] = [instruction]
@@ -127,13 +304,13 @@ def create_dummy_pack(instruction: int) -> List[int]:
             dummy_pack.append(random.randint(0, 0xFFFFFFFF))
         # Check for REG
         if modes[i] == 0x2:
-            dummy_pack.append(random.choice(list(REGISTER_LUT.keys())))
+            dummy_pack.append(random.choice(REGISTER_CODES))
         # Check for MEM
         if modes[i] == 0x3:
             dummy_pack.append(random.randint(0, 0xFFFFFFFF))
         # Check for IND
         if modes[i] == 0x4:
-            dummy_pack.append(random.choice(list(REGISTER_LUT.keys())))
+            dummy_pack.append(random.choice(REGISTER_CODES))
         # Check for PORT
         if modes[i] == 0x5:
             dummy_pack.append(random.randint(0, 16))
@@ -149,15 +326,15 @@ def create_dummy_instruction() -> int:
     designation: int = 0xF  # Instruction prefix
 
     # Random opcode
-    opcode: int = random.choice(list(OPCODE_LUT.keys()))
+    opcode: int = random.choice(OPCODE_CODES)
 
     # Random operand count (0-3)
     operand_count = random.randint(0, 3)
 
     # Random addressing modes for operands
-    mode1: int = random.choice(list(ADDRESSING_MODE_LUT.keys())) if operand_count > 0 else 0
-    mode2: int = random.choice(list(ADDRESSING_MODE_LUT.keys())) if operand_count > 1 else 0
-    mode3: int = random.choice(list(ADDRESSING_MODE_LUT.keys())) if operand_count > 2 else 0
+    mode1: int = random.choice(ADDRESSING_MODE_CODES) if operand_count > 0 else 0
+    mode2: int = random.choice(ADDRESSING_MODE_CODES) if operand_count > 1 else 0
+    mode3: int = random.choice(ADDRESSING_MODE_CODES) if operand_count > 2 else 0
 
     # Check none are zero if operand count is greater than 0
     if operand_count > 0:
@@ -198,71 +375,317 @@ def decode_instruction(instruction: int) -> Dict[str, int]:
             - reserved (int)
     """
 
-    designation    = instruction & 0xF                  # bits 0–3
-    opcode         = (instruction >> 4) & 0xFFFF         # bits 4–19 (16 bits)
-    operand_count  = (instruction >> 20) & 0xF           # bits 20–23
-    mode1          = (instruction >> 24) & 0xF           # bits 24–27
-    mode2          = (instruction >> 28) & 0xF           # bits 28–31
-    mode3          = (instruction >> 32) & 0xF           # bits 32–35
-    reserved       = (instruction >> 36) & 0xFFFFFFF     # bits 36–63 (28 bits)
-
     return {
-        "DESIGNATION": designation,
-        "OPCODE": opcode,
-        "OPERAND_COUNT": operand_count,
-        "MODE1": mode1,
-        "MODE2": mode2,
-        "MODE3": mode3,
-        "RESERVED": reserved
+        field: (instruction >> shift) & mask
+        for field, (shift, mask) in INSTRUCTION_LAYOUT.items()
     }
 
+class DecodedColumns(NamedTuple):
+    """A decoded code section stored as one array per instruction field."""
+    designation: array    # 'B'
+    opcode: array         # 'H'
+    operand_count: array  # 'B'
+    mode1: array          # 'B'
+    mode2: array          # 'B'
+    mode3: array          # 'B'
+    reserved: array       # 'L'
+    starts: array         # 'Q', word index of each instruction in the code section
+
+def find_instruction_words(code_section: Sequence[int]) -> array:
+    """Collect the instruction words of a code section, skipping operands."""
+    shift, mask = INSTRUCTION_LAYOUT["OPERAND_COUNT"]
+    words = array('Q')
+    append = words.append
+
+    index: int = 0
+    length: int = len(code_section)
+    while index < length:
+        word = code_section[index]
+        append(word)
+        index += ((word >> shift) & mask) + 1
+
+    if index > length:
+        raise ValueError("Code section ends in the middle of an instruction's operands.")
+
+    return words
+
+def decode_columns(code_section: Sequence[int]) -> DecodedColumns:
+    """
+    Decode a whole code section at once into per-field column arrays.
+
+    Args:
+        code_section (Sequence[int]): The code section as 64-bit words.
+
+    Returns:
+        DecodedColumns: One entry per instruction for every field of
+        INSTRUCTION_LAYOUT, plus the word offset each instruction starts at.
+    """
+    words = find_instruction_words(code_section)
+
+    def column(field: str, typecode: str) -> array:
+        shift, mask = INSTRUCTION_LAYOUT[field]
+        return array(typecode, [(word >> shift) & mask for word in words])
+
+    operand_count = column("OPERAND_COUNT", 'B')
+
+    # Each instruction occupies one word plus its operands
+    starts = array('Q', accumulate((count + 1 for count in operand_count), initial=0))
+    starts.pop()
+
+    return DecodedColumns(
+        designation=column("DESIGNATION", 'B'),
+        opcode=column("OPCODE", 'H'),
+        operand_count=operand_count,
+        mode1=column("MODE1", 'B'),
+        mode2=column("MODE2", 'B'),
+        mode3=column("MODE3", 'B'),
+        reserved=column("RESERVED", 'L'),
+        starts=starts
+    )
+
 def create_dummy_data_section(length: int) -> List[int]:
     """Create a dummy data section with random values."""
     return [random.randint(0, 0xFFFFFFFF) for _ in range(length)]
 
-def write_rom(data_section: List[int], code_packs: List[List[int]], filename: str) -> None:
-    """Write the ROM data and instruction packs to a file."""
+def write_rom(data_section: Sequence[int], code_packs: Sequence[Sequence[int]], filename: str) -> None:
+    """Write the ROM data and instruction packs to a file in a single buffered write."""
+    # Offset after the header
+    offset_bytes: int = 4 + 4 + 8 + 8
+
+    # Data offset
+    data_start: int = offset_bytes
+
+    # Code offset
+    code_start: int = data_start + (len(data_section) * 8)
+
+    # Gather the data section and every instruction pack into one word array
+    words = array('Q', data_section)
+    for pack in code_packs:
+        words.extend(pack)
+    if sys.byteorder == 'big':
+        words.byteswap()
+
+    # Write the ROM header into the same buffer
+    buffer = io.BytesIO()
+    write_rom_header(buffer, data_start, code_start)
+    buffer.write(words)
+
     with open(filename, 'wb') as f:
-        # Offset after the header
-        offset_bytes: int = 4 + 4 + 8 + 8
+        f.write(buffer.getbuffer())
 
-        # Data offset
-        data_start: int = offset_bytes
+class InstructionForm(NamedTuple):
+    """An instruction word and the source of each of its operands, for the ROM generator."""
+    instruction: int
+    sources: Tuple[int, ...]  # OPERAND_VALUE, OPERAND_REGISTER or OPERAND_PORT per operand
+
+def encode_instruction(opcode: int, modes: Sequence[int]) -> int:
+    """Encode an instruction word with one operand per mode."""
+    word = INSTRUCTION_LAYOUT["DESIGNATION"][1] | opcode << INSTRUCTION_LAYOUT["OPCODE"][0]
+    word |= len(modes) << INSTRUCTION_LAYOUT["OPERAND_COUNT"][0]
+    for field, mode in zip(("MODE1", "MODE2", "MODE3"), modes):
+        word |= mode << INSTRUCTION_LAYOUT[field][0]
+    return word
+
+def instruction_forms(mix: str = "any", opcode_weights: Optional[Dict[str, float]] = None,
+                      mode_weights: Optional[Dict[str, float]] = None) -> Tuple[List[InstructionForm], List[float]]:
+    """
+    List every instruction form a ROM mix can contain, with its probability weight.
 
-        # Code offset
-        code_start: int = data_start + (len(data_section) * 8)
+    Args:
+        mix (str): "any" for 0-3 operands of any non-NULL mode, or "valid" for
+            the operand counts and modes of instruction-table.md.
+        opcode_weights (Optional[Dict[str, float]]): Relative weight per mnemonic;
+            unlisted opcodes weigh 1, or 0 if any weight is given as a filter.
+        mode_weights (Optional[Dict[str, float]]): Relative weight per addressing
+            mode name; unlisted modes weigh 1.
 
-        # Write the ROM header
-        write_rom_header(f, data_start, code_start)
+    Returns:
+        Tuple[List[InstructionForm], List[float]]: The forms and their weights.
 
-        # Write data section
-        for value in data_section:
-            f.write(value.to_bytes(8, byteorder='little'))
+    Raises:
+        ValueError: If the mix, a mnemonic or a mode name is unknown, or every weight is zero.
+    """
+    if mix not in DUMMY_MIXES:
+        raise ValueError(f"Unknown instruction mix '{mix}'.")
+    unknown = [name for name in opcode_weights or {} if name not in OPCODE_LUT.values()]
+    unknown += [name for name in mode_weights or {} if name not in REVERSE_ADDRESSING_MODE_LUT]
+    if unknown:
+        raise ValueError(f"Unknown instruction or addressing mode '{unknown[0]}'.")
+
+    operand_modes = [mode for mode in ADDRESSING_MODE_CODES if mode in OPERAND_SOURCES]
+    mode_weight = {mode: (mode_weights or {}).get(ADDRESSING_MODE_LUT[mode], 1.0) for mode in operand_modes}
+
+    forms: List[InstructionForm] = []
+    weights: List[float] = []
+    for opcode, name in OPCODE_LUT.items():
+        weight = opcode_weights.get(name, 0.0) if opcode_weights else 1.0
+        if weight <= 0:
+            continue
+
+        # Every operand count and mode combination this opcode may take
+        if mix == "valid":
+            spec = OPERAND_TABLE[name]
+            slots = [[mode for mode in operand_modes if allowed >> mode & 1] for allowed in spec.modes]
+            counts = range(spec.min_operands, len(spec.modes) + 1)
+        else:
+            slots = [operand_modes] * 3
+            counts = range(0, 4)
+        combinations = [()]
+        shapes: List[Tuple[int, ...]] = []
+        for count in range(0, max(counts, default=0) + 1):
+            if count in counts:
+                shapes.extend(combinations)
+            if count < len(slots):
+                combinations = [modes + (mode,) for modes in combinations for mode in slots[count]]
+
+        # Share the opcode's weight between its forms in proportion to their mode weights
+        shape_weights = [_product(mode_weight[mode] for mode in modes) for modes in shapes]
+        total = sum(shape_weights)
+        for modes, shape_weight in zip(shapes, shape_weights):
+            if shape_weight > 0:
+                forms.append(InstructionForm(encode_instruction(opcode, modes),
+                                             tuple(OPERAND_SOURCES[mode] for mode in modes)))
+                weights.append(weight * shape_weight / total)
+
+    if not forms:
+        raise ValueError("The instruction mix has no instructions with a nonzero weight.")
+    return forms, weights
+
+def _product(values: Iterator[float]) -> float:
+    result = 1.0
+    for value in values:
+        result *= value
+    return result
+
+def generate_code_section(rng: random.Random, instructions: int,
+                          forms: Sequence[InstructionForm], weights: Sequence[float]) -> array:
+    """
+    Generate a code section of random instructions.
 
-        # Write instruction packs
-        for pack in code_packs:
-            for value in pack:
-                f.write(value.to_bytes(8, byteorder='little'))
+    Forms are drawn in one call and operand words come from bulk random
+    byte strings, so the per-instruction work is a few appends.
+
+    Args:
+        rng (random.Random): The seeded generator.
+        instructions (int): Number of instructions.
+        forms (Sequence[InstructionForm]): Forms to draw from, e.g. from instruction_forms.
+        weights (Sequence[float]): Weight of each form.
+
+    Returns:
+        array: 'Q', the code section words.
+    """
+    chosen = rng.choices(range(len(forms)), weights=weights, k=instructions)
+
+    # Draw enough operand words of each source up front
+    needed = [0, 0, 0]
+    for index, count in Counter(chosen).items():
+        for source in forms[index].sources:
+            needed[source] += count
+    values = array('I', rng.randbytes(4 * needed[OPERAND_VALUE]))
+    registers = rng.choices(REGISTER_CODES, k=needed[OPERAND_REGISTER])
+    ports = [byte & 0xF for byte in rng.randbytes(needed[OPERAND_PORT])]
+    draws = [iter(values).__next__, iter(registers).__next__, iter(ports).__next__]
+    table = [(form.instruction, tuple(draws[source] for source in form.sources)) for form in forms]
+
+    code = array('Q')
+    append = code.append
+    for index in chosen:
+        instruction, operand_draws = table[index]
+        append(instruction)
+        for draw in operand_draws:
+            append(draw())
+    return code
+
+def create_dummy_rom(filename: str, instructions: Optional[int] = None, seed: Optional[int] = None,
+                     mix: str = "any", opcode_weights: Optional[Dict[str, float]] = None,
+                     mode_weights: Optional[Dict[str, float]] = None, verbose: bool = True) -> int:
+    """
+    Create a dummy ROM file with random data and instructions.
+
+    Args:
+        filename (str): The ROM file to write.
+        instructions (Optional[int]): Number of instructions (default: 10-20).
+        seed (Optional[int]): Seed for a reproducible ROM (default: unseeded).
+        mix (str): "any" or "valid"; see instruction_forms.
+        opcode_weights (Optional[Dict[str, float]]): Relative weight per mnemonic.
+        mode_weights (Optional[Dict[str, float]]): Relative weight per addressing mode name.
+        verbose (bool): Print the sizes and a confirmation.
+
+    Returns:
+        int: Number of words written after the header.
+    """
+    rng = random.Random(seed)
+    forms, weights = instruction_forms(mix, opcode_weights, mode_weights)
 
-def create_dummy_rom(filename: str) -> None:
-    """Create a dummy ROM file with random data and instructions."""
     # Create a data section
-    data_section_length = random.randint(5, 15)  # Random length between 5 and 15
+    data_section_length = rng.randint(5, 15)  # Random length between 5 and 15
+    if instructions is None:
+        instructions = rng.randint(10, 20)
+
+    code_section = generate_code_section(rng, instructions, forms, weights)
+    data_section = array('I', rng.randbytes(4 * data_section_length))
+
+    if verbose:
+        # Print the number of instructions
+        print(f"Number of instructions: {instructions}")
+        # Print the data section length
+        print(f"Data section length: {data_section_length}")
+
+    # Write the ROM file in one buffer
+    write_rom(data_section, [code_section], filename)
+    if verbose:
+        print(f"Dummy ROM file '{filename}' created successfully.")
+    return len(data_section) + len(code_section)
+
+def _create_dummy_batch_entry(job: Tuple[str, Optional[int], int, str, Optional[Dict[str, float]],
+                                         Optional[Dict[str, float]]]) -> int:
+    filename, instructions, seed, mix, opcode_weights, mode_weights = job
+    return create_dummy_rom(filename, instructions, seed, mix, opcode_weights, mode_weights, verbose=False)
+
+def create_dummy_batch(directory: str, count: int, instructions: Optional[int] = None, seed: int = 0,
+                       mix: str = "any", opcode_weights: Optional[Dict[str, float]] = None,
+                       mode_weights: Optional[Dict[str, float]] = None, jobs: int = 0) -> List[str]:
+    """
+    Write a corpus of dummy ROMs in parallel, ROM i seeded with seed + i.
 
-    # Create a list of dummy instructions
-    instructions = [create_dummy_instruction() for _ in range(random.randint(10, 20))]
+    Args:
+        directory (str): Directory for the ROMs (created if missing).
+        count (int): Number of ROMs.
+        instructions (Optional[int]): Instructions per ROM (default: 10-20).
+        seed (int): Seed of the first ROM.
+        mix (str): "any" or "valid"; see instruction_forms.
+        opcode_weights (Optional[Dict[str, float]]): Relative weight per mnemonic.
+        mode_weights (Optional[Dict[str, float]]): Relative weight per addressing mode name.
+        jobs (int): Worker processes (default: CPU count).
 
-    # Print the number of instructions
-    print(f"Number of instructions: {len(instructions)}")
-    # Print the data section length
-    print(f"Data section length: {data_section_length}")
+    Returns:
+        List[str]: Paths of the ROMs written.
+    """
+    # Fail on a bad mix before starting workers
+    instruction_forms(mix, opcode_weights, mode_weights)
+
+    os.makedirs(directory, exist_ok=True)
+    width = max(len(str(count - 1)), 5)
+    paths = [os.path.join(directory, f"dummy_{index:0{width}d}{BATCH_ROM_SUFFIX}") for index in range(count)]
+    work = [(path, instructions, seed + index, mix, opcode_weights, mode_weights)
+            for index, path in enumerate(paths)]
+
+    with ProcessPoolExecutor(max_workers=jobs or None) as executor:
+        words = sum(executor.map(_create_dummy_batch_entry, work, chunksize=max(count // 64, 1)))
 
-    # Create dummy instruction packs
-    instruction_packs = [create_dummy_pack(instruction) for instruction in instructions]
+    print(f"Wrote {count} dummy ROMs ({words:,} words) to '{directory}'.")
+    return paths
 
-    # Write the ROM file
-    write_rom(create_dummy_data_section(data_section_length), instruction_packs, filename)
-    print(f"Dummy ROM file '{filename}' created successfully.")
+def parse_weights(text: str) -> Dict[str, float]:
+    """Parse "name=weight,name=weight" into a dict."""
+    weights: Dict[str, float] = {}
+    for item in text.split(','):
+        name, _, value = item.partition('=')
+        try:
+            weights[name.strip()] = float(value) if value else 1.0
+        except ValueError:
+            raise ValueError(f"Invalid weight '{item}'.") from None
+    return weights
 
 
 class PackedInstruction(NamedTuple):
@@ -270,25 +693,186 @@ class PackedInstruction(NamedTuple):
     instruction: int
     operands: List[int]
 
-def convert_to_instructions(code_section: List[int]) -> List[PackedInstruction]:
-    """Convert a list of 64-bit instructions into PackedInstructions."""
+def convert_to_instructions(code_section: Sequence[int], base: int = CODE_SEGMENT_START) -> "InstructionStream":
+    """
+    Convert a list of 64-bit instructions into PackedInstructions.
 
-    entries: List[PackedInstruction] = []
-    current_entry: int = 0
+    Args:
+        code_section (Sequence[int]): The code section as 64-bit words.
+        base (int): Address of the first code word, for lookups by PC.
 
-    while current_entry < len(code_section):
-        current_instruction: int = code_section[current_entry]
-        operand_count = get_instruction_operand_count(current_instruction)
-        operands: List[int] = []
-        for i in range(1, operand_count + 1):
-            operands.append(code_section[current_entry + i])
-        entries.append(PackedInstruction(current_instruction, operands))
+    Returns:
+        InstructionStream: A sequence of PackedInstruction backed by flat arrays.
+    """
+    return InstructionStream.from_code(code_section, base)
 
-        current_entry += (operand_count + 1)  # Move to the next instruction
+class InstructionStream:
+    """
+    A decoded program stored as a struct of arrays instead of one object per instruction.
 
-    return entries
+    Instruction i has header word headers[i] and the operands
+    operands[offsets[i]:offsets[i + 1]]. It starts offsets[i] + i words into
+    the code section, which gives its PC without storing it. Indexing and
+    iteration produce PackedInstruction values, so the stream can stand in
+    for a list of them.
+    """
+
+    def __init__(self, headers: array, offsets: array, operands: array, base: int = CODE_SEGMENT_START) -> None:
+        """
+        Wrap existing arrays.
+
+        Args:
+            headers (array): 'Q', the instruction word of each instruction.
+            offsets (array): 'I', uint32 index of each instruction's first operand, plus the total at the end.
+            operands (array): 'Q', every operand word, in program order.
+            base (int): Address of the first instruction.
+        """
+        self.headers = headers
+        self.offsets = offsets
+        self.operands = operands
+        self.base = base
+
+    @classmethod
+    def from_code(cls, code_section: Sequence[int], base: int = CODE_SEGMENT_START) -> "InstructionStream":
+        """Split a code section into header and operand arrays."""
+        headers = find_instruction_words(code_section)
+        shift, mask = INSTRUCTION_LAYOUT["OPERAND_COUNT"]
+        offsets = array(OFFSET_TYPECODE, accumulate(((word >> shift) & mask for word in headers), initial=0))
+
+        # Drop the instruction words, keeping the operand words in order
+        keep = bytearray(b"\x01") * len(code_section)
+        for index, offset in enumerate(offsets[:-1]):
+            keep[offset + index] = 0
+        operands = array('Q', compress(code_section, keep))
+
+        return cls(headers, offsets, operands, base)
+
+    def __len__(self) -> int:
+        return len(self.headers)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("InstructionStream slices must be contiguous.")
+            stop = max(start, stop)
+            first = self.offsets[start]
+            offsets = array(OFFSET_TYPECODE, [offset - first for offset in self.offsets[start:stop + 1]])
+            return InstructionStream(self.headers[start:stop], offsets,
+                                     self.operands[first:self.offsets[stop]], self.pc_of(start))
+
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("InstructionStream index out of range")
+        return PackedInstruction(self.headers[key], self.operands[self.offsets[key]:self.offsets[key + 1]].tolist())
+
+    def __iter__(self) -> Iterator[PackedInstruction]:
+        operands = self.operands
+        offsets = self.offsets
+        for index, header in enumerate(self.headers):
+            yield PackedInstruction(header, operands[offsets[index]:offsets[index + 1]].tolist())
+
+    def pc_of(self, index: int) -> int:
+        """Return the address of an instruction; len(self) gives the address just past the end."""
+        return self.base + self.offsets[index] + index
+
+    def index_of(self, pc: int) -> int:
+        """
+        Return the index of the instruction starting at an address.
+
+        Raises:
+            ValueError: If no instruction starts at the address.
+        """
+        offsets = self.offsets
+        target = pc - self.base
+        index = bisect_left(range(len(self)), target, key=lambda i: offsets[i] + i)
+        if index == len(self) or offsets[index] + index != target:
+            raise ValueError(f"No instruction starts at 0x{pc:X}.")
+        return index
+
+    def at_pc(self, pc: int) -> PackedInstruction:
+        """Return the instruction starting at an address."""
+        return self[self.index_of(pc)]
+
+    def save(self, filename: str) -> None:
+        """Write the arrays to a raw sidecar file."""
+        with open(filename, 'wb') as f:
+            f.write(STREAM_SIDECAR_HEADER.pack(STREAM_SIDECAR_MAGIC, STREAM_SIDECAR_VERSION,
+                                               self.base, len(self.headers), len(self.operands)))
+            for words in (self.headers, self.offsets, self.operands):
+                if sys.byteorder == 'big':
+                    words = array(words.typecode, words)
+                    words.byteswap()
+                f.write(words)
+
+    @classmethod
+    def load(cls, filename: str) -> "InstructionStream":
+        """
+        Read a sidecar file written by save.
+
+        Raises:
+            ValueError: If the file is not an instruction stream sidecar.
+        """
+        with open(filename, 'rb') as f:
+            header = f.read(STREAM_SIDECAR_HEADER.size)
+            if len(header) < STREAM_SIDECAR_HEADER.size:
+                raise ValueError("Invalid instruction stream file.")
+            magic, version, base, count, operand_count = STREAM_SIDECAR_HEADER.unpack(header)
+            if magic != STREAM_SIDECAR_MAGIC or version != STREAM_SIDECAR_VERSION:
+                raise ValueError("Invalid instruction stream file.")
+
+            arrays = []
+            for typecode, length in (('Q', count), (OFFSET_TYPECODE, count + 1), ('Q', operand_count)):
+                words = array(typecode)
+                words.fromfile(f, length)
+                if sys.byteorder == 'big':
+                    words.byteswap()
+                arrays.append(words)
+
+        return cls(arrays[0], arrays[1], arrays[2], base)
+
+def validate_rom(filename: str) -> Tuple[int, List[Violation]]:
+    """
+    Check every instruction of a ROM against the operand rules of instruction-table.md.
+
+    Args:
+        filename (str): The ROM file.
+
+    Returns:
+        Tuple[int, List[Violation]]: The number of instructions, and every violation in order.
+
+    Raises:
+        ValueError: If the file is not a ROM or its code section ends inside an instruction.
+    """
+    with ROMImage(filename) as rom:
+        words = find_instruction_words(rom.code_section)
+    return len(words), validate_instruction_words(words)
+
+def validate_rom_file(filename: str) -> None:
+    """Validate a ROM and print its violations, exiting with status 1 if there are any."""
+    start = time.perf_counter()
+    try:
+        instructions, violations = validate_rom(filename)
+    except FileNotFoundError:
+        print(f"Error: File '{filename}' not found.")
+        sys.exit(1)
+    except ValueError as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    out = sys.stdout
+    for violation in violations:
+        out.write(f"Instruction {violation.index} at PC 0x{violation.pc:X}: {violation.message}\n")
+
+    flagged = len({violation.index for violation in violations})
+    print(f"Validated {instructions:,} instructions in {elapsed:.3f}s: "
+          f"{len(violations):,} violations in {flagged:,} instructions.")
+    if violations:
+        sys.exit(1)
 
-def debug_read_rom(filename: str) -> None:
+def debug_read_rom(filename: str, cache: Optional[OutputCache] = None) -> None:
     """Read and print the ROM header and contents for debugging."""
 
     # Check if the file exists
@@ -299,92 +883,359 @@ def debug_read_rom(filename: str) -> None:
         print(f"Error: File '{filename}' not found.")
         sys.exit(1)
 
-    with open(filename, 'rb') as f:
-        header = read_rom_header(f)
-        print("---- ROM Header ----")
-        print(f"Magic Number: {header.magic_number.decode('ascii')}")
-        print(f"Version: {header.version}")
-        print(f"Data Start: {header.data_start:#x}")
-        print(f"Code Start: {header.code_start:#x}")
-        print("---- End of ROM Header ----")
+    if cache is None:
+        write_debug_view(filename, sys.stdout)
+        return
+
+    key = cache.key(filename, "debug")
+    cached = cache.lookup(key)
+    if cached is not None:
+        _copy_to_stdout(cached)
+    else:
+        fd, temp_path = tempfile.mkstemp(suffix=".out")
+        with os.fdopen(fd, 'w', encoding='utf-8') as out:
+            write_debug_view(filename, out)
+        _copy_to_stdout(temp_path)
+
+        cache.store(key, temp_path, move=True)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    # Keep the debug view itself identical whether or not it was cached
+    print(cache.summary(), file=sys.stderr)
+
+def _copy_to_stdout(path: str) -> None:
+    """Copy a text file to standard output."""
+    with open(path, 'r', encoding='utf-8') as text:
+        shutil.copyfileobj(text, sys.stdout)
+    sys.stdout.flush()
+
+def write_debug_view(filename: str, out: TextIO) -> None:
+    """Write the debug view of a ROM file."""
+    with ROMImage(filename) as rom:
+        header = rom.header
+        out.write("---- ROM Header ----\n")
+        out.write(f"Magic Number: {header.magic_number.decode('ascii')}\n")
+        out.write(f"Version: {header.version}\n")
+        out.write(f"Data Start: {header.data_start:#x}\n")
+        out.write(f"Code Start: {header.code_start:#x}\n")
+        out.write("---- End of ROM Header ----\n")
 
         # Data section
-        print("---- Data Section ----")
-        f.seek(header.data_start)
-        data_section: List[int] = []
-
-        # Read until we reach the code section
-        address: int = 0
-        while f.tell() < header.code_start:
-            data_value = int.from_bytes(f.read(8), 'little')
-            data_section.append(data_value)
-            print(f"${address:#x}: {data_value:#x} ({data_value})")
-            address += 1
-        print("---- End of Data Section ----")
+        out.write("---- Data Section ----\n")
+        for address, data_value in enumerate(rom.data_section):
+            out.write(f"${address:#x}: {data_value:#x} ({data_value})\n")
+        out.write("---- End of Data Section ----\n")
 
         # Code section
-        print("---- Code Section ----")
-        f.seek(header.code_start)
+        out.write("---- Code Section ----\n")
+        code_section = rom.code_section
+
+        # Decode the whole code section at once
+        columns: DecodedColumns = decode_columns(code_section)
+
+        out.writelines(debug_lines(columns, code_section))
+
+        out.write("---- End of Code Section ----\n")
+
+def format_assembly_line(opcode_bits: int, modes: Sequence[int], operands: Sequence[int]) -> str:
+    """Format a single instruction as a line of assembly source."""
+    if not operands:
+        return f"{assembly_prefix(opcode_bits)}\n"
+    return f"{assembly_prefix(opcode_bits)} {format_operands(ASSEMBLY_OPERAND_FORMATTERS, modes, operands)}\n"
+
+def assembly_lines(columns: DecodedColumns, code_section: Sequence[int]) -> Iterator[str]:
+    """Format every instruction of a decoded code section as assembly source."""
+    fmt = ASSEMBLY_OPERAND_FORMATTERS
+
+    for opcode, count, mode1, mode2, mode3, start in zip(
+            columns.opcode, columns.operand_count,
+            columns.mode1, columns.mode2, columns.mode3, columns.starts):
+        prefix = ASSEMBLY_PREFIX.get(opcode) or assembly_prefix(opcode)
+
+        if count == 0:
+            yield f"{prefix}\n"
+        elif count == 1:
+            yield f"{prefix} {fmt[mode1](code_section[start + 1])}\n"
+        elif count == 2:
+            yield (f"{prefix} {fmt[mode1](code_section[start + 1])}, "
+                   f"{fmt[mode2](code_section[start + 2])}\n")
+        elif count == 3:
+            yield (f"{prefix} {fmt[mode1](code_section[start + 1])}, "
+                   f"{fmt[mode2](code_section[start + 2])}, "
+                   f"{fmt[mode3](code_section[start + 3])}\n")
+        else:
+            yield format_assembly_line(
+                opcode, (mode1, mode2, mode3), code_section[start + 1:start + 1 + count])
+
+def format_branch_line(opcode_bits: int, modes: Sequence[int], operands: Sequence[int],
+                       labels: Dict[int, str]) -> Optional[str]:
+    """Format a branch or call whose direct target has a label, or return None."""
+    target = branch_target(opcode_bits, len(operands), modes[0], operands[0]) if operands else None
+    label = labels.get(target) if target is not None else None
+    if label is None:
+        return None
+
+    target_text = f"[{label}]" if modes[0] == MEM_MODE else label
+    if len(operands) == 1:
+        return f"{assembly_prefix(opcode_bits)} {target_text}\n"
+
+    rest = format_operands(ASSEMBLY_OPERAND_FORMATTERS, modes[1:], operands[1:])
+    return f"{assembly_prefix(opcode_bits)} {target_text}, {rest}\n"
+
+def labelled_assembly_lines(columns: DecodedColumns, code_section: Sequence[int],
+                            flow: ControlFlow) -> Iterator[str]:
+    """
+    Format a decoded code section with its basic blocks and synthesized labels.
 
-        code_section: List[int] = []
+    Blocks are separated by a blank line and branch targets are replaced by
+    their labels. The label at offset 0 is the entry point, written by the caller.
+    """
+    labels = flow.labels
+    block_starts = iter(flow.block_starts)
+    next_block = next(block_starts, -1)
+
+    for index, (line, opcode, count, mode1, mode2, mode3, start) in enumerate(zip(
+            assembly_lines(columns, code_section), columns.opcode, columns.operand_count,
+            columns.mode1, columns.mode2, columns.mode3, columns.starts)):
+        if index == next_block:
+            next_block = next(block_starts, -1)
+            if index:
+                yield "\n"
+                label = labels.get(start)
+                if label is not None:
+                    yield f"{label}:\n"
+
+        if count and opcode in BRANCH_OPCODES:
+            branch_line = format_branch_line(
+                opcode, (mode1, mode2, mode3), code_section[start + 1:start + 1 + count], labels)
+            if branch_line is not None:
+                line = branch_line
+
+        yield line
+
+def debug_lines(columns: DecodedColumns, code_section: Sequence[int]) -> Iterator[str]:
+    """Format every instruction of a decoded code section for the debug view."""
+    fmt = DEBUG_OPERAND_FORMATTERS
+
+    for index, (opcode, count, mode1, mode2, mode3, start) in enumerate(zip(
+            columns.opcode, columns.operand_count,
+            columns.mode1, columns.mode2, columns.mode3, columns.starts)):
+        modes = (mode1, mode2, mode3)
+        operands = format_operands(fmt, modes, [code_section[start + 1 + j] for j in range(count)])
+
+        yield (f"{index:#x}: {mnemonic_text(opcode)} "
+               f"{MODE_TRIPLE_TEXT[mode1 | (mode2 << 4) | (mode3 << 8)]} "
+               f"Operands ({count}): {operands}\n")
+
+def disassembly_title(source_file: str) -> str:
+    """Return the first line of a disassembly, the only one naming the ROM file."""
+    return f"; Disassembly of ROM file: {source_file}\n"
+
+def write_disassembly_preamble(out: TextIO, source_file: str, header: ROMHeader, entry_point: str) -> None:
+    """Write the comment banner and meta section of a disassembly."""
+    out.write(disassembly_title(source_file))
+    out.write(f"; ROM format version: {header.version}\n")
+    out.write(f"; Generated by disassembler version {VERSION}\n")
+    out.write("\n")
+
+    # Caveat
+    out.write("; Note: Labels are synthesized for direct (IMM/MEM) branch and call targets only.\n")
+    out.write("; Register and indirect targets are left as raw values and may need manual labels.\n")
+    out.write("\n")
+
+    # Write meta section
+    out.write("section meta\n")
+    out.write(f"@meta version: {header.version}.0\n")
+    out.write(f"@meta entry: {entry_point}\n")
+    out.write("\n")
+
+def cached_disassembly(write: Callable[[str, str], int], source_file: str, output_file: str,
+                       cache: Optional[OutputCache], evict: bool = True) -> int:
+    """
+    Run a disassembly writer through the output cache.
 
-        # Load the code section until EOF
-        while True:
-            code_bytes = f.read(8)
-            if not code_bytes:
-                break
-            code_section.append(int.from_bytes(code_bytes, 'little'))
+    Args:
+        write (Callable[[str, str], int]): write_disassembly or write_disassembly_stream.
+        source_file (str): Path of the ROM file.
+        output_file (str): Path of the assembly file to write.
+        cache (Optional[OutputCache]): The cache to use, or None to always disassemble.
+        evict (bool): Evict old cache entries after storing a new one.
 
-        # Convert code section to instructions
-        packs: List[PackedInstruction] = convert_to_instructions(code_section)
+    Returns:
+        int: Number of instructions decoded (0 when served from the cache).
+    """
+    if cache is None:
+        return write(source_file, output_file)
+
+    key = cache.key(source_file, "disassembly")
+    cached = cache.lookup(key)
+    if cached is not None:
+        with open(cached, 'r', encoding='utf-8') as entry, \
+                open(output_file, 'w', encoding='utf-8') as out:
+            # The cached text may come from a copy of the ROM at another path
+            entry.readline()
+            out.write(disassembly_title(source_file))
+            shutil.copyfileobj(entry, out)
+        return 0
+
+    instructions = write(source_file, output_file)
+    cache.store(key, output_file, evict=evict)
+    return instructions
+
+def disassemble_rom(source_file: str, output_file: str, cache: Optional[OutputCache] = None) -> None:
+    """Disassemble a ROM file into assembly source code."""
 
-        for i, pack in enumerate(packs):
-            decoded = decode_instruction(pack.instruction)
+    # Check if the file exists
+    try:
+        with open(source_file, 'rb') as f:
+            pass
+    except FileNotFoundError:
+        print(f"Error: File '{source_file}' not found.")
+        sys.exit(1)
 
-            # Decode the opcode and addressing modes
-            opcode_str = binary_to_opcode(decoded['OPCODE'])
-            mode1 = decoded['MODE1']
-            mode2 = decoded['MODE2']
-            mode3 = decoded['MODE3']
-            modes = [mode1, mode2, mode3]
-
-            # Format operands based on their addressing modes
-            formatted_operands: List[str] = []
-            for idx in range(decoded["OPERAND_COUNT"]):
-                operand = pack.operands[idx]
-                mode = modes[idx]
-
-                if code_to_addressing_mode(mode) == "REG":
-                    formatted = binary_to_register(operand)
-                elif code_to_addressing_mode(mode) == "IND":
-                    formatted = f"[{binary_to_register(operand)}]"
-                elif code_to_addressing_mode(mode) == "MEM":
-                    formatted = f"[{operand:#x}]"
-                elif code_to_addressing_mode(mode) == "IMM":
-                    formatted = f"#{operand:#x}"
-                elif code_to_addressing_mode(mode) == "PORT":
-                    formatted = f"PORT_{operand}"
-                else:
-                    formatted = f"{operand:#x}"
+    cached_disassembly(write_disassembly, source_file, output_file, cache)
+    print(f"Disassembly written to '{output_file}'.")
+    if cache is not None:
+        print(cache.summary())
 
-                formatted_operands.append(formatted)
+def write_disassembly(source_file: str, output_file: str) -> int:
+    """Disassemble a ROM file and return the number of instructions written."""
 
-            # Final printout
-            print(
-                f"{i:#x}: {opcode_str} "
-                f"({code_to_addressing_mode(mode1)} ",
-                f"{code_to_addressing_mode(mode2)} ",
-                f"{code_to_addressing_mode(mode3)}) "
-                f"Operands ({decoded['OPERAND_COUNT']}): {', '.join(formatted_operands)}"
-            )
+    entry_point: str = "_start_of_assembly_"
+    data_name: str = "data_"
 
-        print("---- End of Code Section ----")
+    with ROMImage(source_file) as rom:
+        header = rom.header
+        data_section = rom.data_section
+        code_section = rom.code_section
 
-def disassemble_rom(source_file: str, output_file: str) -> None:
-    """Disassemble a ROM file into assembly source code."""
+        # Decode code instructions
+        columns: DecodedColumns = decode_columns(code_section)
 
-    entry_point: str = "_start_of_assembly_"
-    data_name: str = "data_"
+        # ---- Write Disassembled Output ----
+        with open(output_file, 'w', encoding='utf-8') as out:
+            write_disassembly_preamble(out, source_file, header, entry_point)
+
+            # Write data section
+            out.write("section data\n")
+            count: int = 0
+            for value in data_section:
+                out.write(f"@real {data_name}{count}: {value}\n")
+                count += 1
+            out.write("\n")
+
+            # Write code section
+            out.write("section code\n")
+            out.write(f"{entry_point}:\n")
+
+            flow = analyse_control_flow(
+                columns.opcode, columns.operand_count, columns.mode1, columns.starts, code_section)
+            if 0 in flow.labels:
+                flow.labels[0] = entry_point
+
+            out.writelines(labelled_assembly_lines(columns, code_section, flow))
+
+        return len(columns.starts)
+
+def read_word_chunks(file: BufferedReader, start: int, end: int = -1,
+                     chunk_words: int = STREAM_CHUNK_WORDS) -> Iterator[array]:
+    """
+    Read 64-bit words from a file in fixed-size chunks.
+
+    Args:
+        file (BufferedReader): The open ROM file.
+        start (int): Byte offset of the first word.
+        end (int): Byte offset to stop at, or -1 to read until EOF.
+        chunk_words (int): Maximum number of words per chunk.
+
+    Yields:
+        array: The next chunk of words ('Q'). A trailing partial word is dropped.
+    """
+    file.seek(start)
+    remaining = (end - start) // 8 if end >= 0 else -1
+
+    while remaining != 0:
+        count = chunk_words if remaining < 0 else min(chunk_words, remaining)
+        raw = file.read(count * 8)
+        whole = len(raw) // 8
+        if whole == 0:
+            break
+
+        chunk = array('Q')
+        chunk.frombytes(raw[:whole * 8])
+        if sys.byteorder != 'little':
+            chunk.byteswap()
+        yield chunk
+
+        if remaining > 0:
+            remaining -= whole
+        if whole < count:
+            break
+
+def stream_instructions(file: BufferedReader, code_start: int,
+                        chunk_words: int = STREAM_CHUNK_WORDS) -> Iterator[PackedInstruction]:
+    """
+    Decode the code section of a ROM file one instruction pack at a time.
+
+    Only one chunk of words is held at once; an instruction whose operands
+    cross a chunk boundary is carried over and completed from the next chunk.
+    """
+    shift, mask = INSTRUCTION_LAYOUT["OPERAND_COUNT"]
+    pending = array('Q')
+
+    for chunk in read_word_chunks(file, code_start, chunk_words=chunk_words):
+        words = pending + chunk if pending else chunk
+        length = len(words)
+        index = 0
+
+        while index < length:
+            word = words[index]
+            end = index + 1 + ((word >> shift) & mask)
+            if end > length:
+                break
+            yield PackedInstruction(word, words[index + 1:end].tolist())
+            index = end
+
+        pending = words[index:]
+
+    if pending:
+        raise ValueError("Code section ends in the middle of an instruction's operands.")
+
+def stream_labels(file: BufferedReader, code_start: int) -> Dict[int, str]:
+    """
+    Find the labelled branch targets of a code section in two streaming passes.
+
+    The first pass collects the direct targets and the second keeps those that
+    start an instruction, so memory grows with the number of distinct targets
+    rather than with the size of the ROM.
+    """
+    targets = set()
+    for pack in stream_instructions(file, code_start):
+        if pack.operands:
+            instruction = pack.instruction
+            target = branch_target(
+                (instruction >> 4) & 0xFFFF, len(pack.operands), (instruction >> 24) & 0xF,
+                pack.operands[0])
+            if target is not None:
+                targets.add(target)
+
+    pending = sorted(targets, reverse=True)
+    labels: Dict[int, str] = {}
+    offset: int = 0
+    for pack in stream_instructions(file, code_start):
+        if not pending:
+            break
+        while pending and pending[-1] < offset:
+            pending.pop()
+        if pending and pending[-1] == offset:
+            labels[offset] = label_name(pending.pop())
+        offset += 1 + len(pack.operands)
+
+    return labels
+
+def disassemble_rom_stream(source_file: str, output_file: str, cache: Optional[OutputCache] = None) -> None:
+    """Disassemble a ROM file into assembly source code using bounded memory."""
 
     # Check if the file exists
     try:
@@ -394,94 +1245,166 @@ def disassemble_rom(source_file: str, output_file: str) -> None:
         print(f"Error: File '{source_file}' not found.")
         sys.exit(1)
 
-    with open(source_file, 'rb') as f:
-        header = read_rom_header(f)
+    cached_disassembly(write_disassembly_stream, source_file, output_file, cache)
+    print(f"Disassembly written to '{output_file}'.")
+    if cache is not None:
+        print(cache.summary())
 
-        # Read data section
-        data_section: List[int] = []
-        f.seek(header.data_start)
-        while f.tell() < header.code_start:
-            raw = f.read(8)
-            if not raw:
-                break
-            value = int.from_bytes(raw, 'little')
-            data_section.append(value)
-
-        # Read code section
-        f.seek(header.code_start)
-        code_section: List[int] = []
-        while True:
-            chunk = f.read(8)
-            if not chunk:
-                break
-            code_section.append(int.from_bytes(chunk, 'little'))
+def write_disassembly_stream(source_file: str, output_file: str) -> int:
+    """Disassemble a ROM file in bounded memory and return the number of instructions written."""
 
-    # Decode code instructions
-    instructions: List[PackedInstruction] = convert_to_instructions(code_section)
+    entry_point: str = "_start_of_assembly_"
+    data_name: str = "data_"
+    instructions: int = 0
 
-    # ---- Write Disassembled Output ----
-    with open(output_file, 'w', encoding='utf-8') as out:
-        out.write(f"; Disassembly of ROM file: {source_file}\n")
-        out.write(f"; ROM format version: {header.version}\n")
-        out.write(f"; Generated by disassembler version {VERSION}\n")
-        out.write("\n")
+    with open(source_file, 'rb') as f, open(output_file, 'w', encoding='utf-8') as out:
+        header = read_rom_header(f)
+        write_disassembly_preamble(out, source_file, header, entry_point)
 
-        # Caveat
-        out.write("; Note: Disassembly does not include labels except for the main entry point.\n")
-        out.write("; Label addresses likely to be inaccurate and will require manual adjustment.\n")
-        out.write("\n")
+        lines: List[str] = []
 
-        # Write meta section
-        out.write("section meta\n")
-        out.write(f"@meta version: {header.version}.0\n")
-        out.write(f"@meta entry: {entry_point}\n")
-        out.write("\n")
+        def flush_if_full() -> None:
+            if len(lines) >= STREAM_FLUSH_LINES:
+                out.writelines(lines)
+                lines.clear()
 
         # Write data section
-        out.write("section data\n")
+        lines.append("section data\n")
         count: int = 0
-        for value in data_section:
-            out.write(f"@real {data_name}{count}: {value}\n")
-            count += 1
-        out.write("\n")
+        for chunk in read_word_chunks(f, header.data_start, header.code_start):
+            for value in chunk:
+                lines.append(f"@real {data_name}{count}: {value}\n")
+                count += 1
+            flush_if_full()
+        lines.append("\n")
 
         # Write code section
-        out.write("section code\n")
-        out.write(f"{entry_point}:\n")
+        lines.append("section code\n")
+        lines.append(f"{entry_point}:\n")
+
+        labels = stream_labels(f, header.code_start)
+        if 0 in labels:
+            labels[0] = entry_point
 
-        for _, pack in enumerate(instructions):
+        offset: int = 0
+        block_ended: bool = False
+        for pack in stream_instructions(f, header.code_start):
             decoded = decode_instruction(pack.instruction)
-            opcode = binary_to_opcode(decoded["OPCODE"])
-            operand_count = decoded["OPERAND_COUNT"]
-            modes = [decoded["MODE1"], decoded["MODE2"], decoded["MODE3"]]
-
-            operands_text: List[str] = []
-            for j in range(operand_count):
-                operand = pack.operands[j]
-                mode = modes[j]
-                mode_str = code_to_addressing_mode(mode)
-
-                if mode_str == "REG":
-                    operand_str = f"%{binary_to_register(operand)}"
-                elif mode_str == "IND":
-                    operand_str = f"[{binary_to_register(operand)}]"
-                elif mode_str == "MEM":
-                    operand_str = f"[0x{operand:X}]"
-                elif mode_str == "IMM":
-                    operand_str = f"#{hex(operand)}"
-                elif mode_str == "PORT":
-                    operand_str = f"0x{operand:X}"
+            opcode = decoded["OPCODE"]
+            modes = (decoded["MODE1"], decoded["MODE2"], decoded["MODE3"])
+
+            # Same block boundaries as analyse_control_flow
+            label = labels.get(offset) if offset else None
+            if block_ended or label is not None:
+                lines.append("\n")
+                if label is not None:
+                    lines.append(f"{label}:\n")
+            block_ended = opcode in BLOCK_END_OPCODES
+
+            line = None
+            if opcode in BRANCH_OPCODES:
+                line = format_branch_line(opcode, modes, pack.operands, labels)
+            lines.append(line or format_assembly_line(opcode, modes, pack.operands))
+
+            offset += 1 + len(pack.operands)
+            instructions += 1
+            flush_if_full()
+
+        out.writelines(lines)
+
+    return instructions
+
+def collect_batch_sources(target: str) -> List[str]:
+    """
+    Collect the ROM files named by a batch target.
+
+    Args:
+        target (str): A directory (every *.bin file inside it) or a manifest
+            file listing one ROM path per line. Blank lines and lines starting
+            with '#' are ignored; relative paths are relative to the manifest.
+
+    Returns:
+        List[str]: ROM file paths in a stable order.
+    """
+    if os.path.isdir(target):
+        return sorted(
+            os.path.join(target, name) for name in os.listdir(target)
+            if name.endswith(BATCH_ROM_SUFFIX) and os.path.isfile(os.path.join(target, name))
+        )
+
+    base = os.path.dirname(target)
+    with open(target, 'r', encoding='utf-8') as manifest:
+        entries = [line.strip() for line in manifest]
+    return [os.path.join(base, entry) for entry in entries if entry and not entry.startswith('#')]
+
+def batch_output_path(source_file: str) -> str:
+    """Return the path of the disassembly written next to a ROM file."""
+    return os.path.splitext(source_file)[0] + BATCH_OUTPUT_SUFFIX
+
+def _disassemble_batch_entry(job: Tuple[str, bool, bool]) -> Tuple[str, int, int, bool, str]:
+    """Disassemble one ROM in a worker and return (source, instructions, bytes, cache hit, error)."""
+    source_file, stream, use_cache = job
+    write = write_disassembly_stream if stream else write_disassembly
+
+    # The parent evicts once at the end rather than every worker after every ROM
+    cache = OutputCache(VERSION) if use_cache else None
+    try:
+        instructions = cached_disassembly(
+            write, source_file, batch_output_path(source_file), cache, evict=False)
+        hit = cache is not None and cache.hits > 0
+        return source_file, instructions, os.path.getsize(source_file), hit, ""
+    except (OSError, ValueError) as error:
+        return source_file, 0, 0, False, str(error)
+
+def disassemble_batch(target: str, jobs: int = 0, stream: bool = False,
+                      cache: Optional[OutputCache] = None) -> None:
+    """Disassemble every ROM named by a directory or manifest across a process pool."""
+    try:
+        sources = collect_batch_sources(target)
+    except FileNotFoundError:
+        print(f"Error: File '{target}' not found.")
+        sys.exit(1)
+
+    workers = jobs if jobs > 0 else (os.cpu_count() or 1)
+
+    # Hand each worker several ROMs per round trip so small ROMs are not dominated by IPC
+    chunksize = max(1, len(sources) // (workers * 4))
+
+    failures: int = 0
+    total_instructions: int = 0
+    total_bytes: int = 0
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        jobs_list = [(source, stream, cache is not None) for source in sources]
+        for source, instructions, size, hit, error in executor.map(
+                _disassemble_batch_entry, jobs_list, chunksize=chunksize):
+            if error:
+                failures += 1
+                print(f"Error: '{source}': {error}")
+                continue
+            total_instructions += instructions
+            total_bytes += size
+            if cache is not None:
+                if hit:
+                    cache.hits += 1
                 else:
-                    operand_str = f"0x{operand:X}"
+                    cache.misses += 1
 
-                operands_text.append(operand_str)
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    done = len(sources) - failures
 
-            if operands_text:
-                out.write(f"\t{opcode} {', '.join(operands_text)}\n")
-            else:
-                out.write(f"\t{opcode}\n")
+    print("---- Batch Summary ----")
+    print(f"Workers: {workers}")
+    print(f"ROMs: {done} disassembled, {failures} failed in {elapsed:.2f}s")
+    print(f"Throughput: {done / elapsed:,.1f} ROMs/s, "
+          f"{total_instructions / elapsed:,.0f} instructions decoded/s, "
+          f"{total_bytes / elapsed / (1 << 20):,.2f} MB/s")
+
+    if cache is not None:
+        cache.evict()
+        print(cache.summary())
 
-    print(f"Disassembly written to '{output_file}'.")
 
 
 # Test read utility
@@ -0,0 +1,384 @@
+"""Headless renderer for the Viso-Fox display: Graphics Segment frames to PPM/PNG images."""
+
+import argparse
+import os
+import struct
+import sys
+import time
+import zlib
+
+from array import array
+from typing import List, Optional, Tuple
+
+from memory_map import GRAPHICS_ROW_WORDS, MEMORY_MAP, WORD_BYTES
+from frame_delta import GRAPHICS_ROWS, FrameDeltaWriter, dirty_runs, read_frame_deltas
+from emulator import FLAG_DR, FLAGS, EmulatorError, Machine
+from memory import MemoryFault
+
+# Version of the display renderer
+VERSION = "1.0.0"
+
+# Effective resolution, shown with 2x2 pixel blocks
+DISPLAY_WIDTH = 320
+DISPLAY_HEIGHT = 240
+DISPLAY_SCALE = 2
+OUTPUT_WIDTH = DISPLAY_WIDTH * DISPLAY_SCALE
+OUTPUT_HEIGHT = DISPLAY_HEIGHT * DISPLAY_SCALE
+
+# Bytes per pixel in the Graphics Segment and in rendered RGB output
+PIXEL_BYTES = 2
+RGB_BYTES = 3
+
+# Jehkoba64 palette from isa.md, indexes 0 to 63
+PALETTE = [
+    0x000000, 0xfabbaf, 0xeb758f, 0xd94c8e, 0xb32d7d, 0xfa9891, 0xff7070, 0xf53141,
+    0xc40c2e, 0x852264, 0xfaa032, 0xf58122, 0xf2621f, 0xdb4b16, 0x9e4c4c, 0xfad937,
+    0xffb938, 0xe69b22, 0xcc8029, 0xad6a45, 0xccc73d, 0xb3b02d, 0x989c27, 0x8c8024,
+    0x7a5e37, 0x94bf30, 0x55b33b, 0x179c43, 0x068051, 0x116061, 0xa0eba8, 0x7ccf9a,
+    0x5cb888, 0x3da17e, 0x20806c, 0x49c2f2, 0x25acf5, 0x1793e6, 0x1c75bd, 0x195ba6,
+    0xae88e3, 0x7e7ef2, 0x586ac4, 0x3553a6, 0x243966, 0xe29bfa, 0xca7ef2, 0xa35dd9,
+    0x773bbf, 0x4e278c, 0xb58c7f, 0x9e7767, 0x875d58, 0x6e4250, 0x472e3e, 0xa69a9c,
+    0x807980, 0x696570, 0x495169, 0x0d2140, 0x050e1a, 0xd9a798, 0xc4bbb3, 0xf2f2da,
+]
+PALETTE_MASK = len(PALETTE) - 1
+
+# Frame file formats
+FRAME_FORMATS = ("png", "ppm")
+
+
+def _channel_table(shift: int) -> bytes:
+    """
+    Build a bytes.translate table from a palette index byte to one colour channel.
+
+    Only the low six bits select the colour, so every byte value maps into the palette.
+    """
+    return bytes((PALETTE[index & PALETTE_MASK] >> shift) & 0xFF for index in range(256))
+
+
+# One table per channel: a whole frame is gathered through each with a single translate
+RED_TABLE = _channel_table(16)
+GREEN_TABLE = _channel_table(8)
+BLUE_TABLE = _channel_table(0)
+
+
+class FrameRenderer:
+    """
+    Convert Graphics Segment words into 640x480 RGB frames.
+
+    The renderer keeps the current frame and redraws runs of scanlines into
+    it. Every step runs over a whole run in C: the low byte of each 16-bit
+    pixel is picked out with a strided slice, doubled horizontally by strided
+    assignment, gathered through the palette with bytes.translate once per
+    channel and interleaved into RGB, and each row is copied twice for the
+    vertical doubling.
+    """
+
+    def __init__(self) -> None:
+        # Palette index 0 is black, so a zeroed frame matches a zeroed Graphics Segment
+        self.frame = bytearray(OUTPUT_WIDTH * OUTPUT_HEIGHT * RGB_BYTES)
+
+    def render(self, words: array) -> bytes:
+        """
+        Render a whole frame.
+
+        Args:
+            words (array): The Graphics Segment as array('Q'), four pixels per word.
+
+        Returns:
+            bytes: Packed 8-bit RGB rows of the 640x480 frame.
+        """
+        self.render_rows(0, words)
+        return bytes(self.frame)
+
+    def render_rows(self, first_row: int, words: array) -> None:
+        """
+        Redraw a run of scanlines in the current frame.
+
+        Args:
+            first_row (int): First scanline of the run, from 0 to 239.
+            words (array): The run's Graphics Segment words as array('Q').
+        """
+        if sys.byteorder == 'big':
+            words = array('Q', words)
+            words.byteswap()
+
+        # Low byte of each little-endian 16-bit pixel
+        indexes = words.tobytes()[::PIXEL_BYTES]
+
+        wide = bytearray(len(indexes) * DISPLAY_SCALE)
+        wide[0::2] = indexes
+        wide[1::2] = indexes
+
+        rgb = bytearray(len(wide) * RGB_BYTES)
+        rgb[0::3] = wide.translate(RED_TABLE)
+        rgb[1::3] = wide.translate(GREEN_TABLE)
+        rgb[2::3] = wide.translate(BLUE_TABLE)
+
+        row = OUTPUT_WIDTH * RGB_BYTES
+        frame = self.frame
+        offset = first_row * DISPLAY_SCALE * row
+        for start in range(0, len(rgb), row):
+            line = rgb[start:start + row]
+            for _ in range(DISPLAY_SCALE):
+                frame[offset:offset + row] = line
+                offset += row
+
+
+def write_ppm(filename: str, rgb: bytes, width: int = OUTPUT_WIDTH, height: int = OUTPUT_HEIGHT) -> None:
+    """Write packed RGB rows as a binary PPM (P6) image."""
+    with open(filename, 'wb') as f:
+        f.write(b"P6\n%d %d\n255\n" % (width, height))
+        f.write(rgb)
+
+
+def write_png(filename: str, rgb: bytes, width: int = OUTPUT_WIDTH, height: int = OUTPUT_HEIGHT) -> None:
+    """Write packed RGB rows as an 8-bit truecolour PNG image."""
+    row = width * RGB_BYTES
+
+    # Every scanline starts with filter type 0 (none)
+    scanlines = b"".join(b"\x00" + rgb[start:start + row] for start in range(0, row * height, row))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    with open(filename, 'wb') as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(scanlines, 6)))
+        f.write(chunk(b"IEND", b""))
+
+
+class Display:
+    """
+    A headless display attached to a Machine.
+
+    The program marks a frame complete by setting the DR flag in FLAGS, which
+    locks the Graphics Segment. poll() then redraws the frame, optionally
+    saves it, and clears DR to release the lock.
+
+    Only scanlines the machine marked dirty since the last frame are read,
+    and of those only rows whose words actually changed are redrawn and
+    written to the optional frame-delta stream.
+    """
+
+    def __init__(self, machine: Machine, frames_dir: Optional[str] = None, frame_format: str = "png",
+                 delta: Optional[FrameDeltaWriter] = None) -> None:
+        self.machine = machine
+        self.frames_dir = frames_dir
+        self.frame_format = frame_format
+        self.delta = delta
+        self.renderer = FrameRenderer()
+        self.frames: int = 0
+        self.rows_rendered: int = 0
+        self.render_seconds: float = 0.0
+
+        # Graphics Segment contents as of the last frame
+        self._previous = array('Q', bytes(MEMORY_MAP["GS"].size * WORD_BYTES))
+
+        if frames_dir is not None:
+            os.makedirs(frames_dir, exist_ok=True)
+
+    @property
+    def last_frame(self) -> bytes:
+        """The most recent frame as packed RGB rows."""
+        return bytes(self.renderer.frame)
+
+    def poll(self) -> bool:
+        """
+        Render a frame if the DR flag is set.
+
+        Returns:
+            bool: Whether a frame was rendered.
+        """
+        regs = self.machine.regs
+        if not regs[FLAGS] & FLAG_DR:
+            return False
+
+        start = time.perf_counter()
+        changed = self._changed_runs()
+        for first_row, words in changed:
+            self.renderer.render_rows(first_row, words)
+            self.rows_rendered += len(words) // GRAPHICS_ROW_WORDS
+        self.render_seconds += time.perf_counter() - start
+
+        self.frames += 1
+        if self.delta is not None:
+            self.delta.write(self.frames, changed)
+        if self.frames_dir is not None:
+            path = os.path.join(self.frames_dir, f"frame_{self.frames:05d}.{self.frame_format}")
+            self.save(path, self.renderer.frame)
+
+        # Drawing is done, unlock the graphics region
+        regs[FLAGS] &= ~FLAG_DR
+        return True
+
+    def _changed_runs(self) -> List[Tuple[int, array]]:
+        """Read the dirty scanlines, keep runs of rows whose words changed and clear the dirty marks."""
+        dirty = self.machine.dirty_rows
+        graphics_start = MEMORY_MAP["GS"].start
+        previous = self._previous
+        read_block = self.machine.memory.read_block
+
+        changed: List[Tuple[int, array]] = []
+        for first, count in dirty_runs(dirty):
+            words = read_block(graphics_start + first * GRAPHICS_ROW_WORDS, count * GRAPHICS_ROW_WORDS)
+
+            # Split the dirty run into runs of rows that differ from the last frame
+            run_start = None
+            for row in range(count + 1):
+                low = row * GRAPHICS_ROW_WORDS
+                high = low + GRAPHICS_ROW_WORDS
+                base = (first + row) * GRAPHICS_ROW_WORDS
+                differs = row < count and words[low:high] != previous[base:base + GRAPHICS_ROW_WORDS]
+                if differs and run_start is None:
+                    run_start = row
+                elif not differs and run_start is not None:
+                    run = words[run_start * GRAPHICS_ROW_WORDS:low]
+                    changed.append((first + run_start, run))
+                    base = (first + run_start) * GRAPHICS_ROW_WORDS
+                    previous[base:base + len(run)] = run
+                    run_start = None
+
+        dirty[:] = bytes(len(dirty))
+        return changed
+
+    def save(self, filename: str, frame: bytes) -> None:
+        """Save a rendered frame in the display's format."""
+        if self.frame_format == "ppm":
+            write_ppm(filename, frame)
+        else:
+            write_png(filename, frame)
+
+
+def replay_frame_deltas(delta_file: str, frames_dir: str, frame_format: str = "png") -> int:
+    """
+    Render every frame of a frame-delta stream to image files.
+
+    Args:
+        delta_file (str): The frame-delta stream.
+        frames_dir (str): Directory to save frames in.
+        frame_format (str): "png" or "ppm".
+
+    Returns:
+        int: Number of frames written.
+    """
+    os.makedirs(frames_dir, exist_ok=True)
+    renderer = FrameRenderer()
+    frames: int = 0
+    for frame_number, graphics, runs in read_frame_deltas(delta_file):
+        for first_row, count in runs:
+            low = first_row * GRAPHICS_ROW_WORDS
+            renderer.render_rows(first_row, graphics[low:low + count * GRAPHICS_ROW_WORDS])
+
+        path = os.path.join(frames_dir, f"frame_{frame_number:05d}.{frame_format}")
+        if frame_format == "ppm":
+            write_ppm(path, renderer.frame)
+        else:
+            write_png(path, renderer.frame)
+        frames += 1
+    return frames
+
+
+def run_with_display(machine: Machine, display: Display, max_instructions: int = -1,
+                     max_frames: int = -1, poll_interval: int = 10000) -> int:
+    """
+    Run a machine, polling the display between slices of instructions.
+
+    Programs should wait for DR to clear before touching the Graphics
+    Segment again; the display clears it at the next poll.
+
+    Args:
+        machine (Machine): The machine to run.
+        display (Display): The display polling its DR flag.
+        max_instructions (int): Instruction budget, or -1 for no limit.
+        max_frames (int): Stop after this many frames, or -1 for no limit.
+        poll_interval (int): Instructions between display polls.
+
+    Returns:
+        int: Number of instructions executed.
+    """
+    executed: int = 0
+    while not machine.halted and (max_instructions < 0 or executed < max_instructions):
+        budget = poll_interval if max_instructions < 0 else min(poll_interval, max_instructions - executed)
+        executed += machine.run(budget)
+        display.poll()
+        if 0 <= max_frames <= display.frames:
+            break
+    return executed
+
+
+def main() -> None:
+    """Run a ROM with a headless display and save its frames."""
+    parser = argparse.ArgumentParser(description="Run a VFOX ROM and render its display frames.")
+    parser.add_argument('rom', nargs='?', help="ROM file to run")
+    parser.add_argument('--frames-dir', help="directory to save frames in (default: render only)")
+    parser.add_argument('--delta-out', help="write a compact frame-delta stream to this file")
+    parser.add_argument('--replay', metavar='DELTA',
+                        help="render the frames of a frame-delta stream into --frames-dir instead of running a ROM")
+    parser.add_argument('--format', choices=FRAME_FORMATS, default="png", help="frame file format")
+    parser.add_argument('--max-frames', type=int, default=-1, help="stop after this many frames")
+    parser.add_argument('--max-instructions', type=int, default=-1,
+                        help="stop after this many instructions (default: run until hlt)")
+    parser.add_argument('--poll-interval', type=int, default=10000,
+                        help="instructions between checks of the DR flag")
+    parser.add_argument('--version', action='version', version=f"display version {VERSION}")
+    args = parser.parse_args()
+
+    if args.replay:
+        if not args.frames_dir:
+            print("Error: --replay requires --frames-dir.")
+            sys.exit(1)
+        try:
+            frames = replay_frame_deltas(args.replay, args.frames_dir, args.format)
+        except FileNotFoundError:
+            print(f"Error: File '{args.replay}' not found.")
+            sys.exit(1)
+        except (ValueError, struct.error, zlib.error) as error:
+            print(f"Error: {error}")
+            sys.exit(1)
+        print(f"Wrote {frames:,} frames to {args.frames_dir}")
+        return
+
+    if not args.rom:
+        parser.print_usage()
+        sys.exit(1)
+
+    machine = Machine()
+    try:
+        machine.load_rom(args.rom)
+    except FileNotFoundError:
+        print(f"Error: File '{args.rom}' not found.")
+        sys.exit(1)
+    except (ValueError, MemoryFault) as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+
+    delta = FrameDeltaWriter(args.delta_out) if args.delta_out else None
+    display = Display(machine, args.frames_dir, args.format, delta)
+    start = time.perf_counter()
+    try:
+        executed = run_with_display(machine, display, args.max_instructions, args.max_frames,
+                                    max(args.poll_interval, 1))
+    except (EmulatorError, MemoryFault) as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+    finally:
+        if delta is not None:
+            delta.close()
+    elapsed = max(time.perf_counter() - start, 1e-9)
+
+    print("---- Display Summary ----")
+    print(f"Executed {executed:,} instructions in {elapsed:.3f}s")
+    print(f"Frames: {display.frames:,}")
+    if display.frames:
+        total_rows = display.frames * GRAPHICS_ROWS
+        print(f"Rows redrawn: {display.rows_rendered:,} of {total_rows:,} "
+              f"({display.rows_rendered / total_rows:.1%})")
+        print(f"Render: {display.render_seconds / display.frames * 1000:.3f} ms/frame "
+              f"({display.frames / max(display.render_seconds, 1e-9):,.0f} frames/s, excluding file output)")
+    if delta is not None:
+        print(f"Frame deltas: {delta.bytes_written:,} bytes written to {args.delta_out}")
+
+
+if __name__ == "__main__":
+    main()
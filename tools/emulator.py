@@ -0,0 +1,1261 @@
+"""Viso-Fox CPU emulator that predecodes a ROM into a table of instruction handlers."""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from register_table import REGISTER_LUT, register_to_binary
+from addressing_table import addressing_mode_to_code
+from opcode_table import binary_to_opcode, opcode_to_binary
+from memory_map import CODE_SEGMENT_START, DATA_SEGMENT_START, GRAPHICS_ROW_WORDS, MEMORY_MAP, WORD_BYTES
+from memory import MemoryFault, PagedMemory
+from disassembler import InstructionStream, ROMImage, decode_columns
+from control_flow import analyse_control_flow
+from scheduler import TIMER_PORT, EventScheduler, SchedulerState
+from port_io import (
+    CONSOLE_CHARACTERS, CONSOLE_IN_PORT, CONSOLE_OUT_PORT, DEFAULT_FLUSH_BYTES, ConsoleServer, read_input_script, replay_input,
+)
+
+# Version of the emulator
+VERSION = "1.0.0"
+
+WORD_MASK = 0xFFFFFFFFFFFFFFFF
+SIGN_BIT = 1 << 63
+
+# FLAGS register bits
+FLAG_Z = 1 << 0    # Zero
+FLAG_S = 1 << 1    # Sign
+FLAG_O = 1 << 2    # Overflow
+FLAG_C = 1 << 3    # Carry
+FLAG_DR = 1 << 4   # Display draw
+
+# FLAGS bits left untouched by arithmetic
+ARITHMETIC_FLAGS = FLAG_Z | FLAG_S | FLAG_O | FLAG_C
+KEEP_FLAGS = WORD_MASK & ~ARITHMETIC_FLAGS
+
+# KEEP_FLAGS as a small negative mask; equal on 64-bit values, and cheaper than a big-int operand
+CLEAR_FLAGS = ~ARITHMETIC_FLAGS
+
+# FLAGS bits read by conditional jumps
+CONDITION_FLAGS = FLAG_Z | FLAG_S | FLAG_O
+
+# Register indexes
+REGISTER_COUNT = len(REGISTER_LUT)
+GENERAL_REGISTERS = [register_to_binary(f"R{i}") for i in range(8)]
+FLAGS = register_to_binary("FLAGS")
+PC = register_to_binary("PC")
+SP = register_to_binary("SP")
+BP = register_to_binary("BP")
+IVT = register_to_binary("IVT")
+
+# Addressing modes
+IMM = addressing_mode_to_code("IMM")
+REG = addressing_mode_to_code("REG")
+MEM = addressing_mode_to_code("MEM")
+IND = addressing_mode_to_code("IND")
+PORT = addressing_mode_to_code("PORT")
+
+# I/O ports
+PORT_COUNT = 16
+
+# Valid instruction designation
+DESIGNATION = 0xF
+
+# An instruction word plus at most three operands
+MAX_INSTRUCTION_WORDS = 4
+
+# An instruction handler runs one instruction and returns the next PC
+Handler = Callable[[], int]
+
+
+class EmulatorError(Exception):
+    """Raised when the emulated program does something the machine cannot do."""
+
+
+class MachineHalt(Exception):
+    """Raised by the hlt handler to leave the execution loop."""
+
+    def __init__(self, pc: int) -> None:
+        super().__init__(pc)
+        self.pc = pc
+
+
+class MachineYield(Exception):
+    """Raised to leave the execution loop early without halting, e.g. at an event."""
+
+    def __init__(self, pc: int) -> None:
+        super().__init__(pc)
+        self.pc = pc
+
+
+class HandlerCache(dict):
+    """Handlers by PC; a PC that was not predecoded is decoded from memory on first use."""
+
+    def __init__(self, decode: Callable[[int], Handler]) -> None:
+        super().__init__()
+        self._decode = decode
+
+    def __missing__(self, pc: int) -> Handler:
+        handler = self._decode(pc)
+        self[pc] = handler
+        return handler
+
+
+class MachineSnapshot(NamedTuple):
+    """The full state of a machine at one point, for Machine.restore."""
+    regs: List[int]          # every register of REGISTER_LUT, FLAGS and PC included
+    ports: List[int]         # ports 0x00-0x0F
+    console: bytes
+    console_input: bytes
+    halted: bool
+    instructions: int
+    code_version: int
+    memory: Dict[int, object]  # image from the memory model's snapshot()
+    events: Optional[SchedulerState]  # pending interrupts and timer state, with an event scheduler
+
+
+class Machine:
+    """
+    A Viso-Fox machine: registers, FLAGS, I/O ports and word-addressed memory.
+
+    Each instruction is decoded once into a closure specialised on its opcode
+    and addressing modes, and execution is a loop of handler calls keyed by PC.
+    """
+
+    def __init__(self, memory=None) -> None:
+        self.memory = memory if memory is not None else PagedMemory()
+        self.regs: List[int] = [0] * REGISTER_COUNT
+        self.ports: List[int] = [0] * PORT_COUNT
+        self.console = bytearray()
+
+        # Characters waiting to be read from port 0x05
+        self.console_input = bytearray()
+
+        # Receives console output once the buffer holds flush_bytes, and on hlt; without one it accumulates
+        self.console_sink: Optional[Callable[[bytes], None]] = None
+        self.flush_bytes: int = DEFAULT_FLUSH_BYTES
+        self.halted: bool = False
+        self.instructions: int = 0
+        self.handlers = HandlerCache(self.decode_at)
+
+        # Code segment writes invalidate decoded handlers and notify the listeners
+        self.code_range = range(MEMORY_MAP["CS"].start, MEMORY_MAP["CS"].end)
+        self.code_listeners: List[Callable[[int], None]] = []
+
+        # Graphics Segment writes mark their scanline dirty for the display
+        self.graphics_range = range(MEMORY_MAP["GS"].start, MEMORY_MAP["GS"].end)
+        self.dirty_rows = bytearray(b"\x01" * (MEMORY_MAP["GS"].size // GRAPHICS_ROW_WORDS))
+
+        # Bumped on every code segment write, so long-running handlers can notice
+        self.code_version: List[int] = [0]
+
+        # Leaders of the basic blocks of the loaded ROM, as PCs
+        self.block_leaders: List[int] = []
+
+        # Instructions run by a handler beyond the one its dispatch counts
+        self.block_instructions: List[int] = [0]
+
+        # Most instructions the handler being dispatched should run; looping handlers stop early to keep to it
+        self.block_limit: List[int] = [sys.maxsize]
+
+        # PC of the instruction a translated block raised at, for a fault to leave in PC
+        self.fault_pc: List[int] = [-1]
+
+        # Event scheduler driving the machine, if any, and callbacks run by iret with the frame's SP;
+        # a callback returning True ends the current run after the iret
+        self.events: Optional[EventScheduler] = None
+        self.interrupt_return_listeners: List[Callable[[int], None]] = []
+
+        # Callbacks given every handler build_handler makes, with its PC and instruction word,
+        # returning the handler to use instead; they also see handlers decoded after invalidation
+        self.handler_wrappers: List[Callable[[int, int, Handler], Handler]] = []
+
+        # Most instructions a single handler call can run; above 1, run() checks the budget after every call
+        self.dispatch_instructions: int = 1
+        self._builders: Dict[int, Callable[[int, List[int], List[int], int], Handler]] = {
+            opcode_to_binary(name): builder for name, builder in (
+                ("nop", self._build_nop), ("hlt", self._build_hlt),
+                ("mov", self._build_mov), ("cmp", self._build_cmp),
+                ("jmp", self._build_jump), ("jz", self._build_jump), ("jnz", self._build_jump),
+                ("jl", self._build_jump), ("jle", self._build_jump),
+                ("jg", self._build_jump), ("jge", self._build_jump),
+                ("add", self._build_arithmetic), ("sub", self._build_arithmetic),
+                ("mul", self._build_arithmetic), ("div", self._build_arithmetic),
+                ("and", self._build_arithmetic), ("or", self._build_arithmetic),
+                ("xor", self._build_arithmetic),
+                ("inc", self._build_unary), ("dec", self._build_unary),
+                ("neg", self._build_unary), ("not", self._build_unary),
+                ("bswap", self._build_unary),
+                ("shl", self._build_shift), ("shr", self._build_shift),
+                ("rol", self._build_shift), ("ror", self._build_shift),
+                ("int", self._build_int), ("iret", self._build_iret),
+                ("push", self._build_push), ("pop", self._build_pop),
+                ("call", self._build_call), ("ret", self._build_ret),
+                ("in", self._build_in), ("out", self._build_out),
+            )
+        }
+        self.reset()
+
+    # ---- Boot ----
+
+    def reset(self) -> None:
+        """Set the registers to their power-on state."""
+        self.regs[:] = [0] * REGISTER_COUNT
+        self.regs[PC] = CODE_SEGMENT_START
+        self.regs[SP] = MEMORY_MAP["SS"].end
+        self.regs[BP] = MEMORY_MAP["SS"].end
+        self.regs[IVT] = MEMORY_MAP["IT"].start
+        self.halted = False
+        self.instructions = 0
+
+    def load_rom(self, filename: str) -> None:
+        """
+        Boot a ROM: copy its sections into memory as the MBS would and predecode its code.
+
+        Args:
+            filename (str): Path of the VFOX ROM file.
+        """
+        with ROMImage(filename) as rom:
+            self.memory.load(DATA_SEGMENT_START, rom.data_section)
+            self.memory.load(CODE_SEGMENT_START, rom.code_section)
+
+            code_section = rom.code_section
+            columns = decode_columns(code_section)
+            self.handlers.clear()
+            for start, count in zip(columns.starts, columns.operand_count):
+                words = code_section[start:start + 1 + count].tolist()
+                pc = CODE_SEGMENT_START + start
+                self.handlers[pc] = self.build_handler(pc, words[0], words[1:])
+
+            flow = analyse_control_flow(columns.opcode, columns.operand_count, columns.mode1,
+                                        columns.starts, code_section)
+            self.block_leaders = [CODE_SEGMENT_START + columns.starts[index] for index in flow.block_starts]
+
+        self.reset()
+
+    def load_image(self, data_section: Sequence[int], code_section: Sequence[int],
+                   stream: InstructionStream) -> None:
+        """
+        Boot from sections already in memory, predecoding from their instruction stream.
+
+        Unlike load_rom, nothing is decoded again, so many machines can boot
+        cheaply from one decoded image. Block leaders are not analysed.
+
+        Args:
+            data_section (Sequence[int]): The data section words.
+            code_section (Sequence[int]): The code section words.
+            stream (InstructionStream): convert_to_instructions of the code section.
+        """
+        self.memory.load(DATA_SEGMENT_START, data_section)
+        self.memory.load(CODE_SEGMENT_START, code_section)
+
+        headers, offsets, operands = stream.headers, stream.offsets, stream.operands
+        self.handlers.clear()
+        for index, instruction in enumerate(headers):
+            pc = stream.base + offsets[index] + index
+            self.handlers[pc] = self.build_handler(pc, instruction,
+                                                   list(operands[offsets[index]:offsets[index + 1]]))
+        self.block_leaders = []
+
+        self.reset()
+
+    # ---- Execution ----
+
+    def run(self, max_instructions: int = -1) -> int:
+        """
+        Execute until hlt or until an instruction budget is used up.
+
+        Args:
+            max_instructions (int): Maximum instructions to execute, or -1 for no limit.
+
+        Without a translator every handler runs one instruction, so the budget
+        is dispatched in one go. Once handlers may run several instructions,
+        the budget is checked after every call, and handlers that loop are
+        held to the instructions left through block_limit, so the budget is
+        overshot by less than one pass through a block.
+
+        Returns:
+            int: Number of instructions executed by this call.
+        """
+        if self.halted:
+            return 0
+
+        handlers = self.handlers
+        extra = self.block_instructions
+        limit = self.block_limit
+        pc = self.regs[PC]
+        budget = max_instructions if max_instructions >= 0 else sys.maxsize
+        executed: int = 0
+        done: int = 0
+        extra[0] = 0
+        self.fault_pc[0] = -1
+
+        try:
+            if self.dispatch_instructions == 1:
+                while executed < budget:
+                    dispatches = budget - executed
+                    for done in range(dispatches):
+                        pc = handlers[pc]()
+                    executed += dispatches
+            elif max_instructions < 0:
+                # Unbounded: only hlt or an event ends the run, so looping handlers need no limit
+                limit[0] = sys.maxsize
+                while True:
+                    pc = handlers[pc]()
+                    done += 1
+            else:
+                # done counts every call here, and executed stays 0 until the loop ends
+                while True:
+                    left = budget - done - extra[0]
+                    if left <= 0:
+                        break
+                    limit[0] = left
+                    pc = handlers[pc]()
+                    done += 1
+                executed = done + extra[0]
+        except MachineHalt as halt:
+            pc = halt.pc
+            executed += done + 1 + extra[0]
+            self.halted = True
+            self.flush_console()
+        except MachineYield as stop:
+            pc = stop.pc
+            executed += done + 1 + extra[0]
+        except (EmulatorError, MemoryFault):
+            # The faulting instruction did not complete, so only those before it count, and PC stays on it
+            executed += done + extra[0]
+            if self.fault_pc[0] >= 0:
+                pc = self.fault_pc[0]
+            raise
+        finally:
+            self.regs[PC] = pc
+            self.instructions += executed
+
+        return executed
+
+    # ---- Watched stores ----
+
+    def write_memory(self, address: int, value: int) -> None:
+        """Write a word to memory, invalidating code decoded from it or marking its scanline dirty."""
+        self.memory.write(address, value)
+        if address in self.graphics_range:
+            self.dirty_rows[(address - self.graphics_range.start) // GRAPHICS_ROW_WORDS] = 1
+        elif address in self.code_range:
+            self.invalidate_code(address)
+
+    def invalidate_code(self, address: int) -> None:
+        """Drop the handlers of every instruction that could contain a written code word."""
+        self.code_version[0] += 1
+        for pc in range(address - MAX_INSTRUCTION_WORDS + 1, address + 1):
+            self.handlers.pop(pc, None)
+        for listener in self.code_listeners:
+            listener(address)
+
+    # ---- Snapshots ----
+
+    def snapshot(self) -> MachineSnapshot:
+        """
+        Capture the registers, ports, console, memory and event scheduler.
+
+        Memory is captured copy-on-write, so a snapshot costs the pages
+        written since the previous snapshot or restore, not the address space.
+
+        Returns:
+            MachineSnapshot: The state, to pass to restore() any number of times.
+        """
+        return MachineSnapshot(
+            list(self.regs), list(self.ports), bytes(self.console), bytes(self.console_input), self.halted,
+            self.instructions, self.code_version[0], self.memory.snapshot(),
+            self.events.state() if self.events is not None else None,
+        )
+
+    def restore(self, snapshot: MachineSnapshot) -> None:
+        """
+        Put the machine back to a snapshot.
+
+        State is restored in place, so handlers bound to the registers, ports
+        and memory stay valid. Handlers decoded from code words that differ
+        from the snapshot are invalidated, and every scanline is marked dirty.
+
+        Args:
+            snapshot (MachineSnapshot): A snapshot taken on this machine.
+        """
+        # Code only differs from the snapshot if it was written since
+        changed: List[int] = []
+        if self.code_version[0] != snapshot.code_version:
+            changed = self.memory.changed_words(snapshot.memory, self.code_range.start, self.code_range.stop)
+
+        self.memory.restore(snapshot.memory)
+        for address in changed:
+            self.invalidate_code(address)
+
+        self.regs[:] = snapshot.regs
+        self.ports[:] = snapshot.ports
+        self.console[:] = snapshot.console
+        self.console_input[:] = snapshot.console_input
+        self.halted = snapshot.halted
+        self.instructions = snapshot.instructions
+        self.dirty_rows[:] = b"\x01" * len(self.dirty_rows)
+        if self.events is not None and snapshot.events is not None:
+            self.events.restore(snapshot.events)
+
+    # ---- Ports ----
+
+    def read_port(self, port: int) -> int:
+        """Read the value of an I/O port; a character read from port 0x05 is taken, leaving 0 behind."""
+        if port != CONSOLE_IN_PORT:
+            return self.ports[port]
+        value = self.ports[port]
+        if value:
+            self.ports[port] = 0
+        elif self.console_input:
+            value = self.console_input.pop(0)
+        return value
+
+    def write_port(self, port: int, value: int) -> None:
+        """Write a value to an I/O port; console output keeps up to four ASCII characters."""
+        self.ports[port] = value
+        if port == CONSOLE_OUT_PORT:
+            console = self.console
+            console += CONSOLE_CHARACTERS[value & 0xFFFF]
+            console += CONSOLE_CHARACTERS[(value >> 16) & 0xFFFF]
+            if len(console) >= self.flush_bytes and self.console_sink is not None:
+                self.flush_console()
+
+    def flush_console(self) -> None:
+        """Hand the buffered console output to the sink, if there is one."""
+        if self.console and self.console_sink is not None:
+            self.console_sink(bytes(self.console))
+            self.console.clear()
+
+    # ---- Decoding ----
+
+    def decode_at(self, pc: int) -> Handler:
+        """Decode the instruction stored in memory at a PC into a handler."""
+        read = self.memory.read
+        instruction = read(pc)
+        count = (instruction >> 20) & 0xF if instruction & 0xF == DESIGNATION else 0
+        return self.build_handler(pc, instruction, [read(pc + 1 + i) for i in range(count)])
+
+    def build_handler(self, pc: int, instruction: int, operands: List[int]) -> Handler:
+        """
+        Build the handler for one instruction, passing it through the handler wrappers.
+
+        Invalid instructions still get a handler; it raises EmulatorError only
+        if it is actually executed.
+        """
+        handler = self._build_instruction(pc, instruction, operands)
+        for wrap in self.handler_wrappers:
+            handler = wrap(pc, instruction, handler)
+        return handler
+
+    def _build_instruction(self, pc: int, instruction: int, operands: List[int]) -> Handler:
+        if instruction & 0xF != DESIGNATION:
+            # Not an instruction: a NOP with no operands
+            next_pc = pc + 1
+            return lambda: next_pc
+
+        opcode = (instruction >> 4) & 0xFFFF
+        modes = [(instruction >> shift) & 0xF for shift in (24, 28, 32)]
+        next_pc = pc + 1 + len(operands)
+
+        builder = self._builders.get(opcode)
+        if builder is None:
+            return _fault(f"Unknown opcode {opcode:#06x} at {pc:#x}")
+
+        try:
+            handler = builder(opcode, modes, operands, next_pc)
+        except EmulatorError as error:
+            return _fault(f"{binary_to_opcode(opcode)} at {pc:#x}: {error}")
+
+        dest = destination_operand(binary_to_opcode(opcode), len(operands))
+        if dest is not None and modes[dest] == REG and operands[dest] == PC:
+            # Writing PC through a register operand is a jump
+            regs = self.regs
+            inner = handler
+
+            def handler() -> int:
+                regs[PC] = next_pc
+                inner()
+                return regs[PC]
+
+        return handler
+
+    # ---- Operand access ----
+
+    def _reader(self, mode: int, value: int, next_pc: int) -> Callable[[], int]:
+        """Build a function returning the value of a source operand."""
+        regs = self.regs
+        read = self.memory.read
+
+        if mode == IMM:
+            return lambda: value
+        if mode == REG:
+            _check_register(value)
+            if value == PC:
+                return lambda: next_pc
+            return lambda: regs[value]
+        if mode == MEM:
+            return lambda: read(value)
+        if mode == IND:
+            _check_register(value)
+            return lambda: read(regs[value])
+        raise EmulatorError(f"addressing mode {mode:#x} cannot be read")
+
+    def _writer(self, mode: int, value: int) -> Callable[[int], None]:
+        """Build a function storing a value into a destination operand."""
+        regs = self.regs
+        write = self.memory.write
+        write_memory = self.write_memory
+
+        if mode == REG:
+            _check_register(value)
+
+            def write_register(result: int) -> None:
+                regs[value] = result
+            return write_register
+        if mode == MEM:
+            if value in self.graphics_range:
+                dirty_rows = self.dirty_rows
+                row = (value - self.graphics_range.start) // GRAPHICS_ROW_WORDS
+
+                def write_graphics(result: int) -> None:
+                    write(value, result)
+                    dirty_rows[row] = 1
+                return write_graphics
+            if value in self.code_range:
+                return lambda result: write_memory(value, result)
+            return lambda result: write(value, result)
+        if mode == IND:
+            _check_register(value)
+            return lambda result: write_memory(regs[value], result)
+        raise EmulatorError(f"addressing mode {mode:#x} cannot be written")
+
+    # ---- Instruction builders ----
+
+    def _build_nop(self, _opcode: int, _modes: List[int], _operands: List[int], next_pc: int) -> Handler:
+        return lambda: next_pc
+
+    def _build_hlt(self, _opcode: int, _modes: List[int], _operands: List[int], next_pc: int) -> Handler:
+        def hlt() -> int:
+            raise MachineHalt(next_pc)
+        return hlt
+
+    def _build_mov(self, _opcode: int, modes: List[int], operands: List[int], next_pc: int) -> Handler:
+        _require(operands, 2)
+        regs = self.regs
+
+        # Register to register moves are the most common, so avoid the accessor calls
+        if modes[0] == REG and modes[1] == REG and operands[0] != PC:
+            _check_register(operands[0])
+            _check_register(operands[1])
+            source, dest = operands[0], operands[1]
+
+            def mov_reg() -> int:
+                regs[dest] = regs[source]
+                return next_pc
+            return mov_reg
+
+        if modes[0] == IMM and modes[1] == REG:
+            _check_register(operands[1])
+            value, dest = operands[0] & WORD_MASK, operands[1]
+
+            def mov_imm() -> int:
+                regs[dest] = value
+                return next_pc
+            return mov_imm
+
+        source_of = self._reader(modes[0], operands[0], next_pc)
+        store = self._writer(modes[1], operands[1])
+
+        def mov() -> int:
+            store(source_of())
+            return next_pc
+        return mov
+
+    def _build_cmp(self, _opcode: int, modes: List[int], operands: List[int], next_pc: int) -> Handler:
+        _require(operands, 2)
+        regs = self.regs
+
+        # Comparing a register against a constant is the usual loop test, so inline the flags
+        if modes[0] == REG and modes[1] == IMM and operands[0] != PC:
+            _check_register(operands[0])
+            source, constant = operands[0], operands[1] & WORD_MASK
+            borrow = FLAG_S | FLAG_C
+
+            def cmp_imm() -> int:
+                a = regs[source]
+                if a < SIGN_BIT and constant < SIGN_BIT:
+                    # Both non-negative: no overflow, and a borrow always sets the sign
+                    flags = regs[FLAGS] & CLEAR_FLAGS
+                    if a < constant:
+                        flags |= borrow
+                    elif a == constant:
+                        flags |= FLAG_Z
+                    regs[FLAGS] = flags
+                    return next_pc
+
+                result = (a - constant) & WORD_MASK
+                flags = regs[FLAGS] & CLEAR_FLAGS
+                if result == 0:
+                    flags |= FLAG_Z
+                elif result & SIGN_BIT:
+                    flags |= FLAG_S
+                if a < constant:
+                    flags |= FLAG_C
+                if (a ^ constant) & (a ^ result) & SIGN_BIT:
+                    flags |= FLAG_O
+                regs[FLAGS] = flags
+                return next_pc
+            return cmp_imm
+
+        # Comparing two registers, as a loop against a register bound does
+        if modes[0] == REG and modes[1] == REG and PC not in operands[:2]:
+            _check_register(operands[0])
+            _check_register(operands[1])
+            left, right = operands[0], operands[1]
+            borrow = FLAG_S | FLAG_C
+
+            def cmp_reg() -> int:
+                a = regs[left]
+                b = regs[right]
+                if a < SIGN_BIT and b < SIGN_BIT:
+                    flags = regs[FLAGS] & CLEAR_FLAGS
+                    if a < b:
+                        flags |= borrow
+                    elif a == b:
+                        flags |= FLAG_Z
+                    regs[FLAGS] = flags
+                    return next_pc
+                regs[FLAGS] = (regs[FLAGS] & CLEAR_FLAGS) | _sub_flags(a, b, (a - b) & WORD_MASK)
+                return next_pc
+            return cmp_reg
+
+        first = self._reader(modes[0], operands[0], next_pc)
+        second = self._reader(modes[1], operands[1], next_pc)
+
+        def cmp() -> int:
+            a = first()
+            b = second()
+            regs[FLAGS] = (regs[FLAGS] & CLEAR_FLAGS) | _sub_flags(a, b, (a - b) & WORD_MASK)
+            return next_pc
+        return cmp
+
+    def _build_jump(self, opcode: int, modes: List[int], operands: List[int], next_pc: int) -> Handler:
+        _require(operands, 1)
+        regs = self.regs
+        taken = JUMP_TABLES[binary_to_opcode(opcode)]
+
+        if modes[0] == IMM:
+            target = operands[0]
+            if taken is None:
+                return lambda: target
+
+            def jump_imm() -> int:
+                return target if taken[regs[FLAGS] & CONDITION_FLAGS] else next_pc
+            return jump_imm
+
+        target_of = self._reader(modes[0], operands[0], next_pc)
+        if taken is None:
+            return target_of
+
+        def jump() -> int:
+            return target_of() if taken[regs[FLAGS] & CONDITION_FLAGS] else next_pc
+        return jump
+
+    def _build_arithmetic(self, opcode: int, modes: List[int], operands: List[int], next_pc: int) -> Handler:
+        _require(operands, 2)
+        regs = self.regs
+        name = binary_to_opcode(opcode)
+        operation = BINARY_OPERATIONS[name]
+
+        # Without a destination the result goes to the first source
+        dest = 2 if len(operands) > 2 else 0
+        store = self._writer(modes[dest], operands[dest])
+
+        # Register/immediate forms skip the accessor calls
+        if modes[0] == REG and modes[1] in (REG, IMM) and modes[dest] == REG and PC not in operands[:3]:
+            for index in range(len(operands[:3])):
+                if modes[index] == REG:
+                    _check_register(operands[index])
+            left, right, target = operands[0], operands[1], operands[dest]
+
+            if name == "add" and modes[1] == IMM:
+                constant = right & WORD_MASK
+
+                def add_imm() -> int:
+                    a = regs[left]
+                    total = a + constant
+                    if total < SIGN_BIT:
+                        # Both addends non-negative and no sign: no carry or overflow either
+                        regs[FLAGS] = regs[FLAGS] & CLEAR_FLAGS | (FLAG_Z if total == 0 else 0)
+                        regs[target] = total
+                        return next_pc
+
+                    result = total & WORD_MASK
+                    flags = regs[FLAGS] & CLEAR_FLAGS
+                    if result == 0:
+                        flags |= FLAG_Z
+                    elif result & SIGN_BIT:
+                        flags |= FLAG_S
+                    if total > WORD_MASK:
+                        flags |= FLAG_C
+                    if (a ^ result) & (constant ^ result) & SIGN_BIT:
+                        flags |= FLAG_O
+                    regs[FLAGS] = flags
+                    regs[target] = result
+                    return next_pc
+                return add_imm
+
+            if name == "add":
+                def add_reg() -> int:
+                    a = regs[left]
+                    b = regs[right]
+                    total = a + b
+                    if total < SIGN_BIT:
+                        regs[FLAGS] = regs[FLAGS] & CLEAR_FLAGS | (FLAG_Z if total == 0 else 0)
+                        regs[target] = total
+                        return next_pc
+
+                    result = total & WORD_MASK
+                    flags = regs[FLAGS] & CLEAR_FLAGS
+                    if result == 0:
+                        flags |= FLAG_Z
+                    elif result & SIGN_BIT:
+                        flags |= FLAG_S
+                    if total > WORD_MASK:
+                        flags |= FLAG_C
+                    if (a ^ result) & (b ^ result) & SIGN_BIT:
+                        flags |= FLAG_O
+                    regs[FLAGS] = flags
+                    regs[target] = result
+                    return next_pc
+                return add_reg
+
+            if name == "sub":
+                # A constant is read as a register that never changes
+                constant = right & WORD_MASK if modes[1] == IMM else None
+                borrow = FLAG_S | FLAG_C
+
+                def sub() -> int:
+                    a = regs[left]
+                    b = regs[right] if constant is None else constant
+                    result = (a - b) & WORD_MASK
+                    if a < SIGN_BIT and b < SIGN_BIT:
+                        # Both non-negative: no overflow, and a borrow always sets the sign
+                        flags = regs[FLAGS] & CLEAR_FLAGS
+                        if a < b:
+                            flags |= borrow
+                        elif a == b:
+                            flags |= FLAG_Z
+                        regs[FLAGS] = flags
+                    else:
+                        regs[FLAGS] = (regs[FLAGS] & CLEAR_FLAGS) | _sub_flags(a, b, result)
+                    regs[target] = result
+                    return next_pc
+                return sub
+
+            if modes[1] == IMM:
+                constant = right & WORD_MASK
+
+                def arithmetic_imm() -> int:
+                    result, flags = operation(regs[left], constant)
+                    regs[FLAGS] = (regs[FLAGS] & CLEAR_FLAGS) | flags
+                    regs[target] = result
+                    return next_pc
+                return arithmetic_imm
+
+            def arithmetic_reg() -> int:
+                result, flags = operation(regs[left], regs[right])
+                regs[FLAGS] = (regs[FLAGS] & CLEAR_FLAGS) | flags
+                regs[target] = result
+                return next_pc
+            return arithmetic_reg
+
+        first = self._reader(modes[0], operands[0], next_pc)
+        second = self._reader(modes[1], operands[1], next_pc)
+
+        def arithmetic() -> int:
+            result, flags = operation(first(), second())
+            regs[FLAGS] = (regs[FLAGS] & CLEAR_FLAGS) | flags
+            store(result)
+            return next_pc
+        return arithmetic
+
+    def _build_unary(self, opcode: int, modes: List[int], operands: List[int], next_pc: int) -> Handler:
+        _require(operands, 1)
+        regs = self.regs
+        operation = UNARY_OPERATIONS[binary_to_opcode(opcode)]
+
+        if modes[0] == REG and operands[0] != PC:
+            _check_register(operands[0])
+            target = operands[0]
+
+            def unary_reg() -> int:
+                result, flags = operation(regs[target], regs[FLAGS])
+                regs[FLAGS] = flags
+                regs[target] = result
+                return next_pc
+            return unary_reg
+
+        value_of = self._reader(modes[0], operands[0], next_pc)
+        store = self._writer(modes[0], operands[0])
+
+        def unary() -> int:
+            result, flags = operation(value_of(), regs[FLAGS])
+            regs[FLAGS] = flags
+            store(result)
+            return next_pc
+        return unary
+
+    def _build_shift(self, opcode: int, modes: List[int], operands: List[int], next_pc: int) -> Handler:
+        _require(operands, 2)
+        regs = self.regs
+        operation = SHIFT_OPERATIONS[binary_to_opcode(opcode)]
+        amount_of = self._reader(modes[0], operands[0], next_pc)
+        value_of = self._reader(modes[1], operands[1], next_pc)
+        store = self._writer(modes[1], operands[1])
+
+        def shift() -> int:
+            result, flags = operation(value_of(), amount_of())
+            regs[FLAGS] = (regs[FLAGS] & CLEAR_FLAGS) | flags
+            store(result)
+            return next_pc
+        return shift
+
+    def _build_int(self, _opcode: int, modes: List[int], operands: List[int], next_pc: int) -> Handler:
+        _require(operands, 1)
+        number_of = self._reader(modes[0], operands[0], next_pc)
+        return lambda: self.interrupt(number_of(), next_pc)
+
+    def _build_iret(self, _opcode: int, _modes: List[int], _operands: List[int], _next_pc: int) -> Handler:
+        return self.return_from_interrupt
+
+    def _build_push(self, _opcode: int, modes: List[int], operands: List[int], next_pc: int) -> Handler:
+        _require(operands, 1)
+        value_of = self._reader(modes[0], operands[0], next_pc)
+        push = self.push
+
+        def push_value() -> int:
+            push(value_of())
+            return next_pc
+        return push_value
+
+    def _build_pop(self, _opcode: int, modes: List[int], operands: List[int], next_pc: int) -> Handler:
+        _require(operands, 1)
+        store = self._writer(modes[0], operands[0])
+        pop = self.pop
+
+        def pop_value() -> int:
+            store(pop())
+            return next_pc
+        return pop_value
+
+    def _build_call(self, _opcode: int, modes: List[int], operands: List[int], next_pc: int) -> Handler:
+        _require(operands, 1)
+        target_of = self._reader(modes[0], operands[0], next_pc)
+        push = self.push
+
+        def call() -> int:
+            target = target_of()
+            push(next_pc)
+            return target
+        return call
+
+    def _build_ret(self, _opcode: int, _modes: List[int], _operands: List[int], _next_pc: int) -> Handler:
+        return self.pop
+
+    def _build_in(self, _opcode: int, modes: List[int], operands: List[int], next_pc: int) -> Handler:
+        _require(operands, 2)
+        port = _port_operand(modes[0], operands[0])
+        store = self._writer(modes[1], operands[1])
+        read_port = self.read_port
+
+        def port_in() -> int:
+            store(read_port(port))
+            return next_pc
+        return port_in
+
+    def _build_out(self, _opcode: int, modes: List[int], operands: List[int], next_pc: int) -> Handler:
+        _require(operands, 2)
+        value_of = self._reader(modes[0], operands[0], next_pc)
+        port = _port_operand(modes[1], operands[1])
+        write_port = self.write_port
+
+        if port == TIMER_PORT:
+            # The timer port is read-only to programs; only the host sets the period, through the scheduler
+            def port_out_ignored() -> int:
+                value_of()
+                return next_pc
+            return port_out_ignored
+
+        def port_out() -> int:
+            write_port(port, value_of())
+            return next_pc
+        return port_out
+
+    # ---- Stack and interrupts ----
+
+    def push(self, value: int) -> None:
+        """Push a word onto the stack."""
+        regs = self.regs
+        sp = regs[SP] - 1
+        if sp < MEMORY_MAP["SS"].start:
+            raise EmulatorError(f"Stack overflow at SP {sp:#x}")
+        self.memory.write(sp, value)
+        regs[SP] = sp
+
+    def pop(self) -> int:
+        """Pop a word from the stack."""
+        regs = self.regs
+        sp = regs[SP]
+        if sp >= MEMORY_MAP["SS"].end:
+            raise EmulatorError(f"Stack underflow at SP {sp:#x}")
+        regs[SP] = sp + 1
+        return self.memory.read(sp)
+
+    def interrupt(self, number: int, return_pc: int) -> int:
+        """
+        Enter an interrupt handler through the IVT and return its address.
+
+        An IVT entry of 0x00 is a NOP. Otherwise R0-R7, FLAGS and PC are pushed
+        in that order before jumping to the handler.
+        """
+        handler = self.memory.read(self.regs[IVT] + number)
+        if handler == 0:
+            return return_pc
+
+        regs = self.regs
+        for register in GENERAL_REGISTERS:
+            self.push(regs[register])
+        self.push(regs[FLAGS])
+        self.push(return_pc)
+        return handler
+
+    def return_from_interrupt(self) -> int:
+        """Restore PC, FLAGS and R0-R7 from the stack and return the PC to resume at."""
+        regs = self.regs
+        frame = regs[SP]
+        pc = self.pop()
+        regs[FLAGS] = self.pop()
+        for register in reversed(GENERAL_REGISTERS):
+            regs[register] = self.pop()
+        if any([listener(frame) for listener in self.interrupt_return_listeners]):
+            raise MachineYield(pc)
+        return pc
+
+
+# ---- Instruction semantics ----
+
+def destination_operand(name: str, operand_count: int) -> Optional[int]:
+    """
+    Return the index of the operand an instruction writes.
+
+    Args:
+        name (str): The instruction mnemonic.
+        operand_count (int): Number of operands the instruction has.
+
+    Returns:
+        Optional[int]: The operand index, or None if the instruction writes no operand.
+    """
+    if name in ("mov", "shl", "shr", "rol", "ror", "in"):
+        index = 1
+    elif name in ("add", "sub", "mul", "div", "and", "or", "xor"):
+        index = 2 if operand_count > 2 else 0
+    elif name in ("inc", "dec", "neg", "not", "bswap", "pop"):
+        index = 0
+    else:
+        return None
+    return index if index < operand_count else None
+
+
+def _fault(message: str) -> Handler:
+    """Build a handler that raises EmulatorError when executed."""
+    def fault() -> int:
+        raise EmulatorError(message)
+    return fault
+
+
+def _require(operands: Sequence[int], count: int) -> None:
+    if len(operands) < count:
+        raise EmulatorError(f"expected at least {count} operands, got {len(operands)}")
+
+
+def _check_register(index: int) -> None:
+    if index >= REGISTER_COUNT:
+        raise EmulatorError(f"unknown register {index:#x}")
+
+
+def _port_operand(mode: int, value: int) -> int:
+    if mode != PORT or value >= PORT_COUNT:
+        raise EmulatorError(f"invalid port operand {value:#x}")
+    return value
+
+
+def _result_flags(result: int) -> int:
+    """Zero and sign flags of a 64-bit result."""
+    flags = FLAG_Z if result == 0 else 0
+    if result & SIGN_BIT:
+        flags |= FLAG_S
+    return flags
+
+
+def _sub_flags(a: int, b: int, result: int) -> int:
+    """Flags of a - b."""
+    flags = _result_flags(result)
+    if a < b:
+        flags |= FLAG_C
+    if (a ^ b) & (a ^ result) & SIGN_BIT:
+        flags |= FLAG_O
+    return flags
+
+
+def _add(a: int, b: int):
+    total = a + b
+    result = total & WORD_MASK
+    flags = _result_flags(result)
+    if total > WORD_MASK:
+        flags |= FLAG_C
+    if (a ^ result) & (b ^ result) & SIGN_BIT:
+        flags |= FLAG_O
+    return result, flags
+
+
+def _sub(a: int, b: int):
+    result = (a - b) & WORD_MASK
+    return result, _sub_flags(a, b, result)
+
+
+def _mul(a: int, b: int):
+    product = a * b
+    result = product & WORD_MASK
+    flags = _result_flags(result)
+    if product > WORD_MASK:
+        flags |= FLAG_C | FLAG_O
+    return result, flags
+
+
+def _div(a: int, b: int):
+    if b == 0:
+        raise EmulatorError("Division by zero")
+    result = a // b
+    return result, _result_flags(result)
+
+
+def _logic(operation: Callable[[int, int], int]):
+    def logic(a: int, b: int):
+        result = operation(a, b)
+        return result, _result_flags(result)
+    return logic
+
+
+def _inc(value: int, flags: int):
+    result = (value + 1) & WORD_MASK
+    flags = (flags & ~(FLAG_Z | FLAG_S | FLAG_O)) | _result_flags(result)
+    if result == SIGN_BIT:
+        flags |= FLAG_O
+    return result, flags
+
+
+def _dec(value: int, flags: int):
+    result = (value - 1) & WORD_MASK
+    flags = (flags & ~(FLAG_Z | FLAG_S | FLAG_O)) | _result_flags(result)
+    if value == SIGN_BIT:
+        flags |= FLAG_O
+    return result, flags
+
+
+def _neg(value: int, flags: int):
+    result = -value & WORD_MASK
+    flags = (flags & CLEAR_FLAGS) | _result_flags(result)
+    if value:
+        flags |= FLAG_C
+    if value == SIGN_BIT:
+        flags |= FLAG_O
+    return result, flags
+
+
+def _not(value: int, flags: int):
+    result = ~value & WORD_MASK
+    return result, (flags & ~(FLAG_Z | FLAG_S)) | _result_flags(result)
+
+
+def _bswap(value: int, flags: int):
+    return int.from_bytes(value.to_bytes(8, 'little'), 'big'), flags
+
+
+def _shl(value: int, amount: int):
+    shifted = value << (amount & 63)
+    result = shifted & WORD_MASK
+    flags = _result_flags(result)
+    if shifted > WORD_MASK:
+        flags |= FLAG_C
+    return result, flags
+
+
+def _shr(value: int, amount: int):
+    amount &= 63
+    result = value >> amount
+    flags = _result_flags(result)
+    if amount and (value >> (amount - 1)) & 1:
+        flags |= FLAG_C
+    return result, flags
+
+
+def _rol(value: int, amount: int):
+    amount &= 63
+    result = ((value << amount) | (value >> (64 - amount))) & WORD_MASK
+    return result, _result_flags(result)
+
+
+def _ror(value: int, amount: int):
+    amount &= 63
+    result = ((value >> amount) | (value << (64 - amount))) & WORD_MASK
+    return result, _result_flags(result)
+
+
+def _signed_less(flags: int) -> bool:
+    return bool(flags & FLAG_S) != bool(flags & FLAG_O)
+
+
+BINARY_OPERATIONS = {
+    "add": _add,
+    "sub": _sub,
+    "mul": _mul,
+    "div": _div,
+    "and": _logic(lambda a, b: a & b),
+    "or": _logic(lambda a, b: a | b),
+    "xor": _logic(lambda a, b: a ^ b),
+}
+
+UNARY_OPERATIONS = {
+    "inc": _inc,
+    "dec": _dec,
+    "neg": _neg,
+    "not": _not,
+    "bswap": _bswap,
+}
+
+SHIFT_OPERATIONS = {
+    "shl": _shl,
+    "shr": _shr,
+    "rol": _rol,
+    "ror": _ror,
+}
+
+# Branch conditions on the Z, S and O bits of FLAGS; None means always taken
+_JUMP_CONDITIONS: Dict[str, Optional[Callable[[int], bool]]] = {
+    "jmp": None,
+    "jz": lambda flags: bool(flags & FLAG_Z),
+    "jnz": lambda flags: not flags & FLAG_Z,
+    "jl": _signed_less,
+    "jle": lambda flags: bool(flags & FLAG_Z) or _signed_less(flags),
+    "jg": lambda flags: not flags & FLAG_Z and not _signed_less(flags),
+    "jge": lambda flags: not _signed_less(flags),
+}
+
+# Each condition tabulated over every combination of the bits it reads
+JUMP_TABLES: Dict[str, Optional[tuple]] = {
+    name: None if condition is None else tuple(condition(flags) for flags in range(CONDITION_FLAGS + 1))
+    for name, condition in _JUMP_CONDITIONS.items()
+}
+
+
+def print_memory_report(memory: PagedMemory) -> None:
+    """Print the host memory resident for each memory region."""
+    print("---- Resident Memory ----")
+    for region, resident in memory.resident_report():
+        print(f"{region.shorthand:<3} {region.name:<18} {resident / 1024:>10,.1f} KB "
+              f"of {region.size * WORD_BYTES / (1024 * 1024):>8,.1f} MB")
+    print(f"Total: {memory.resident_bytes / 1024:,.1f} KB")
+
+
+def main() -> None:
+    """Run a ROM and report the console output and instructions per second."""
+    parser = argparse.ArgumentParser(description="Run a VFOX ROM on the Viso-Fox emulator.")
+    parser.add_argument('rom', help="ROM file to run")
+    parser.add_argument('--max-instructions', type=int, default=-1,
+                        help="stop after this many instructions (default: run until hlt)")
+    parser.add_argument('--timer', type=int, default=0, metavar='PERIOD',
+                        help="fire the timer interrupt every PERIOD instructions after its handler returns")
+    parser.add_argument('--input-script', metavar='FILE',
+                        help="write '<instruction> <port> <value>' lines to ports 0x00-0x05 as the ROM runs")
+    parser.add_argument('--serve-console', metavar='HOST:PORT',
+                        help="serve the console over TCP while the ROM runs")
+    parser.add_argument('--memory-report', action='store_true',
+                        help="report the host memory resident for each memory region")
+    parser.add_argument('--version', action='version', version=f"emulator version {VERSION}")
+    args = parser.parse_args()
+
+    machine = Machine()
+    try:
+        machine.load_rom(args.rom)
+        script = read_input_script(args.input_script) if args.input_script else None
+    except FileNotFoundError as error:
+        print(f"Error: File '{error.filename}' not found.")
+        sys.exit(1)
+    except (ValueError, MemoryFault) as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+
+    address = None
+    if args.serve_console:
+        host, _, port = args.serve_console.rpartition(':')
+        if not port.isdigit():
+            print(f"Error: Expected HOST:PORT, got '{args.serve_console}'.")
+            sys.exit(1)
+        address = (host or "127.0.0.1", int(port))
+
+    # Console output is written as it is flushed rather than at the end
+    console_bytes: int = 0
+
+    def write_console(chunk: bytes) -> None:
+        nonlocal console_bytes
+        console_bytes += len(chunk)
+        sys.stdout.write(chunk.decode('ascii', errors='replace'))
+
+    machine.console_sink = write_console
+
+    run = machine.run
+    if args.timer > 0:
+        scheduler = EventScheduler(machine)
+        scheduler.set_timer(args.timer)
+        run = scheduler.run
+
+    start = time.perf_counter()
+    try:
+        if address is not None:
+            print(f"Serving the console on {address[0]}:{address[1]}")
+            executed = asyncio.run(ConsoleServer(machine, run=run).serve(*address, args.max_instructions))
+        elif script is not None:
+            limit = args.max_instructions if args.max_instructions >= 0 else sys.maxsize
+            replay_input(machine, script, limit, run)
+            executed = machine.instructions
+        else:
+            executed = run(args.max_instructions)
+            machine.flush_console()
+    except (EmulatorError, MemoryFault) as error:
+        machine.flush_console()
+        print(f"\nError: {error}" if console_bytes else f"Error: {error}")
+        sys.exit(1)
+    except OSError as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+    elapsed = max(time.perf_counter() - start, 1e-9)
+
+    if console_bytes:
+        sys.stdout.write("\n")
+
+    state = "halted" if machine.halted else "stopped"
+    print(f"---- Machine {state} at PC {machine.regs[PC]:#x} ----")
+    print(f"Executed {executed:,} instructions in {elapsed:.3f}s ({executed / elapsed:,.0f} IPS)")
+
+    if args.memory_report:
+        print_memory_report(machine.memory)
+
+
+if __name__ == "__main__":
+    main()
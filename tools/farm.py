@@ -0,0 +1,227 @@
+"""Run ROMs against many input scripts on a pool of emulator processes."""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from disassembler import OFFSET_TYPECODE, InstructionStream, ROMImage, convert_to_instructions
+from emulator import PC, EmulatorError, Machine, MachineSnapshot
+from memory import MemoryFault
+from port_io import InputScript, read_input_script, replay_input
+
+# Version of the farm runner
+VERSION = "1.0.0"
+
+# Instructions a run may execute before it is stopped
+DEFAULT_MAX_INSTRUCTIONS = 10_000_000
+
+# Runs handed to a worker at once, per worker
+CHUNKS_PER_WORKER = 4
+
+# Script of a run without input
+EMPTY_SCRIPT = InputScript(array('Q'), array('B'), array('Q'))
+
+class SharedImage(NamedTuple):
+    """Where a ROM's sections and instruction stream live in a shared memory block, in words."""
+    rom: str
+    block: str           # shared memory block name
+    base: int            # address of the first code word
+    data_words: int
+    code_words: int
+    instructions: int
+    operand_words: int
+
+
+class RunResult(NamedTuple):
+    """The outcome of one ROM run against one input script."""
+    rom: str
+    script: Optional[str]
+    console: str
+    halted: bool
+    instructions: int
+    pc: int
+    error: Optional[str]
+
+
+def share_rom(filename: str) -> Tuple[SharedImage, shared_memory.SharedMemory]:
+    """
+    Decode a ROM once and copy its sections and instruction stream into shared memory.
+
+    The block holds, in order, the data words, the code words, and the
+    headers, offsets and operands of convert_to_instructions.
+
+    Args:
+        filename (str): The ROM file.
+
+    Returns:
+        Tuple[SharedImage, shared_memory.SharedMemory]: The layout and the block, which the caller must unlink.
+    """
+    # ROMImage checks the header with read_rom_header
+    with ROMImage(filename) as rom:
+        data = array('Q', rom.data_section)
+        code = array('Q', rom.code_section)
+    stream = convert_to_instructions(code)
+
+    parts = (data, code, stream.headers, stream.offsets, stream.operands)
+    size = sum(len(part) * part.itemsize for part in parts)
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+
+    offset: int = 0
+    for part in parts:
+        raw = part.tobytes()
+        block.buf[offset:offset + len(raw)] = raw
+        offset += len(raw)
+
+    image = SharedImage(filename, block.name, stream.base, len(data), len(code), len(stream), len(stream.operands))
+    return image, block
+
+
+# Per worker process: attached blocks, and a booted machine with its boot snapshot per ROM
+_blocks: Dict[str, shared_memory.SharedMemory] = {}
+_machines: Dict[str, Tuple[Machine, MachineSnapshot]] = {}
+
+
+def _attach(image: SharedImage) -> Tuple[memoryview, memoryview, InstructionStream]:
+    """Map a shared image's sections and instruction stream without copying them."""
+    block = _blocks.get(image.block)
+    if block is None:
+        block = _blocks[image.block] = shared_memory.SharedMemory(name=image.block)
+
+    views = []
+    offset: int = 0
+    for typecode, length in (('Q', image.data_words), ('Q', image.code_words), ('Q', image.instructions),
+                             (OFFSET_TYPECODE, image.instructions + 1), ('Q', image.operand_words)):
+        size = length * array(typecode).itemsize
+        views.append(block.buf[offset:offset + size].cast(typecode))
+        offset += size
+
+    return views[0], views[1], InstructionStream(views[2], views[3], views[4], image.base)
+
+
+def _machine_for(image: SharedImage) -> Tuple[Machine, MachineSnapshot]:
+    """Boot a machine from a shared image once per worker; later runs restore its boot snapshot."""
+    booted = _machines.get(image.block)
+    if booted is None:
+        data, code, stream = _attach(image)
+        machine = Machine()
+        machine.load_image(data, code, stream)
+        booted = _machines[image.block] = (machine, machine.snapshot())
+    return booted
+
+
+def _run_chunk(image: SharedImage, scripts: List[Tuple[Optional[str], InputScript]],
+               max_instructions: int) -> List[RunResult]:
+    """Worker task: run one ROM against a chunk of scripts, each from the boot snapshot."""
+    machine, boot = _machine_for(image)
+    results = []
+    for name, script in scripts:
+        machine.restore(boot)
+        error = None
+        try:
+            replay_input(machine, script, max_instructions)
+        except (EmulatorError, MemoryFault) as failure:
+            error = str(failure)
+        results.append(RunResult(image.rom, name, machine.console.decode('ascii', errors='replace'),
+                                 machine.halted, machine.instructions, machine.regs[PC], error))
+    return results
+
+
+def _chunks(items: Sequence, count: int) -> Iterator[Sequence]:
+    size = max(-(-len(items) // max(count, 1)), 1)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def run_farm(roms: Sequence[str], scripts: Sequence[Tuple[Optional[str], InputScript]],
+             jobs: int, max_instructions: int) -> Iterator[RunResult]:
+    """
+    Run every ROM against every script across worker processes.
+
+    Each ROM is decoded once in this process and shared read-only with the
+    workers. A worker boots a ROM once, snapshots it, and restores the
+    snapshot before each run, so a run costs only the pages it touches.
+
+    Args:
+        roms (Sequence[str]): The ROM files.
+        scripts (Sequence[Tuple[Optional[str], InputScript]]): Script names and their events.
+        jobs (int): Worker processes.
+        max_instructions (int): Instructions after which a run is stopped.
+
+    Yields:
+        RunResult: One per ROM and script, in ROM then script order.
+    """
+    blocks: List[shared_memory.SharedMemory] = []
+    try:
+        images = []
+        for rom in roms:
+            image, block = share_rom(rom)
+            images.append(image)
+            blocks.append(block)
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(_run_chunk, image, list(chunk), max_instructions)
+                       for image in images for chunk in _chunks(scripts, jobs * CHUNKS_PER_WORKER)]
+            for future in futures:
+                yield from future.result()
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def main() -> None:
+    """Run a ROM test corpus from the command line."""
+    parser = argparse.ArgumentParser(description="Run VFOX ROMs against input scripts "
+                                                 "on a pool of emulator processes.")
+    parser.add_argument('roms', nargs='+', help="ROM files to run")
+    parser.add_argument('--scripts', nargs='*', default=[], metavar='SCRIPT',
+                        help="input scripts, one run per ROM and script (default: one run without input)")
+    parser.add_argument('--output', default="farm-results.jsonl", help="results file, one JSON object per run")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--max-instructions', type=int, default=DEFAULT_MAX_INSTRUCTIONS,
+                        help=f"stop a run after this many instructions (default: {DEFAULT_MAX_INSTRUCTIONS:,})")
+    parser.add_argument('--version', action='version', version=f"farm version {VERSION}")
+    args = parser.parse_args()
+
+    try:
+        scripts = [(name, read_input_script(name)) for name in args.scripts] or [(None, EMPTY_SCRIPT)]
+    except FileNotFoundError as error:
+        print(f"Error: File '{error.filename}' not found.")
+        sys.exit(1)
+    except ValueError as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    runs: int = 0
+    instructions: int = 0
+    failures: int = 0
+    try:
+        with open(args.output, 'w', encoding='utf-8') as out:
+            for result in run_farm(args.roms, scripts, max(args.jobs, 1), args.max_instructions):
+                out.write(json.dumps(result._asdict()) + "\n")
+                runs += 1
+                instructions += result.instructions
+                failures += result.error is not None
+    except FileNotFoundError as error:
+        print(f"Error: File '{error.filename}' not found.")
+        sys.exit(1)
+    except (ValueError, MemoryFault) as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+    elapsed = max(time.perf_counter() - start, 1e-9)
+
+    print(f"Ran {runs:,} runs ({failures:,} failed) in {elapsed:.3f}s: {runs / elapsed:,.1f} runs/s, "
+          f"{instructions / elapsed:,.0f} IPS")
+    print(f"Results written to '{args.output}'.")
+
+
+if __name__ == "__main__":
+    main()
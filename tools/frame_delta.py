@@ -0,0 +1,142 @@
+"""Utility module for compact frame-delta streams of the Graphics Segment."""
+
+import struct
+import sys
+import zlib
+
+from array import array
+from typing import BinaryIO, Iterator, List, Tuple
+
+from memory_map import GRAPHICS_ROW_WORDS, MEMORY_MAP, WORD_BYTES
+
+# Stream header: magic, version, rows per frame and words per row
+DELTA_MAGIC = b"VFXD"
+DELTA_VERSION = 1
+DELTA_HEADER = struct.Struct("<4sIHH")
+
+# Frame record: frame number and compressed payload length
+FRAME_RECORD = struct.Struct("<II")
+
+# Run of changed rows inside a payload: first row and row count, followed by the rows' words
+RUN_RECORD = struct.Struct("<HH")
+
+GRAPHICS_ROWS = MEMORY_MAP["GS"].size // GRAPHICS_ROW_WORDS
+
+
+def dirty_runs(dirty: bytearray) -> List[Tuple[int, int]]:
+    """
+    Return runs of consecutive nonzero bytes.
+
+    Args:
+        dirty (bytearray): One byte per row, nonzero for dirty rows.
+
+    Returns:
+        List[Tuple[int, int]]: (first row, row count) of each run, in row order.
+    """
+    runs = []
+    start = dirty.find(1)
+    while start != -1:
+        end = dirty.find(0, start)
+        if end == -1:
+            end = len(dirty)
+        runs.append((start, end - start))
+        start = dirty.find(1, end)
+    return runs
+
+
+def _word_bytes(words: array) -> bytes:
+    """Little-endian bytes of an array('Q')."""
+    if sys.byteorder == 'big':
+        words = array('Q', words)
+        words.byteswap()
+    return words.tobytes()
+
+
+class FrameDeltaWriter:
+    """
+    Write a stream of Graphics Segment changes, one zlib-compressed record per frame.
+
+    Each record holds only the runs of rows that changed since the previous
+    frame, as raw palette indexes, so a mostly static display costs a few
+    bytes per frame.
+    """
+
+    def __init__(self, filename: str) -> None:
+        self._file: BinaryIO = open(filename, 'wb')
+        self._file.write(DELTA_HEADER.pack(DELTA_MAGIC, DELTA_VERSION, GRAPHICS_ROWS, GRAPHICS_ROW_WORDS))
+        self.frames: int = 0
+        self.bytes_written: int = DELTA_HEADER.size
+
+    def write(self, frame_number: int, runs: List[Tuple[int, array]]) -> None:
+        """
+        Append one frame.
+
+        Args:
+            frame_number (int): The frame's number.
+            runs (List[Tuple[int, array]]): First row and array('Q') words of each changed run.
+        """
+        payload = b"".join(
+            RUN_RECORD.pack(first_row, len(words) // GRAPHICS_ROW_WORDS) + _word_bytes(words)
+            for first_row, words in runs
+        )
+        compressed = zlib.compress(payload, 6)
+        self._file.write(FRAME_RECORD.pack(frame_number, len(compressed)))
+        self._file.write(compressed)
+        self.frames += 1
+        self.bytes_written += FRAME_RECORD.size + len(compressed)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "FrameDeltaWriter":
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.close()
+
+
+def read_frame_deltas(filename: str) -> Iterator[Tuple[int, array, List[Tuple[int, int]]]]:
+    """
+    Replay a frame-delta stream.
+
+    Args:
+        filename (str): The delta stream file.
+
+    Yields:
+        Tuple[int, array, List[Tuple[int, int]]]: The frame number, the whole
+        Graphics Segment as array('Q') after applying the frame (reused between
+        frames), and the (first row, row count) runs that changed.
+
+    Raises:
+        ValueError: If the file is not a frame-delta stream this version reads.
+    """
+    with open(filename, 'rb') as f:
+        magic, version, rows, row_words = DELTA_HEADER.unpack(f.read(DELTA_HEADER.size))
+        if magic != DELTA_MAGIC or version != DELTA_VERSION:
+            raise ValueError("Invalid frame-delta stream.")
+
+        graphics = array('Q', bytes(rows * row_words * WORD_BYTES))
+        while True:
+            record = f.read(FRAME_RECORD.size)
+            if len(record) < FRAME_RECORD.size:
+                break
+            frame_number, length = FRAME_RECORD.unpack(record)
+            payload = zlib.decompress(f.read(length))
+
+            runs = []
+            offset: int = 0
+            while offset < len(payload):
+                first_row, count = RUN_RECORD.unpack_from(payload, offset)
+                offset += RUN_RECORD.size
+                size = count * row_words * WORD_BYTES
+
+                words = array('Q')
+                words.frombytes(payload[offset:offset + size])
+                if sys.byteorder == 'big':
+                    words.byteswap()
+                graphics[first_row * row_words:(first_row + count) * row_words] = words
+
+                runs.append((first_row, count))
+                offset += size
+
+            yield frame_number, graphics, runs
@@ -0,0 +1,262 @@
+"""Utility module for assembler object files and linking them into a VFOX ROM."""
+
+import json
+import struct
+import sys
+
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from opcode_table import MNEMONIC_LUT
+from addressing_table import REVERSE_ADDRESSING_MODE_LUT
+from memory_map import CODE_SEGMENT_START, DATA_SEGMENT_START
+from disassembler import INSTRUCTION_LAYOUT, write_rom
+
+# Object file header: magic, version, data words, code words and symbol table bytes
+OBJECT_MAGIC = b"VFXO"
+OBJECT_VERSION = 1
+OBJECT_HEADER = struct.Struct("<4sIQQI")
+
+# Default entry label
+DEFAULT_ENTRY = "main"
+
+# "jmp #entry", placed first when the entry label is not at the start of the code section
+ENTRY_JUMP = (INSTRUCTION_LAYOUT["DESIGNATION"][1]
+              | MNEMONIC_LUT["jmp"] << INSTRUCTION_LAYOUT["OPCODE"][0]
+              | 1 << INSTRUCTION_LAYOUT["OPERAND_COUNT"][0]
+              | REVERSE_ADDRESSING_MODE_LUT["IMM"] << INSTRUCTION_LAYOUT["MODE1"][0])
+ENTRY_JUMP_WORDS = 2
+
+
+class LinkError(Exception):
+    """Raised when objects cannot be linked, e.g. for undefined or duplicate symbols."""
+
+
+class ObjectSymbol(NamedTuple):
+    """A symbol defined by an object file."""
+    section: str            # "code" or "data" for addresses, "real" for @real values
+    value: int              # word offset in its section, or the @real value
+    alias: Optional[str]    # symbol an @real is defined as, resolved at link time
+    line: int
+
+
+class Relocation(NamedTuple):
+    """A word to patch with a symbol's value at link time."""
+    section: str   # "data" or "code"
+    index: int     # word offset in the object's section
+    symbol: str
+    line: int
+
+
+class ObjectFile(NamedTuple):
+    """One assembled source file, not yet placed in the ROM."""
+    source: str
+    data: array                        # 'Q', data section words
+    code: array                        # 'Q', code section words
+    symbols: Dict[str, ObjectSymbol]
+    relocations: List[Relocation]
+    entry: Optional[str]               # entry label from "@meta entry", if any
+    assembly_seconds: float            # time taken to assemble, for cache reports
+
+
+class AssembledProgram(NamedTuple):
+    """An assembled program, ready to be written as a ROM."""
+    data: array               # 'Q', data section words
+    code: array               # 'Q', code section words
+    symbols: Dict[str, int]   # label, array and real names -> value
+    entry: int                # address of the entry point
+
+
+def object_imports(obj: ObjectFile) -> List[str]:
+    """Return the symbols an object references but does not define, sorted."""
+    names = {relocation.symbol for relocation in obj.relocations}
+    names.update(symbol.alias for symbol in obj.symbols.values() if symbol.alias is not None)
+    return sorted(names.difference(obj.symbols))
+
+
+def _words_bytes(words: array) -> bytes:
+    """Little-endian bytes of an array('Q')."""
+    if sys.byteorder == 'big':
+        words = array('Q', words)
+        words.byteswap()
+    return words.tobytes()
+
+
+def write_object(obj: ObjectFile, filename: str) -> None:
+    """
+    Write an object file.
+
+    Args:
+        obj (ObjectFile): The object to write.
+        filename (str): The file to write.
+    """
+    table = json.dumps({
+        "source": obj.source,
+        "entry": obj.entry,
+        "assembly_seconds": obj.assembly_seconds,
+        "symbols": {name: list(symbol) for name, symbol in obj.symbols.items()},
+        "relocations": [list(relocation) for relocation in obj.relocations],
+    }, separators=(",", ":")).encode('utf-8')
+
+    with open(filename, 'wb') as f:
+        f.write(OBJECT_HEADER.pack(OBJECT_MAGIC, OBJECT_VERSION, len(obj.data), len(obj.code), len(table)))
+        f.write(_words_bytes(obj.data) + _words_bytes(obj.code) + table)
+
+
+def read_object(filename: str) -> ObjectFile:
+    """
+    Read an object file.
+
+    Args:
+        filename (str): The object file.
+
+    Returns:
+        ObjectFile: The object.
+
+    Raises:
+        ValueError: If the file is not an object file this version reads.
+    """
+    with open(filename, 'rb') as f:
+        contents = f.read()
+
+    if len(contents) < OBJECT_HEADER.size:
+        raise ValueError("Invalid object file.")
+    magic, version, data_words, code_words, table_bytes = OBJECT_HEADER.unpack_from(contents)
+    if magic != OBJECT_MAGIC or version != OBJECT_VERSION:
+        raise ValueError("Invalid object file.")
+
+    offset = OBJECT_HEADER.size
+    sections = []
+    for count in (data_words, code_words):
+        words = array('Q')
+        words.frombytes(contents[offset:offset + count * 8])
+        if sys.byteorder == 'big':
+            words.byteswap()
+        sections.append(words)
+        offset += count * 8
+
+    table = json.loads(contents[offset:offset + table_bytes].decode('utf-8'))
+    return ObjectFile(
+        table["source"], sections[0], sections[1],
+        {name: ObjectSymbol(*symbol) for name, symbol in table["symbols"].items()},
+        [Relocation(*relocation) for relocation in table["relocations"]],
+        table["entry"], table["assembly_seconds"],
+    )
+
+
+def link_objects(objects: Sequence[ObjectFile]) -> AssembledProgram:
+    """
+    Place objects one after another and resolve their relocations.
+
+    Data and code sections are concatenated in object order, so write_rom
+    computes the section offsets of the ROM as for a single source. A
+    label or @array name resolves to its address, an @real name to its value.
+
+    Args:
+        objects (Sequence[ObjectFile]): The objects, in link order.
+
+    Returns:
+        AssembledProgram: The linked sections and global symbol table.
+
+    Raises:
+        LinkError: If a symbol is defined twice or never defined, or the entry label is invalid.
+    """
+    # The entry label: at most one distinct "@meta entry" across the objects
+    entries = {obj.entry for obj in objects if obj.entry is not None}
+    if len(entries) > 1:
+        raise LinkError(f"conflicting entry labels: {', '.join(sorted(entries))}")
+    entry = entries.pop() if entries else DEFAULT_ENTRY
+
+    # Global symbol table, remembering where each symbol came from
+    definitions: Dict[str, Tuple[int, ObjectSymbol]] = {}
+    for index, obj in enumerate(objects):
+        for name, symbol in obj.symbols.items():
+            if name in definitions:
+                other = objects[definitions[name][0]]
+                raise LinkError(f"{obj.source}: line {symbol.line}: '{name}' is already defined "
+                                f"in {other.source} at line {definitions[name][1].line}")
+            definitions[name] = (index, symbol)
+
+    # Execution starts at the first code word, so jump to an entry label placed elsewhere
+    defined = definitions.get(entry)
+    if defined is None:
+        if entries:
+            raise LinkError(f"entry label '{entry}' is not defined")
+        prefix: List[int] = []
+    elif defined[1].section != "code":
+        raise LinkError(f"entry '{entry}' is not a code label")
+    else:
+        position = sum(len(obj.code) for obj in objects[:defined[0]]) + defined[1].value
+        prefix = [ENTRY_JUMP, 0] if position != 0 else []
+
+    # Section base of each object
+    data_bases: List[int] = []
+    code_bases: List[int] = []
+    data_length, code_length = 0, len(prefix)
+    for obj in objects:
+        data_bases.append(data_length)
+        code_bases.append(code_length)
+        data_length += len(obj.data)
+        code_length += len(obj.code)
+
+    # Symbol values
+    symbols: Dict[str, int] = {}
+    for name, (index, symbol) in definitions.items():
+        if symbol.section == "code":
+            symbols[name] = CODE_SEGMENT_START + code_bases[index] + symbol.value
+        elif symbol.section == "data":
+            symbols[name] = DATA_SEGMENT_START + data_bases[index] + symbol.value
+    for name in definitions:
+        if name not in symbols:
+            symbols[name] = _real_value(name, definitions, objects, symbols, set())
+
+    # Concatenate the sections and patch every relocation
+    data = array('Q')
+    code = array('Q', prefix)
+    for index, obj in enumerate(objects):
+        data.extend(obj.data)
+        code.extend(obj.code)
+        sections = {"data": (data, data_bases[index]), "code": (code, code_bases[index])}
+        for section, offset, name, line in obj.relocations:
+            value = symbols.get(name)
+            if value is None:
+                raise LinkError(f"{obj.source}: line {line}: undefined symbol '{name}'")
+            words, base = sections[section]
+            words[base + offset] = value
+    if prefix:
+        code[1] = symbols[entry]
+
+    return AssembledProgram(data, code, symbols, symbols[entry] if defined is not None else CODE_SEGMENT_START)
+
+
+def _real_value(name: str, definitions: Dict[str, Tuple[int, ObjectSymbol]], objects: Sequence[ObjectFile],
+                symbols: Dict[str, int], seen: set) -> int:
+    """Resolve an @real defined as another symbol, following chains of @real aliases."""
+    index, symbol = definitions[name]
+    if symbol.alias is None:
+        return symbol.value
+    if name in seen:
+        raise LinkError(f"{objects[index].source}: line {symbol.line}: '{name}' is defined in terms of itself")
+    seen.add(name)
+
+    if symbol.alias in symbols:
+        return symbols[symbol.alias]
+    if symbol.alias not in definitions:
+        raise LinkError(f"{objects[index].source}: line {symbol.line}: undefined symbol '{symbol.alias}'")
+    return _real_value(symbol.alias, definitions, objects, symbols, seen)
+
+
+def link_rom(objects: Sequence[ObjectFile], filename: str) -> AssembledProgram:
+    """
+    Link objects and write the result as a VFOX ROM.
+
+    Args:
+        objects (Sequence[ObjectFile]): The objects, in link order.
+        filename (str): The ROM file to write.
+
+    Returns:
+        AssembledProgram: The linked program.
+    """
+    program = link_objects(objects)
+    write_rom(program.data, [program.code], filename)
+    return program
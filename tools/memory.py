@@ -0,0 +1,285 @@
+"""Memory models for the Viso-Fox emulator, addressed in 64-bit words."""
+
+from array import array
+from bisect import bisect_right
+from typing import Dict, List, Sequence, Tuple
+
+from memory_map import MEMORY_MAP, WORD_BYTES, MemoryRegion
+
+# Mask for a 64-bit word
+WORD_MASK = 0xFFFFFFFFFFFFFFFF
+
+# Pages of 4096 words (32 KB)
+PAGE_SHIFT = 12
+PAGE_WORDS = 1 << PAGE_SHIFT
+PAGE_MASK = PAGE_WORDS - 1
+
+# A page of zeroed words, copied for every new page
+_ZERO_PAGE = array('Q', [0]) * PAGE_WORDS
+
+
+class MemoryFault(IndexError):
+    """Raised for an access outside the memory regions."""
+
+
+class DictMemory:
+    """
+    A sparse word memory backed by a dictionary.
+
+    Words that were never written read as zero, so only touched words cost
+    host memory.
+    """
+
+    def __init__(self, regions: Dict[str, MemoryRegion] = MEMORY_MAP) -> None:
+        self.regions = regions
+        self._words: Dict[int, int] = {}
+
+    def read(self, address: int) -> int:
+        """Read the word at an address."""
+        return self._words.get(address, 0)
+
+    def write(self, address: int, value: int) -> None:
+        """Write a word to an address."""
+        self._words[address] = value & WORD_MASK
+
+    def load(self, address: int, words: Sequence[int]) -> None:
+        """Copy a block of words into memory starting at an address."""
+        self._words.update(zip(range(address, address + len(words)), words))
+
+    def snapshot(self) -> Dict[int, int]:
+        """Return a copy of the written words, for restore."""
+        return dict(self._words)
+
+    def restore(self, image: Dict[int, int]) -> None:
+        """Put memory back to a snapshot image."""
+        self._words.clear()
+        self._words.update(image)
+
+    def changed_words(self, image: Dict[int, int], start: int, end: int) -> List[int]:
+        """Find the addresses in [start, end) whose word differs from a snapshot image."""
+        words = self._words
+        return sorted(address for address in words.keys() | image.keys()
+                      if start <= address < end and words.get(address, 0) != image.get(address, 0))
+
+
+class PagedMemory:
+    """
+    A sparse word memory made of pages allocated on first write.
+
+    Each page is an array('Q') of PAGE_WORDS words, so a machine with 1 GB of
+    address space only costs host memory for the pages it has touched. Reads
+    of unallocated pages return zero without allocating. Accesses outside the
+    memory regions raise MemoryFault.
+
+    Snapshots are copy-on-write: a snapshot takes ownership of the pages
+    and leaves them shared, read-only, behind the private pages. Reads are
+    served from the shared pages in place; the first write to one copies it
+    into the private pages, so snapshots and restores only cost the pages
+    written since the last one.
+    """
+
+    def __init__(self, regions: Dict[str, MemoryRegion] = MEMORY_MAP) -> None:
+        self.regions = regions
+        self.size = max(region.end for region in regions.values())
+        self._pages: Dict[int, array] = {}
+
+        # Pages owned by the last snapshot taken or restored, never written
+        self._shared: Dict[int, array] = {}
+
+        # Shared pages overlaid with the private ones, so reads take a single lookup
+        self._readable: Dict[int, array] = {}
+
+        # Region starts in address order, for boundary lookups
+        self._ordered: List[MemoryRegion] = sorted(regions.values(), key=lambda region: region.start)
+        self._starts: List[int] = [region.start for region in self._ordered]
+
+    def read(self, address: int) -> int:
+        """Read the word at an address."""
+        try:
+            return self._readable[address >> PAGE_SHIFT][address & PAGE_MASK]
+        except KeyError:
+            # Unallocated pages read as zero; only addresses out of range fault
+            self.region_of(address)
+            return 0
+
+    def write(self, address: int, value: int) -> None:
+        """Write a word to an address."""
+        try:
+            self._pages[address >> PAGE_SHIFT][address & PAGE_MASK] = value & WORD_MASK
+        except KeyError:
+            self._page(address)[address & PAGE_MASK] = value & WORD_MASK
+
+    def read_block(self, address: int, count: int) -> array:
+        """
+        Read consecutive words into an array('Q').
+
+        Args:
+            address (int): First word address.
+            count (int): Number of words to read.
+
+        Returns:
+            array: The words, with unallocated pages read as zero.
+        """
+        self._check_block(address, count)
+
+        block = array('Q')
+        end = address + count
+        while address < end:
+            page_end = min((address | PAGE_MASK) + 1, end)
+            number = address >> PAGE_SHIFT
+            page = self._readable.get(number, _ZERO_PAGE)
+            low = address & PAGE_MASK
+            block.extend(page[low:low + page_end - address])
+            address = page_end
+        return block
+
+    def load(self, address: int, words: Sequence[int]) -> None:
+        """
+        Copy a block of words into memory, one page slice at a time.
+
+        Used for the MBS copy of the ROM sections, which must each fit inside
+        a single region.
+
+        Args:
+            address (int): First word address.
+            words (Sequence[int]): The words; an array('Q') or 'Q' memoryview is copied as raw bytes.
+        """
+        count = len(words)
+        self._check_block(address, count)
+
+        if not isinstance(words, array):
+            block = array('Q')
+            if isinstance(words, memoryview):
+                block.frombytes(words.cast('B'))
+            else:
+                block.extend(words)
+            words = block
+
+        offset: int = 0
+        while offset < count:
+            page = self._page(address)
+            low = address & PAGE_MASK
+            length = min(PAGE_WORDS - low, count - offset)
+            page[low:low + length] = words[offset:offset + length]
+            address += length
+            offset += length
+
+    def snapshot(self) -> Dict[int, array]:
+        """
+        Take a snapshot of every allocated page.
+
+        No words are copied: the private pages are handed to the snapshot,
+        which from then on shares them read-only with this memory.
+
+        Returns:
+            Dict[int, array]: The image, page number -> page; must not be modified.
+        """
+        image = dict(self._shared)
+        image.update(self._pages)
+        self._shared = image
+        self._readable = dict(image)
+        self._pages.clear()
+        return image
+
+    def restore(self, image: Dict[int, array]) -> None:
+        """
+        Put memory back to a snapshot image.
+
+        Only the private pages are dropped; the image pages become shared
+        again and are copied on their next write.
+
+        Args:
+            image (Dict[int, array]): An image returned by snapshot().
+        """
+        self._shared = image
+        self._readable = dict(image)
+        self._pages.clear()
+
+    def changed_words(self, image: Dict[int, array], start: int, end: int) -> List[int]:
+        """
+        Find the words of an address range that differ from a snapshot image.
+
+        Pages still shared with the image are skipped without comparing.
+
+        Args:
+            image (Dict[int, array]): An image returned by snapshot().
+            start (int): First address of the range.
+            end (int): End of the range, exclusive.
+
+        Returns:
+            List[int]: The addresses of the differing words, in order.
+        """
+        changed: List[int] = []
+        first, last = start >> PAGE_SHIFT, (end - 1) >> PAGE_SHIFT
+        for number in sorted(self._resident_numbers() | image.keys()):
+            if not first <= number <= last:
+                continue
+            current = self._readable.get(number, _ZERO_PAGE)
+            target = image.get(number, _ZERO_PAGE)
+            if current is target or current == target:
+                continue
+            base = number << PAGE_SHIFT
+            low, high = max(start - base, 0), min(end - base, PAGE_WORDS)
+            changed.extend(base + index for index in range(low, high) if current[index] != target[index])
+        return changed
+
+    def region_of(self, address: int) -> MemoryRegion:
+        """
+        Return the region containing an address.
+
+        Raises:
+            MemoryFault: If the address is outside every region.
+        """
+        index = bisect_right(self._starts, address) - 1
+        if index < 0 or address not in self._ordered[index]:
+            raise MemoryFault(f"Address {address:#x} is outside memory")
+        return self._ordered[index]
+
+    def resident_report(self) -> List[Tuple[MemoryRegion, int]]:
+        """
+        Return the host memory held for each region.
+
+        A page straddling two regions counts towards both, in proportion to
+        the words it covers in each.
+
+        Returns:
+            List[Tuple[MemoryRegion, int]]: Each region with its resident bytes, in address order.
+        """
+        report = []
+        for region in self._ordered:
+            words: int = 0
+            first = region.start >> PAGE_SHIFT
+            last = (region.end - 1) >> PAGE_SHIFT
+            for number in self._resident_numbers():
+                if first <= number <= last:
+                    low = max(region.start, number << PAGE_SHIFT)
+                    high = min(region.end, (number + 1) << PAGE_SHIFT)
+                    words += high - low
+            report.append((region, words * WORD_BYTES))
+        return report
+
+    @property
+    def resident_bytes(self) -> int:
+        """Host memory held by allocated pages."""
+        return len(self._resident_numbers()) * PAGE_WORDS * WORD_BYTES
+
+    def _resident_numbers(self) -> set:
+        """Numbers of the private and shared pages."""
+        return self._readable.keys()
+
+    def _page(self, address: int) -> array:
+        """Return the private page holding an address, copying or allocating it if needed."""
+        number = address >> PAGE_SHIFT
+        page = self._pages.get(number)
+        if page is None:
+            self.region_of(address)
+            page = self._pages[number] = self._readable[number] = array('Q', self._shared.get(number, _ZERO_PAGE))
+        return page
+
+    def _check_block(self, address: int, count: int) -> None:
+        """Check that a block of words lies inside one region."""
+        region = self.region_of(address)
+        if address + count > region.end:
+            raise MemoryFault(
+                f"Block of {count} words at {address:#x} crosses the end of the {region.name}"
+            )
@@ -0,0 +1,75 @@
+"""Utility module describing the Viso-Fox memory regions, addressed in 64-bit words."""
+
+from typing import Dict, NamedTuple
+
+# Size of one addressable memory word (a ulong)
+WORD_BYTES = 8
+
+# Default configuration from isa.md
+TOTAL_MEMORY_BYTES = 1 << 30           # 1 GB
+INTERRUPT_TABLE_WORDS = 256            # 256 entries x 8 bytes = 2 KB
+GRAPHICS_SEGMENT_WORDS = 19200         # 640 x 480 / 4 pixels x 2 bytes = 76.8 KB
+STACK_SEGMENT_WORDS = (256 * 1024) // WORD_BYTES  # 256 KB
+
+# Graphics Segment scanlines: 320 pixels x 2 bytes per row
+GRAPHICS_ROW_WORDS = 320 * 2 // WORD_BYTES
+
+
+class MemoryRegion(NamedTuple):
+    """A contiguous region of memory, in words."""
+    shorthand: str
+    name: str
+    start: int
+    size: int
+
+    @property
+    def end(self) -> int:
+        """First word address after the region."""
+        return self.start + self.size
+
+    def __contains__(self, address: object) -> bool:
+        return isinstance(address, int) and self.start <= address < self.start + self.size
+
+
+def build_memory_map(total_bytes: int = TOTAL_MEMORY_BYTES) -> Dict[str, MemoryRegion]:
+    """
+    Lay out the memory regions for a given amount of total memory.
+
+    The regions follow isa.md in order: IT, GS, CS, DS and SS, where the code
+    and data segments split the memory left after the fixed-size regions.
+
+    Args:
+        total_bytes (int): Total memory in bytes.
+
+    Returns:
+        Dict[str, MemoryRegion]: Regions keyed by shorthand, in address order.
+    """
+    total_words = total_bytes // WORD_BYTES
+    fixed_words = INTERRUPT_TABLE_WORDS + GRAPHICS_SEGMENT_WORDS + STACK_SEGMENT_WORDS
+    if total_words <= fixed_words:
+        raise ValueError("Total memory is too small for the fixed memory regions.")
+
+    # The stack also takes the odd word left over when the halves are uneven
+    half = (total_words - fixed_words) // 2
+    stack = total_words - INTERRUPT_TABLE_WORDS - GRAPHICS_SEGMENT_WORDS - 2 * half
+
+    regions: Dict[str, MemoryRegion] = {}
+    start: int = 0
+    for shorthand, name, size in (
+        ("IT", "Interrupt Table", INTERRUPT_TABLE_WORDS),
+        ("GS", "Graphics Segment", GRAPHICS_SEGMENT_WORDS),
+        ("CS", "Code Segment", half),
+        ("DS", "Data Segment", half),
+        ("SS", "Stack Segment", stack),
+    ):
+        regions[shorthand] = MemoryRegion(shorthand, name, start, size)
+        start += size
+
+    return regions
+
+
+# Memory map of the default 1 GB configuration
+MEMORY_MAP: Dict[str, MemoryRegion] = build_memory_map()
+
+CODE_SEGMENT_START: int = MEMORY_MAP["CS"].start
+DATA_SEGMENT_START: int = MEMORY_MAP["DS"].start
@@ -0,0 +1,93 @@
+"""Utility module with pre-rendered tables for formatting instructions as text."""
+
+from typing import Callable, Dict, List, Sequence
+
+from register_table import REGISTER_LUT, binary_to_register
+from addressing_table import ADDRESSING_MODE_LUT, code_to_addressing_mode
+from opcode_table import OPCODE_LUT, binary_to_opcode
+
+# Number of addressing mode codes that fit in a 4-bit mode field
+MODE_CODE_COUNT = 0x10
+
+OperandFormatter = Callable[[int], str]
+
+# Pre-rendered "\tmnemonic" prefixes for lines of assembly source
+ASSEMBLY_PREFIX: Dict[int, str] = {opcode: f"\t{name}" for opcode, name in OPCODE_LUT.items()}
+
+
+def mnemonic_text(opcode: int) -> str:
+    """Return the mnemonic for an opcode, only rendering a fallback if unknown."""
+    return OPCODE_LUT.get(opcode) or binary_to_opcode(opcode)
+
+
+def assembly_prefix(opcode: int) -> str:
+    """Return the indented mnemonic that starts a line of assembly source."""
+    return ASSEMBLY_PREFIX.get(opcode) or f"\t{binary_to_opcode(opcode)}"
+
+
+def _register_formatter(template: str) -> OperandFormatter:
+    """Build a formatter that renders a register operand through a template."""
+    rendered = {index: template.format(name) for index, name in REGISTER_LUT.items()}
+
+    def format_register(value: int) -> str:
+        return rendered.get(value) or template.format(binary_to_register(value))
+
+    return format_register
+
+
+def _build_table(by_mode: Dict[str, OperandFormatter], default: OperandFormatter) -> List[OperandFormatter]:
+    """Build a formatter table indexed by addressing mode code."""
+    table = [default] * MODE_CODE_COUNT
+    for code, name in ADDRESSING_MODE_LUT.items():
+        if name in by_mode:
+            table[code] = by_mode[name]
+    return table
+
+
+# Operand formatters for assembly source, indexed by addressing mode code
+ASSEMBLY_OPERAND_FORMATTERS: List[OperandFormatter] = _build_table({
+    "REG": _register_formatter("%{}"),
+    "IND": _register_formatter("[{}]"),
+    "MEM": lambda value: f"[0x{value:X}]",
+    "IMM": lambda value: f"#{value:#x}",
+    "PORT": lambda value: f"0x{value:X}",
+}, lambda value: f"0x{value:X}")
+
+# Operand formatters for the debug view, indexed by addressing mode code
+DEBUG_OPERAND_FORMATTERS: List[OperandFormatter] = _build_table({
+    "REG": _register_formatter("{}"),
+    "IND": _register_formatter("[{}]"),
+    "MEM": lambda value: f"[{value:#x}]",
+    "IMM": lambda value: f"#{value:#x}",
+    "PORT": lambda value: f"PORT_{value}",
+}, lambda value: f"{value:#x}")
+
+# Debug view of all three modes, indexed by mode1 | mode2 << 4 | mode3 << 8
+MODE_TRIPLE_TEXT: List[str] = [
+    f"({code_to_addressing_mode(key & 0xF)}  "
+    f"{code_to_addressing_mode((key >> 4) & 0xF)}  "
+    f"{code_to_addressing_mode(key >> 8)})"
+    for key in range(MODE_CODE_COUNT ** 3)
+]
+
+
+def format_operands(formatters: Sequence[OperandFormatter], modes: Sequence[int],
+                    operands: Sequence[int]) -> str:
+    """
+    Format operands with a mode-indexed formatter table.
+
+    Operands beyond the three encoded modes are formatted as NULL.
+
+    Args:
+        formatters (Sequence[OperandFormatter]): Table indexed by mode code.
+        modes (Sequence[int]): Addressing mode codes for the operands.
+        operands (Sequence[int]): Raw operand values.
+
+    Returns:
+        str: The operands joined by ", ".
+    """
+    mode_count = len(modes)
+    return ", ".join([
+        formatters[modes[j] if j < mode_count else 0](operand)
+        for j, operand in enumerate(operands)
+    ])
@@ -0,0 +1,68 @@
+"""Utility module listing the operand count and addressing modes each instruction accepts."""
+
+from typing import Dict, NamedTuple, Tuple
+
+from addressing_table import REVERSE_ADDRESSING_MODE_LUT
+
+
+def mode_mask(*names: str) -> int:
+    """Return the bitmask of addressing modes (bit n set for mode code n)."""
+    mask = 0
+    for name in names:
+        mask |= 1 << REVERSE_ADDRESSING_MODE_LUT[name]
+    return mask
+
+
+# Common operand types from instruction-table.md
+NONE = 0
+ANY_SOURCE = mode_mask("IMM", "REG", "MEM", "IND")
+WRITABLE = mode_mask("REG", "MEM", "IND")
+REGISTER = mode_mask("REG")
+SHIFT_AMOUNT = mode_mask("IMM", "REG")
+PORT = mode_mask("PORT")
+
+
+class OperandSpec(NamedTuple):
+    """Operands accepted by one instruction."""
+    min_operands: int
+    modes: Tuple[int, ...]  # allowed mode bitmask per operand; the length is the maximum count
+
+
+# Operand rules from instruction-table.md, keyed by mnemonic
+OPERAND_TABLE: Dict[str, OperandSpec] = {
+    "nop": OperandSpec(0, ()),
+    "mov": OperandSpec(2, (ANY_SOURCE, WRITABLE)),
+    "cmp": OperandSpec(2, (ANY_SOURCE, ANY_SOURCE)),
+    "hlt": OperandSpec(0, ()),
+    "jmp": OperandSpec(1, (ANY_SOURCE,)),
+    "jz": OperandSpec(1, (ANY_SOURCE,)),
+    "jnz": OperandSpec(1, (ANY_SOURCE,)),
+    "jl": OperandSpec(1, (ANY_SOURCE,)),
+    "jle": OperandSpec(1, (ANY_SOURCE,)),
+    "jg": OperandSpec(1, (ANY_SOURCE,)),
+    "jge": OperandSpec(1, (ANY_SOURCE,)),
+    "add": OperandSpec(2, (ANY_SOURCE, ANY_SOURCE, REGISTER)),
+    "sub": OperandSpec(2, (ANY_SOURCE, ANY_SOURCE, REGISTER)),
+    "mul": OperandSpec(2, (ANY_SOURCE, ANY_SOURCE, REGISTER)),
+    "div": OperandSpec(2, (ANY_SOURCE, ANY_SOURCE, REGISTER)),
+    "inc": OperandSpec(1, (WRITABLE,)),
+    "dec": OperandSpec(1, (WRITABLE,)),
+    "neg": OperandSpec(1, (WRITABLE,)),
+    "and": OperandSpec(2, (ANY_SOURCE, ANY_SOURCE, WRITABLE)),
+    "or": OperandSpec(2, (ANY_SOURCE, ANY_SOURCE, WRITABLE)),
+    "xor": OperandSpec(2, (ANY_SOURCE, ANY_SOURCE, WRITABLE)),
+    "not": OperandSpec(1, (WRITABLE,)),
+    "shl": OperandSpec(2, (SHIFT_AMOUNT, WRITABLE)),
+    "shr": OperandSpec(2, (SHIFT_AMOUNT, WRITABLE)),
+    "rol": OperandSpec(2, (SHIFT_AMOUNT, WRITABLE)),
+    "ror": OperandSpec(2, (SHIFT_AMOUNT, WRITABLE)),
+    "bswap": OperandSpec(1, (WRITABLE,)),
+    "int": OperandSpec(1, (ANY_SOURCE,)),
+    "iret": OperandSpec(0, ()),
+    "push": OperandSpec(1, (ANY_SOURCE,)),
+    "pop": OperandSpec(1, (WRITABLE,)),
+    "call": OperandSpec(1, (ANY_SOURCE,)),
+    "ret": OperandSpec(0, ()),
+    "in": OperandSpec(2, (PORT, WRITABLE)),
+    "out": OperandSpec(2, (ANY_SOURCE, PORT)),
+}
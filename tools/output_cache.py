@@ -0,0 +1,138 @@
+"""Utility module for caching disassembler output on disk, keyed on ROM content."""
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+from typing import List, Optional, Tuple
+
+# Environment variable overriding the cache directory
+CACHE_DIR_ENV = "VFOX_CACHE_DIR"
+
+# Default cache location and the total size entries may occupy before eviction
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "vfox-disassembler")
+DEFAULT_CACHE_LIMIT_BYTES = 256 * 1024 * 1024
+
+# Bytes hashed per read and the default suffix of cache entries
+HASH_CHUNK_BYTES = 1 << 20
+CACHE_ENTRY_SUFFIX = ".out"
+
+
+def hash_rom(filename: str, version: str, kind: str) -> str:
+    """
+    Hash a ROM file together with the tool version and output kind.
+
+    Args:
+        filename (str): Path of the ROM file.
+        version (str): Version of the tool producing the output.
+        kind (str): Kind of output being cached (e.g. "debug", "disassembly").
+
+    Returns:
+        str: Hex digest identifying the cached output.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{version}\0{kind}\0".encode('utf-8'))
+
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+class OutputCache:
+    """
+    A size-bounded, least-recently-used cache of output files.
+
+    Entries are keyed by hash_rom, so bumping the tool version invalidates
+    every entry; stale entries are then removed by eviction. Eviction only
+    looks at files with the cache's entry suffix, so caches with different
+    suffixes never evict each other's entries. Failures to write the cache
+    are ignored since it is only an optimisation.
+    """
+
+    def __init__(self, version: str, directory: Optional[str] = None,
+                 limit_bytes: int = DEFAULT_CACHE_LIMIT_BYTES, suffix: str = CACHE_ENTRY_SUFFIX) -> None:
+        self.version = version
+        self.directory = directory or os.environ.get(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR
+        self.limit_bytes = limit_bytes
+        self.suffix = suffix
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def key(self, filename: str, kind: str) -> str:
+        """Return the cache key of a ROM file for a kind of output."""
+        return hash_rom(filename, self.version, kind)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Return the path of a cached entry and mark it as recently used, or None on a miss."""
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return path
+
+    def store(self, key: str, source_path: str, move: bool = False, evict: bool = True) -> None:
+        """
+        Store a file as the entry for a key.
+
+        Args:
+            key (str): The cache key.
+            source_path (str): The file holding the output to cache.
+            move (bool): Move the file into the cache instead of copying it.
+            evict (bool): Evict old entries afterwards if over the size limit.
+        """
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+
+            # Fill a temporary name first so readers never see a partial entry
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            os.close(fd)
+            if move:
+                shutil.move(source_path, temp_path)
+            else:
+                shutil.copyfile(source_path, temp_path)
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            return
+
+        if evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """Remove least-recently-used entries until the cache fits its size limit."""
+        entries: List[Tuple[float, int, str]] = []
+        try:
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    if entry.name.endswith(self.suffix):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            return 0
+
+        total = sum(size for _, size, _ in entries)
+        removed: int = 0
+        for _, size, path in sorted(entries):
+            if total <= self.limit_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+
+        return removed
+
+    def summary(self) -> str:
+        """Return the hit and miss counters as a line of text."""
+        return f"Cache: {self.hits} hits, {self.misses} misses"
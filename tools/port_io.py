@@ -0,0 +1,186 @@
+"""Port I/O for the Viso-Fox emulator: console output buffering, scripted input replay and an asyncio console."""
+
+import asyncio
+
+from array import array
+from typing import Callable, List, NamedTuple, Optional
+
+# Console ports: out packs up to four ASCII characters, in takes one
+CONSOLE_OUT_PORT = 0x04
+CONSOLE_IN_PORT = 0x05
+
+# Ports an input script may drive: the four Fox-Pad controllers and console input
+INPUT_PORTS = range(0x00, 0x06)
+
+# Console bytes buffered before they are handed to the sink
+DEFAULT_FLUSH_BYTES = 4096
+
+# Instructions run between two turns of the asyncio event loop
+DEFAULT_SLICE_INSTRUCTIONS = 100_000
+
+# Console output kept for clients attaching late
+CONSOLE_BACKLOG_BYTES = 64 * 1024
+
+
+def _console_characters() -> List[bytes]:
+    """The non-NUL bytes of every 16-bit value, low byte first."""
+    table = [b""] * 0x10000
+    for value in range(1, 0x10000):
+        low, high = value & 0xFF, value >> 8
+        table[value] = bytes(byte for byte in (low, high) if byte)
+    return table
+
+
+# Characters packed in half of a console word, by the 16-bit half; two lookups unpack a word
+CONSOLE_CHARACTERS: List[bytes] = _console_characters()
+
+
+class InputScript(NamedTuple):
+    """Timestamped port writes stored column-wise, sorted by time."""
+    times: array    # 'Q', instruction count at which each write happens
+    ports: array    # 'B'
+    values: array   # 'Q'
+
+
+def read_input_script(filename: str) -> InputScript:
+    """
+    Read an input script: one "<instruction> <port> <value>" per line, '#' starting a comment.
+
+    The value is written to the port once the machine has executed that many
+    instructions. Numbers may be given in any base Python accepts, e.g. 0x10.
+
+    Args:
+        filename (str): The script file.
+
+    Returns:
+        InputScript: The port writes in the order they happen.
+
+    Raises:
+        ValueError: If a line is malformed or names a port outside 0x00-0x05.
+    """
+    events = []
+    with open(filename, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, start=1):
+            fields = line.split('#', 1)[0].split()
+            if not fields:
+                continue
+            try:
+                at, port, value = (int(field, 0) for field in fields)
+            except ValueError:
+                raise ValueError(f"{filename}: line {number}: expected '<instruction> <port> <value>'") from None
+            if port not in INPUT_PORTS:
+                raise ValueError(f"{filename}: line {number}: port {port:#x} is not an input port")
+            events.append((at, port, value))
+    events.sort(key=lambda event: event[0])
+
+    return InputScript(array('Q', [event[0] for event in events]), array('B', [event[1] for event in events]),
+                       array('Q', [event[2] for event in events]))
+
+
+def replay_input(machine: "Machine", script: InputScript, max_instructions: int,
+                 run: Optional[Callable[[int], int]] = None) -> None:
+    """
+    Run a machine, writing each scripted input to its port on time.
+
+    Execution is never interrupted between two writes; the machine runs in
+    one slice up to the next timestamp.
+
+    Args:
+        machine (Machine): The machine to run.
+        script (InputScript): The port writes.
+        max_instructions (int): Instruction count after which the run is stopped.
+        run (Optional[Callable[[int], int]]): Runs the machine for a budget; machine.run by default,
+            or e.g. an event scheduler's run.
+    """
+    run = run or machine.run
+    ports = machine.ports
+    for at, port, value in zip(script.times, script.ports, script.values):
+        if machine.halted or at >= max_instructions:
+            break
+        if at > machine.instructions:
+            run(at - machine.instructions)
+        ports[port] = value
+    if not machine.halted and machine.instructions < max_instructions:
+        run(max_instructions - machine.instructions)
+    machine.flush_console()
+
+
+class ConsoleServer:
+    """
+    Serves a machine's console over TCP from an asyncio event loop.
+
+    The machine runs in slices between turns of the loop, so clients attach
+    and type without blocking execution. Console output is flushed to every
+    attached client after each slice; a client attaching late first gets the
+    last CONSOLE_BACKLOG_BYTES of output. Bytes typed by clients queue up
+    for port 0x05, which hands out one per read.
+    """
+
+    def __init__(self, machine: "Machine", slice_instructions: int = DEFAULT_SLICE_INSTRUCTIONS,
+                 run: Optional[Callable[[int], int]] = None) -> None:
+        self.machine = machine
+        self.slice_instructions = slice_instructions
+        self._run = run or machine.run
+        self._clients: List[asyncio.StreamWriter] = []
+        self._backlog = bytearray()
+
+        machine.console_sink = self._broadcast
+
+    def _broadcast(self, chunk: bytes) -> None:
+        self._backlog += chunk
+        del self._backlog[:-CONSOLE_BACKLOG_BYTES]
+        for client in self._clients:
+            client.write(chunk)
+
+    async def _attach(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        writer.write(bytes(self._backlog))
+        self._clients.append(writer)
+        try:
+            while True:
+                typed = await reader.read(256)
+                if not typed:
+                    break
+                self.machine.console_input += typed
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.remove(writer)
+            writer.close()
+
+    async def serve(self, host: str, port: int, max_instructions: int = -1) -> int:
+        """
+        Run the machine until hlt or a budget is used up, serving its console meanwhile.
+
+        Args:
+            host (str): Interface to listen on.
+            port (int): TCP port to listen on.
+            max_instructions (int): Maximum instructions to execute, or -1 for no limit.
+
+        Returns:
+            int: Number of instructions executed.
+        """
+        machine = self.machine
+        executed: int = 0
+        server = await asyncio.start_server(self._attach, host, port)
+        async with server:
+            while not machine.halted and (max_instructions < 0 or executed < max_instructions):
+                budget = self.slice_instructions
+                if max_instructions >= 0:
+                    budget = min(budget, max_instructions - executed)
+                executed += self._run(budget)
+                machine.flush_console()
+                for client in list(self._clients):
+                    try:
+                        await client.drain()
+                    except ConnectionError:
+                        pass
+                await asyncio.sleep(0)
+
+            # Hang up, letting each client's task see the end of its stream before the loop stops
+            clients = list(self._clients)
+            for client in clients:
+                client.close()
+            for client in clients:
+                await client.wait_closed()
+            await asyncio.sleep(0)
+        return executed
@@ -0,0 +1,350 @@
+"""Sampling profiler for ROM execution: PC histograms, opcode and addressing-mode counts and flamegraph stacks."""
+
+import argparse
+import random
+import sys
+import time
+
+from bisect import bisect_right
+from typing import Callable, Dict, List, NamedTuple, TextIO, Tuple
+
+from opcode_table import OPCODE_LUT, binary_to_opcode, opcode_to_binary
+from operand_format import MODE_TRIPLE_TEXT
+from memory_map import CODE_SEGMENT_START
+from memory import MemoryFault
+from disassembler import ROMImage, decode_columns
+from control_flow import analyse_control_flow
+from emulator import DESIGNATION, PC, EmulatorError, Handler, Machine
+
+# Version of the profiler
+VERSION = "1.0.0"
+
+# Default instructions between PC samples
+DEFAULT_INTERVAL = 1000
+
+# Label of the first instruction, as the disassembler names it
+ENTRY_LABEL = "_start_of_assembly_"
+
+# Deepest shadow call stack kept; calls that never return stop being tracked beyond it
+MAX_STACK_DEPTH = 256
+
+# Opcodes that enter and leave a frame
+CALL_OPCODE = opcode_to_binary("call")
+RET_OPCODE = opcode_to_binary("ret")
+INT_OPCODE = opcode_to_binary("int")
+IRET_OPCODE = opcode_to_binary("iret")
+
+
+class ProfileCounts(NamedTuple):
+    """Estimated executions, scaled from the samples."""
+    opcodes: Dict[str, float]   # mnemonic -> executions, for every opcode in OPCODE_LUT
+    modes: Dict[str, float]     # "(MODE1  MODE2  MODE3)" -> executions
+
+
+def rom_labels(filename: str) -> Dict[int, str]:
+    """
+    Return the labels the disassembler gives a ROM's code, by address.
+
+    Args:
+        filename (str): The ROM file.
+
+    Returns:
+        Dict[int, str]: Address -> label, including the entry label at the start of the code.
+    """
+    with ROMImage(filename) as rom:
+        code_section = rom.code_section
+        columns = decode_columns(code_section)
+        flow = analyse_control_flow(columns.opcode, columns.operand_count, columns.mode1,
+                                    columns.starts, code_section)
+
+    labels = {CODE_SEGMENT_START + offset: name for offset, name in flow.labels.items()}
+    labels.setdefault(CODE_SEGMENT_START, ENTRY_LABEL)
+    return labels
+
+
+class Profiler:
+    """
+    Profile a machine by sampling its PC every few thousand instructions.
+
+    The machine runs in slices of about interval instructions (jittered so
+    loops whose length divides the interval are not always sampled at the
+    same instruction) and the PC is recorded after each slice, so the cost
+    is one extra dispatch per slice. Call, ret, int and iret handlers are
+    wrapped to keep a shadow call stack for collapsed-stack output; only
+    those instructions pay for it. Opcode and addressing-mode counts are
+    estimated from the sampled instructions; an interval of 1 samples every
+    instruction.
+    """
+
+    def __init__(self, machine: Machine, interval: int = DEFAULT_INTERVAL, seed: int = 0) -> None:
+        """
+        Attach to a machine with a ROM loaded.
+
+        Args:
+            machine (Machine): The machine to profile.
+            interval (int): Average instructions between samples.
+            seed (int): Seed of the interval jitter, for repeatable profiles.
+        """
+        self.machine = machine
+        self.interval = max(interval, 1)
+        self.samples: Dict[int, int] = {}
+        self.stack_samples: Dict[Tuple[Tuple[int, ...], int], int] = {}
+        self.stack: List[int] = []
+        self.executed: int = 0
+        self._random = random.Random(seed)
+        self._wrap_frame_handlers()
+
+    def _wrap_frame_handlers(self) -> None:
+        """
+        Wrap the handlers of instructions that enter or leave a frame.
+
+        Predecoded handlers are wrapped now; handlers decoded later, e.g.
+        after a code write invalidated them, are wrapped as they are built.
+        """
+        machine = self.machine
+        read = machine.memory.read
+        for pc, handler in list(machine.handlers.items()):
+            machine.handlers[pc] = self._wrap_handler(pc, read(pc), handler)
+        machine.handler_wrappers.append(self._wrap_handler)
+
+    def _wrap_handler(self, pc: int, instruction: int, handler: Handler) -> Handler:
+        """Wrap a call, int, ret or iret handler to maintain the shadow stack; leave others as they are."""
+        if instruction & 0xF != DESIGNATION:
+            return handler
+        opcode = (instruction >> 4) & 0xFFFF
+        if opcode in (CALL_OPCODE, INT_OPCODE):
+            return self._entering(handler, pc + 1 + ((instruction >> 20) & 0xF))
+        if opcode in (RET_OPCODE, IRET_OPCODE):
+            return self._leaving(handler)
+        return handler
+
+    def _entering(self, handler: Handler, next_pc: int) -> Handler:
+        stack = self.stack
+
+        def enter() -> int:
+            target = handler()
+            # An int with an empty vector falls through without entering a handler
+            if target != next_pc and len(stack) < MAX_STACK_DEPTH:
+                stack.append(target)
+            return target
+        return enter
+
+    def _leaving(self, handler: Handler) -> Handler:
+        stack = self.stack
+
+        def leave() -> int:
+            if stack:
+                stack.pop()
+            return handler()
+        return leave
+
+    def run(self, max_instructions: int = -1) -> int:
+        """
+        Run the machine, sampling its PC.
+
+        Args:
+            max_instructions (int): Maximum instructions to execute, or -1 for no limit.
+
+        Returns:
+            int: Number of instructions executed by this call.
+        """
+        machine = self.machine
+        regs = machine.regs
+        samples = self.samples
+        stack_samples = self.stack_samples
+        stack = self.stack
+        randint = self._random.randint
+        low, high = (self.interval + 1) // 2, self.interval + self.interval // 2
+        budget = max_instructions if max_instructions >= 0 else sys.maxsize
+        executed: int = 0
+
+        while executed < budget and not machine.halted:
+            executed += machine.run(min(randint(low, high), budget - executed))
+            if machine.halted:
+                break
+            pc = regs[PC]
+            samples[pc] = samples.get(pc, 0) + 1
+            key = (tuple(stack), pc)
+            stack_samples[key] = stack_samples.get(key, 0) + 1
+
+        self.executed += executed
+        return executed
+
+    @property
+    def sample_count(self) -> int:
+        return sum(self.samples.values())
+
+    def _weight(self) -> float:
+        """Instructions represented by one sample."""
+        return self.executed / max(self.sample_count, 1)
+
+    def counts(self) -> ProfileCounts:
+        """Estimate how often each opcode and addressing-mode combination executed."""
+        read = self.machine.memory.read
+        weight = self._weight()
+        opcodes: Dict[str, float] = {name: 0.0 for name in OPCODE_LUT.values()}
+        modes: Dict[str, float] = {}
+
+        for pc, count in self.samples.items():
+            instruction = read(pc)
+            name = binary_to_opcode((instruction >> 4) & 0xFFFF)
+            opcodes[name] = opcodes.get(name, 0.0) + count * weight
+            key = MODE_TRIPLE_TEXT[(instruction >> 24) & 0xFFF]
+            modes[key] = modes.get(key, 0.0) + count * weight
+
+        return ProfileCounts(opcodes, modes)
+
+    def flat_profile(self, labels: Dict[int, str]) -> List[Tuple[str, int]]:
+        """
+        Attribute samples to the nearest label at or before each sampled PC.
+
+        Args:
+            labels (Dict[int, str]): Address -> label, e.g. from rom_labels.
+
+        Returns:
+            List[Tuple[str, int]]: (label, samples), most sampled first.
+        """
+        label_of = _label_lookup(labels)
+        totals: Dict[str, int] = {}
+        for pc, count in self.samples.items():
+            label = label_of(pc)
+            totals[label] = totals.get(label, 0) + count
+        return sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+
+    def collapsed_stacks(self, labels: Dict[int, str]) -> List[str]:
+        """
+        Return the samples as collapsed stacks ("frame;frame;leaf count"), for flamegraph tools.
+
+        Args:
+            labels (Dict[int, str]): Address -> label, e.g. from rom_labels.
+
+        Returns:
+            List[str]: One line per distinct stack, sorted.
+        """
+        label_of = _label_lookup(labels)
+        totals: Dict[str, int] = {}
+        for (stack, pc), count in self.stack_samples.items():
+            frames = [ENTRY_LABEL] + [label_of(target) for target in stack]
+            leaf = label_of(pc)
+            if leaf != frames[-1]:
+                frames.append(leaf)
+            key = ";".join(frames)
+            totals[key] = totals.get(key, 0) + count
+        return [f"{key} {count}" for key, count in sorted(totals.items())]
+
+
+def _label_lookup(labels: Dict[int, str]) -> Callable[[int], str]:
+    """Build a function mapping an address to the nearest label at or before it."""
+    addresses = sorted(labels)
+    names = [labels[address] for address in addresses]
+
+    def label_of(pc: int) -> str:
+        index = bisect_right(addresses, pc) - 1
+        return names[index] if index >= 0 else f"{pc:#x}"
+    return label_of
+
+
+def write_flat_profile(profiler: Profiler, labels: Dict[int, str], out: TextIO, top: int = 20) -> None:
+    """Write the flat profile and the opcode and addressing-mode counts."""
+    total = max(profiler.sample_count, 1)
+    out.write("---- Flat Profile ----\n")
+    out.write(f"{'% samples':>10} {'samples':>10}  label\n")
+    for label, count in profiler.flat_profile(labels)[:top]:
+        out.write(f"{100.0 * count / total:>9.2f}% {count:>10,}  {label}\n")
+
+    counts = profiler.counts()
+    executed = max(profiler.executed, 1)
+    for title, table in (("Opcodes", counts.opcodes), ("Addressing Modes", counts.modes)):
+        out.write(f"---- {title} (estimated executions) ----\n")
+        for name, estimate in sorted(table.items(), key=lambda item: (-item[1], item[0])):
+            if estimate:
+                out.write(f"{100.0 * estimate / executed:>9.2f}% {estimate:>14,.0f}  {name}\n")
+
+
+def measure_overhead(rom: str, max_instructions: int, interval: int, repeats: int = 3) -> Tuple[float, float]:
+    """
+    Time a ROM with and without profiling.
+
+    Args:
+        rom (str): The ROM file.
+        max_instructions (int): Instructions to run each time, or -1 to run until hlt.
+        interval (int): Profiling interval.
+        repeats (int): Runs of each kind; the fastest run of each is compared.
+
+    Returns:
+        Tuple[float, float]: Best plain and best profiled time in seconds.
+    """
+    plain, profiled = [], []
+    for _ in range(repeats):
+        for profile, times in ((False, plain), (True, profiled)):
+            machine = Machine()
+            machine.load_rom(rom)
+            profiler = Profiler(machine, interval) if profile else None
+            start = time.perf_counter()
+            if profiler is not None:
+                profiler.run(max_instructions)
+            else:
+                machine.run(max_instructions)
+            times.append(time.perf_counter() - start)
+    return min(plain), min(profiled)
+
+
+def main() -> None:
+    """Profile a ROM from the command line."""
+    parser = argparse.ArgumentParser(description="Profile a VFOX ROM on the Viso-Fox emulator.")
+    parser.add_argument('rom', help="ROM file to run")
+    parser.add_argument('--max-instructions', type=int, default=-1,
+                        help="stop after this many instructions (default: run until hlt)")
+    parser.add_argument('--interval', type=int, default=DEFAULT_INTERVAL,
+                        help=f"average instructions between PC samples (default: {DEFAULT_INTERVAL})")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the sampling jitter")
+    parser.add_argument('--top', type=int, default=20, help="labels shown in the flat profile")
+    parser.add_argument('--collapsed', metavar='FILE', help="write collapsed stacks for flamegraph tools")
+    parser.add_argument('--measure-overhead', action='store_true',
+                        help="also time the ROM without profiling and report the overhead")
+    parser.add_argument('--version', action='version', version=f"profiler version {VERSION}")
+    args = parser.parse_args()
+
+    machine = Machine()
+    try:
+        machine.load_rom(args.rom)
+        labels = rom_labels(args.rom)
+    except FileNotFoundError:
+        print(f"Error: File '{args.rom}' not found.")
+        sys.exit(1)
+    except (ValueError, MemoryFault) as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+
+    profiler = Profiler(machine, args.interval, args.seed)
+    start = time.perf_counter()
+    try:
+        executed = profiler.run(args.max_instructions)
+    except (EmulatorError, MemoryFault) as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+    elapsed = max(time.perf_counter() - start, 1e-9)
+
+    state = "halted" if machine.halted else "stopped"
+    print(f"---- Machine {state} at PC {machine.regs[PC]:#x} ----")
+    print(f"Executed {executed:,} instructions in {elapsed:.3f}s ({executed / elapsed:,.0f} IPS), "
+          f"{profiler.sample_count:,} samples")
+    write_flat_profile(profiler, labels, sys.stdout, args.top)
+
+    if args.collapsed:
+        with open(args.collapsed, 'w', encoding='utf-8') as out:
+            out.writelines(line + "\n" for line in profiler.collapsed_stacks(labels))
+        print(f"Collapsed stacks written to '{args.collapsed}'.")
+
+    if args.measure_overhead:
+        try:
+            plain, profiled = measure_overhead(args.rom, args.max_instructions, args.interval)
+        except (EmulatorError, MemoryFault) as error:
+            print(f"Error: {error}")
+            sys.exit(1)
+        print(f"Overhead: {100.0 * (profiled - plain) / max(plain, 1e-9):+.1f}% "
+              f"({plain:.3f}s plain, {profiled:.3f}s profiled)")
+
+
+if __name__ == "__main__":
+    main()
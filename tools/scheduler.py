@@ -0,0 +1,178 @@
+"""Event scheduler for the Viso-Fox emulator: timer and host interrupts on a min-heap of deadlines."""
+
+import sys
+
+from heapq import heapify, heappop, heappush
+from typing import List, NamedTuple, Optional, Tuple
+
+from register_table import register_to_binary
+
+# Programmable time-based interrupt port, read-only to programs; its value is the timer period in instructions, 0 for off
+TIMER_PORT = 0x0F
+
+# Interrupt number reserved for the timer
+TIMER_INTERRUPT = 0x00
+
+# Number of IVT entries
+INTERRUPT_COUNT = 256
+
+# Register indexes
+PC = register_to_binary("PC")
+SP = register_to_binary("SP")
+IVT = register_to_binary("IVT")
+
+# A pending event: deadline in executed instructions, sequence number, interrupt number, is the timer
+Event = Tuple[int, int, int, bool]
+
+
+class SchedulerState(NamedTuple):
+    """The scheduler's part of a machine snapshot."""
+    events: List[Event]
+    sequence: int
+    timer_frame: Optional[int]   # SP of the timer handler's interrupt frame while it runs
+
+
+class EventScheduler:
+    """
+    Runs a machine in slices that end at the next event deadline.
+
+    Deadlines are counted in executed instructions (the machine has no
+    cycle model), so the execution loop runs uninterrupted between events
+    and no instruction pays for an interrupt check. Due events enter their
+    handler through the IVT exactly as `int` does, pushing R0-R7, FLAGS and
+    PC.
+
+    The timer fires TIMER_INTERRUPT every period given by port 0x0F. The
+    port is read-only to programs, so only set_timer changes the period. As
+    isa.md requires, it is rescheduled only once its handler has returned
+    with `iret`, so a handler running longer than the period never piles up
+    timer interrupts. An empty IVT entry is a NOP, after which the timer is
+    rescheduled at once.
+
+    With translated blocks, a deadline can be overshot by less than one
+    pass through a block: looping blocks keep to the instructions left
+    before the deadline. Runs must go through run() for the timer to be
+    rescheduled.
+    """
+
+    def __init__(self, machine: "Machine") -> None:
+        self.machine = machine
+        self._events: List[Event] = []
+        self._sequence: int = 0
+        self._timer_frame: Optional[int] = None
+        self._timer_returned: bool = False
+
+        machine.events = self
+        machine.interrupt_return_listeners.append(self._interrupt_returned)
+
+    @property
+    def timer_period(self) -> int:
+        """Timer period in instructions, read from port 0x0F."""
+        return self.machine.ports[TIMER_PORT]
+
+    def set_timer(self, period: int) -> None:
+        """
+        Program the timer and (re)arm it, dropping any pending timer event.
+
+        Args:
+            period (int): Instructions between the end of a timer handler and the next timer interrupt; 0 stops it.
+        """
+        self.machine.ports[TIMER_PORT] = period
+        self._events[:] = [event for event in self._events if not event[3]]
+        heapify(self._events)
+        self._timer_frame = None
+        self._arm_timer()
+
+    def raise_interrupt(self, number: int, delay: int = 0) -> None:
+        """
+        Schedule a host interrupt.
+
+        Args:
+            number (int): The interrupt number, an IVT index.
+            delay (int): Instructions to run before it is dispatched.
+
+        Raises:
+            ValueError: If the interrupt number is outside the IVT.
+        """
+        if not 0 <= number < INTERRUPT_COUNT:
+            raise ValueError(f"Interrupt {number:#x} is outside the IVT")
+        self._push(self.machine.instructions + max(delay, 0), number, False)
+
+    def next_deadline(self) -> Optional[int]:
+        """Instruction count at which the next event is due, or None."""
+        return self._events[0][0] if self._events else None
+
+    def run(self, max_instructions: int = -1) -> int:
+        """
+        Execute until hlt or until an instruction budget is used up, dispatching due events.
+
+        Args:
+            max_instructions (int): Maximum instructions to execute, or -1 for no limit.
+
+        Returns:
+            int: Number of instructions executed by this call.
+        """
+        machine = self.machine
+        events = self._events
+        budget = max_instructions if max_instructions >= 0 else sys.maxsize
+        executed: int = 0
+
+        while executed < budget and not machine.halted:
+            if events and events[0][0] <= machine.instructions:
+                self._dispatch(heappop(events))
+                continue
+            remaining = budget - executed
+            if events:
+                remaining = min(remaining, events[0][0] - machine.instructions)
+            executed += machine.run(remaining)
+
+            # The run stops at the iret leaving the timer handler, so the period counts from there
+            if self._timer_returned:
+                self._timer_returned = False
+                self._arm_timer()
+
+        return executed
+
+    def state(self) -> SchedulerState:
+        """Capture the pending events and timer state, for a machine snapshot."""
+        return SchedulerState(list(self._events), self._sequence, self._timer_frame)
+
+    def restore(self, state: SchedulerState) -> None:
+        """Put back the pending events and timer state of a machine snapshot."""
+        self._events[:] = state.events
+        self._sequence = state.sequence
+        self._timer_frame = state.timer_frame
+
+    def _push(self, deadline: int, number: int, timer: bool) -> None:
+        heappush(self._events, (deadline, self._sequence, number, timer))
+        self._sequence += 1
+
+    def _arm_timer(self) -> None:
+        """Schedule the next timer interrupt one period from now, if the timer is on."""
+        period = self.timer_period
+        if period > 0:
+            self._push(self.machine.instructions + period, TIMER_INTERRUPT, True)
+
+    def _dispatch(self, event: Event) -> None:
+        """Enter the handler of a due event through the IVT."""
+        _, _, number, timer = event
+        machine = self.machine
+        regs = machine.regs
+
+        # An empty IVT entry is a NOP, so a timer without a handler is rearmed at once
+        if machine.memory.read(regs[IVT] + number) == 0:
+            if timer:
+                self._arm_timer()
+            return
+
+        regs[PC] = machine.interrupt(number, regs[PC])
+        if timer:
+            self._timer_frame = regs[SP]
+
+    def _interrupt_returned(self, frame: int) -> bool:
+        """Stop the run when `iret` leaves the timer handler's frame, so run() can reschedule the timer."""
+        if frame != self._timer_frame:
+            return False
+        self._timer_frame = None
+        self._timer_returned = True
+        return True
@@ -0,0 +1,426 @@
+"""Record ROM execution as a compact binary instruction trace and convert traces to text."""
+
+import argparse
+import struct
+import sys
+import time
+import zlib
+
+from array import array
+from typing import BinaryIO, Dict, Iterator, NamedTuple, Optional, Sequence, TextIO, Tuple
+
+from opcode_table import binary_to_opcode, opcode_to_binary
+from register_table import binary_to_register
+from addressing_table import code_to_addressing_mode
+from operand_format import DEBUG_OPERAND_FORMATTERS, format_operands
+from memory import MemoryFault
+from emulator import PC, REGISTER_COUNT, EmulatorError, Machine, MachineHalt
+
+# Version of the trace tool
+VERSION = "1.0.0"
+
+# Trace header: magic, version and compression codec
+TRACE_MAGIC = b"VFXT"
+TRACE_VERSION = 1
+TRACE_HEADER = struct.Struct("<4sIB")
+
+# Block record: number of trace records and payload length
+BLOCK_HEADER = struct.Struct("<II")
+
+# Compression codecs
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODECS = {"none": CODEC_NONE, "zlib": CODEC_ZLIB, "zstd": CODEC_ZSTD}
+
+# Words buffered before a block is flushed
+DEFAULT_BLOCK_WORDS = 1 << 20
+
+# A record is PC, instruction word and changed-register mask, then up to
+# 15 operands and one value per changed register (PC changes are implied)
+RECORD_FIXED_WORDS = 3
+MAX_RECORD_WORDS = RECORD_FIXED_WORDS + 0xF + REGISTER_COUNT
+
+# Instruction word fields
+OPERAND_COUNT_SHIFT = 20
+OPCODE_SHIFT = 4
+FIELD_MASK = 0xF
+OPCODE_MASK = 0xFFFF
+
+
+class TraceRecord(NamedTuple):
+    """One executed instruction."""
+    pc: int
+    instruction: int
+    operands: Tuple[int, ...]
+    changes: Tuple[Tuple[int, int], ...]   # (register index, new value), excluding PC
+
+
+def _zstd():
+    """Return the zstandard module, which is only needed for zstd traces."""
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("zstd compression needs the 'zstandard' package.") from None
+    return zstandard
+
+
+class TraceRecorder:
+    """
+    Buffer trace records in a preallocated array and flush them in large blocks.
+
+    Records have a variable length and are appended to one array('Q') that
+    is allocated once. When the next record might not fit, the filled part
+    is written (optionally compressed) as one block and the buffer is
+    reused from the start.
+    """
+
+    def __init__(self, filename: str, compression: str = "zlib", block_words: int = DEFAULT_BLOCK_WORDS,
+                 pc_range: Optional[range] = None, opcodes: Optional[Sequence[int]] = None) -> None:
+        """
+        Open a trace file.
+
+        Args:
+            filename (str): The trace file to write.
+            compression (str): "none", "zlib" or "zstd".
+            block_words (int): Words buffered per block.
+            pc_range (Optional[range]): Only record instructions at these addresses.
+            opcodes (Optional[Sequence[int]]): Only record instructions with these opcodes.
+
+        Raises:
+            ValueError: If the compression codec is unknown or unavailable.
+        """
+        if compression not in CODECS:
+            raise ValueError(f"Unknown trace compression '{compression}'.")
+        self.codec = CODECS[compression]
+        self._compress = {
+            CODEC_NONE: bytes,
+            CODEC_ZLIB: lambda data: zlib.compress(data, 1),
+            CODEC_ZSTD: lambda data: _zstd().ZstdCompressor(level=3).compress(data),
+        }[self.codec]
+        if self.codec == CODEC_ZSTD:
+            _zstd()
+
+        self.pc_range = pc_range
+        self.opcodes = frozenset(opcodes) if opcodes is not None else None
+        self.buffer = array('Q', bytes(max(block_words, MAX_RECORD_WORDS) * 8))
+        self.limit = len(self.buffer) - MAX_RECORD_WORDS
+        self.position: int = 0
+        self.count: int = 0
+        self.records: int = 0
+        self.bytes_written: int = TRACE_HEADER.size
+
+        self._file: BinaryIO = open(filename, 'wb')
+        self._file.write(TRACE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, self.codec))
+
+    def wants(self, pc: int, instruction: int) -> bool:
+        """Return whether the filters select an instruction."""
+        if self.pc_range is not None and pc not in self.pc_range:
+            return False
+        return self.opcodes is None or (instruction >> OPCODE_SHIFT) & OPCODE_MASK in self.opcodes
+
+    def record(self, pc: int, instruction: int, operands: Sequence[int],
+               before: Sequence[int], after: Sequence[int]) -> None:
+        """
+        Append one record.
+
+        Args:
+            pc (int): The instruction's address.
+            instruction (int): The instruction word.
+            operands (Sequence[int]): The operand words.
+            before (Sequence[int]): Registers before the instruction ran.
+            after (Sequence[int]): Registers after it ran.
+        """
+        buffer = self.buffer
+        position = self.position
+        buffer[position] = pc
+        buffer[position + 1] = instruction
+        position += RECORD_FIXED_WORDS
+        for operand in operands:
+            buffer[position] = operand
+            position += 1
+
+        mask: int = 0
+        if before != after:
+            for index in range(REGISTER_COUNT):
+                if index != PC and before[index] != after[index]:
+                    mask |= 1 << index
+                    buffer[position] = after[index]
+                    position += 1
+        buffer[self.position + 2] = mask
+
+        self.position = position
+        self.count += 1
+        if position > self.limit:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered records as one block."""
+        if not self.count:
+            return
+        words = self.buffer[:self.position]
+        if sys.byteorder == 'big':
+            words.byteswap()
+        payload = self._compress(words.tobytes())
+        self._file.write(BLOCK_HEADER.pack(self.count, len(payload)))
+        self._file.write(payload)
+
+        self.bytes_written += BLOCK_HEADER.size + len(payload)
+        self.records += self.count
+        self.position = 0
+        self.count = 0
+
+    def close(self) -> None:
+        self.flush()
+        self._file.close()
+
+    def __enter__(self) -> "TraceRecorder":
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.close()
+
+
+def run_traced(machine: Machine, recorder: TraceRecorder, max_instructions: int = -1) -> int:
+    """
+    Execute one instruction at a time, recording each selected instruction.
+
+    Handlers installed by a block translator would run several instructions
+    per call, so trace a machine without one.
+
+    Args:
+        machine (Machine): A machine with a ROM loaded.
+        recorder (TraceRecorder): Where to record.
+        max_instructions (int): Maximum instructions to execute, or -1 for no limit.
+
+    Returns:
+        int: Number of instructions executed.
+    """
+    if machine.halted:
+        return 0
+
+    regs = machine.regs
+    handlers = machine.handlers
+    read = machine.memory.read
+    record = recorder.record
+    wants = recorder.wants
+    filtered = recorder.pc_range is not None or recorder.opcodes is not None
+    pc = regs[PC]
+    budget = max_instructions if max_instructions >= 0 else sys.maxsize
+    executed: int = 0
+
+    try:
+        while executed < budget:
+            instruction = read(pc)
+            before = regs[:]
+            try:
+                next_pc = handlers[pc]()
+            except MachineHalt as halt:
+                next_pc = halt.pc
+                machine.halted = True
+            executed += 1
+
+            if not filtered or wants(pc, instruction):
+                count = (instruction >> OPERAND_COUNT_SHIFT) & FIELD_MASK
+                record(pc, instruction, [read(pc + 1 + index) for index in range(count)], before, regs)
+            pc = next_pc
+            if machine.halted:
+                break
+    finally:
+        regs[PC] = pc
+        machine.instructions += executed
+
+    return executed
+
+
+def read_trace(filename: str) -> Iterator[TraceRecord]:
+    """
+    Read the records of a trace file.
+
+    Args:
+        filename (str): The trace file.
+
+    Yields:
+        TraceRecord: Each recorded instruction, in execution order.
+
+    Raises:
+        ValueError: If the file is not a trace this version reads.
+    """
+    with open(filename, 'rb') as f:
+        header = f.read(TRACE_HEADER.size)
+        if len(header) < TRACE_HEADER.size:
+            raise ValueError("Invalid trace file.")
+        magic, version, codec = TRACE_HEADER.unpack(header)
+        if magic != TRACE_MAGIC or version != TRACE_VERSION or codec not in CODECS.values():
+            raise ValueError("Invalid trace file.")
+
+        decompress = {
+            CODEC_NONE: bytes,
+            CODEC_ZLIB: zlib.decompress,
+            CODEC_ZSTD: lambda data: _zstd().ZstdDecompressor().decompress(data),
+        }[codec]
+
+        while True:
+            block = f.read(BLOCK_HEADER.size)
+            if len(block) < BLOCK_HEADER.size:
+                break
+            count, length = BLOCK_HEADER.unpack(block)
+            words = array('Q')
+            words.frombytes(decompress(f.read(length)))
+            if sys.byteorder == 'big':
+                words.byteswap()
+
+            position = 0
+            for _ in range(count):
+                pc, instruction, mask = words[position:position + RECORD_FIXED_WORDS]
+                position += RECORD_FIXED_WORDS
+                operand_count = (instruction >> OPERAND_COUNT_SHIFT) & FIELD_MASK
+                operands = tuple(words[position:position + operand_count])
+                position += operand_count
+
+                changes = []
+                index = 0
+                while mask:
+                    if mask & 1:
+                        changes.append((index, words[position]))
+                        position += 1
+                    mask >>= 1
+                    index += 1
+                yield TraceRecord(pc, instruction, operands, tuple(changes))
+
+
+def trace_lines(records: Iterator[TraceRecord]) -> Iterator[str]:
+    """
+    Format trace records as disassembly text, one line per record.
+
+    Args:
+        records (Iterator[TraceRecord]): Records from read_trace.
+
+    Yields:
+        str: "pc: mnemonic (modes) operands ; register=value ..." lines.
+    """
+    prefixes: Dict[int, Tuple[str, Tuple[int, int, int]]] = {}
+    for pc, instruction, operands, changes in records:
+        # Instruction words repeat, so render their mnemonic and modes once
+        cached = prefixes.get(instruction)
+        if cached is None:
+            modes = tuple((instruction >> shift) & FIELD_MASK for shift in (24, 28, 32))
+            text = (f"{binary_to_opcode((instruction >> OPCODE_SHIFT) & OPCODE_MASK)} "
+                    f"({' '.join(code_to_addressing_mode(mode) for mode in modes)})")
+            cached = prefixes[instruction] = (text, modes)
+        text, modes = cached
+
+        line = f"{pc:#x}: {text}"
+        if operands:
+            line += f" {format_operands(DEBUG_OPERAND_FORMATTERS, modes, operands)}"
+        if changes:
+            line += " ; " + " ".join(f"{binary_to_register(index)}={value:#x}" for index, value in changes)
+        yield line + "\n"
+
+
+def write_trace_text(filename: str, out: TextIO, limit: int = -1) -> int:
+    """
+    Convert a binary trace to text.
+
+    Args:
+        filename (str): The trace file.
+        out (TextIO): Where to write the text.
+        limit (int): Maximum records to convert, or -1 for all.
+
+    Returns:
+        int: Number of records converted.
+    """
+    written: int = 0
+    for line in trace_lines(read_trace(filename)):
+        if written == limit:
+            break
+        out.write(line)
+        written += 1
+    return written
+
+
+def parse_pc_range(text: str) -> range:
+    """Parse "start:end" (end exclusive, hex or decimal) into a range of addresses."""
+    start, _, end = text.partition(':')
+    try:
+        return range(int(start, 0), int(end, 0))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid PC range '{text}', expected start:end") from None
+
+
+def main() -> None:
+    """Record a trace of a ROM, or convert a trace to text."""
+    parser = argparse.ArgumentParser(description="Record and view Viso-Fox instruction traces.")
+    parser.add_argument('--version', action='version', version=f"tracer version {VERSION}")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = commands.add_parser('record', help="run a ROM and record a trace")
+    record_parser.add_argument('rom', help="ROM file to run")
+    record_parser.add_argument('trace', help="trace file to write")
+    record_parser.add_argument('--max-instructions', type=int, default=-1,
+                               help="stop after this many instructions (default: run until hlt)")
+    record_parser.add_argument('--compression', choices=sorted(CODECS), default="zlib",
+                               help="block compression (default: zlib)")
+    record_parser.add_argument('--pc-range', type=parse_pc_range,
+                               help="only record instructions in start:end (end exclusive)")
+    record_parser.add_argument('--opcode', action='append', dest='opcodes', metavar='MNEMONIC',
+                               help="only record this instruction (repeatable)")
+
+    text_parser = commands.add_parser('text', help="convert a trace to disassembly text")
+    text_parser.add_argument('trace', help="trace file to read")
+    text_parser.add_argument('output', nargs='?', help="text file to write (default: stdout)")
+    text_parser.add_argument('--limit', type=int, default=-1, help="convert at most this many records")
+    args = parser.parse_args()
+
+    if args.command == 'text':
+        try:
+            if args.output:
+                with open(args.output, 'w', encoding='utf-8') as out:
+                    written = write_trace_text(args.trace, out, args.limit)
+                print(f"Wrote {written:,} records to {args.output}")
+            else:
+                write_trace_text(args.trace, sys.stdout, args.limit)
+        except FileNotFoundError:
+            print(f"Error: File '{args.trace}' not found.")
+            sys.exit(1)
+        except (ValueError, zlib.error) as error:
+            print(f"Error: {error}")
+            sys.exit(1)
+        return
+
+    opcodes = None
+    if args.opcodes:
+        opcodes = [opcode_to_binary(name) for name in args.opcodes]
+        if -1 in opcodes:
+            print(f"Error: Unknown instruction '{args.opcodes[opcodes.index(-1)]}'.")
+            sys.exit(1)
+
+    machine = Machine()
+    try:
+        machine.load_rom(args.rom)
+        recorder = TraceRecorder(args.trace, args.compression, pc_range=args.pc_range, opcodes=opcodes)
+    except FileNotFoundError:
+        print(f"Error: File '{args.rom}' not found.")
+        sys.exit(1)
+    except (ValueError, MemoryFault) as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    try:
+        with recorder:
+            executed = run_traced(machine, recorder, args.max_instructions)
+    except (EmulatorError, MemoryFault) as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+    elapsed = max(time.perf_counter() - start, 1e-9)
+
+    state = "halted" if machine.halted else "stopped"
+    print(f"---- Machine {state} at PC {machine.regs[PC]:#x} ----")
+    print(f"Executed {executed:,} instructions in {elapsed:.3f}s ({executed / elapsed:,.0f} IPS)")
+    print(f"Recorded {recorder.records:,} records in {recorder.bytes_written:,} bytes "
+          f"({recorder.bytes_written / max(recorder.records, 1):.1f} bytes/record)")
+
+
+if __name__ == "__main__":
+    main()
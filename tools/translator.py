@@ -0,0 +1,754 @@
+"""Translation tier for the Viso-Fox emulator: hot basic blocks become compiled Python functions."""
+
+import argparse
+import sys
+import time
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from opcode_table import MNEMONIC_LUT, binary_to_opcode
+from control_flow import BLOCK_END_OPCODES
+from memory_map import GRAPHICS_ROW_WORDS
+from emulator import (
+    BINARY_OPERATIONS, CONDITION_FLAGS, DESIGNATION, FLAGS, FLAG_C, FLAG_O, FLAG_S, FLAG_Z, IMM, IND,
+    JUMP_TABLES, KEEP_FLAGS, MEM, PC, PORT, PORT_COUNT, REG, REGISTER_COUNT, SHIFT_OPERATIONS, SIGN_BIT,
+    UNARY_OPERATIONS, WORD_MASK, EmulatorError, Handler, Machine, MachineHalt, destination_operand,
+)
+from memory import MemoryFault
+from scheduler import TIMER_PORT
+
+# Version of the translation tier
+VERSION = "1.0.0"
+
+# Executions of a block leader before its block is translated
+DEFAULT_THRESHOLD = 16
+
+# Longest block translated into one function, in instructions
+MAX_BLOCK_INSTRUCTIONS = 64
+
+# Iterations a block branching back to its own start runs per dispatch
+DEFAULT_LOOP_ITERATIONS = 256
+
+# Code words grouped per invalidation bucket
+INVALIDATION_SHIFT = 4
+
+# Instructions that set Z, S, O and C from scratch, making earlier flag results dead
+FLAG_DEFINING = frozenset(
+    MNEMONIC_LUT[name] for name in (
+        "cmp", "add", "sub", "mul", "div", "and", "or", "xor", "shl", "shr", "rol", "ror",
+    )
+)
+
+# Instructions that read flags computed earlier in the block
+FLAG_READING = frozenset(
+    MNEMONIC_LUT[name] for name in ("jz", "jnz", "jl", "jle", "jg", "jge", "int")
+)
+
+# Instructions that cannot fault when none of their operands is in memory or a port
+REGISTER_SAFE = frozenset(
+    MNEMONIC_LUT[name] for name in (
+        "nop", "mov", "cmp", "add", "sub", "mul", "and", "or", "xor", "inc", "dec", "neg", "not", "bswap",
+        "shl", "shr", "rol", "ror", "jmp", "jz", "jnz", "jl", "jle", "jg", "jge",
+    )
+)
+
+# Parameters of the generated factory, bound as closure cells of each block
+FACTORY_PARAMETERS = (
+    "regs", "read", "write", "write_memory", "read_port", "write_port", "push", "pop",
+    "interrupt", "return_from_interrupt", "Halt", "count", "limit", "operations", "dirty_rows", "code_version",
+    "fault_pc",
+)
+
+
+class UntranslatableInstruction(Exception):
+    """Raised while generating a block for an instruction left to the interpreter."""
+
+
+class DecodedInstruction:
+    """One instruction read from memory for translation."""
+
+    __slots__ = ("pc", "valid", "opcode", "name", "modes", "operands", "next_pc")
+
+    def __init__(self, pc: int, instruction: int, operands: List[int]) -> None:
+        self.pc = pc
+        self.valid = instruction & 0xF == DESIGNATION
+        self.opcode = (instruction >> 4) & 0xFFFF if self.valid else 0
+        self.name = binary_to_opcode(self.opcode) if self.valid else "nop"
+        self.modes = [(instruction >> shift) & 0xF for shift in (24, 28, 32)]
+        self.operands = operands
+        self.next_pc = pc + 1 + len(operands)
+
+
+class BlockTranslator:
+    """
+    Promote hot basic blocks of a Machine to compiled Python functions.
+
+    Every block leader gets a counting stub in the machine's handler table.
+    Once a leader has run `threshold` times, its block (up to and including
+    the next control-flow instruction) is generated as Python source, compiled
+    with compile() and installed as the handler for the leader's PC, so the
+    machine's dispatch loop runs the whole block in one call.
+
+    A block whose last instruction branches back to its own start loops inside
+    its function for up to `loop_iterations` iterations per dispatch, leaving
+    early if it writes to the code segment or once another iteration would
+    exceed the machine's block_limit, so a run budget or an event deadline
+    is overshot by less than one pass through the block.
+
+    Writes to the code segment invalidate the blocks covering the written word;
+    their leaders go back to counting stubs and are translated again once hot.
+    A block that writes its own code finishes its current run unchanged.
+    """
+
+    def __init__(self, machine: Machine, threshold: int = DEFAULT_THRESHOLD,
+                 loop_iterations: int = DEFAULT_LOOP_ITERATIONS) -> None:
+        self.machine = machine
+        self.threshold = max(threshold, 1)
+        self.loop_iterations = max(loop_iterations, 1)
+
+        # Translated blocks: start PC -> (handler, end PC)
+        self.blocks: Dict[int, Tuple[Handler, int]] = {}
+        self._buckets: Dict[int, Set[int]] = {}
+
+        self.translated: int = 0
+        self.invalidated: int = 0
+
+        machine.code_listeners.append(self.invalidate)
+        machine.dispatch_instructions = max(machine.dispatch_instructions,
+                                            self.loop_iterations * MAX_BLOCK_INSTRUCTIONS)
+
+    # ---- Promotion ----
+
+    def install(self, leaders: Optional[List[int]] = None) -> None:
+        """
+        Put counting stubs on block leaders.
+
+        Args:
+            leaders (Optional[List[int]]): Leader PCs, by default those of the loaded ROM.
+        """
+        for pc in self.machine.block_leaders if leaders is None else leaders:
+            self._install_stub(pc)
+
+    def _install_stub(self, pc: int) -> None:
+        """Wrap the handler at a PC in a stub that promotes its block when hot."""
+        handlers = self.machine.handlers
+        handler = handlers[pc]
+        remaining = self.threshold
+
+        def stub() -> int:
+            nonlocal remaining
+            remaining -= 1
+            if remaining == 0:
+                self.promote(pc, handler)
+            return handler()
+
+        handlers[pc] = stub
+
+    def promote(self, pc: int, fallback: Handler) -> None:
+        """Translate the block at a PC, keeping the interpreter's handler if it cannot be translated."""
+        translation = self.translate(pc)
+        if translation is None:
+            self.machine.handlers[pc] = fallback
+            return
+
+        block, end = translation
+        self.machine.handlers[pc] = block
+        self.blocks[pc] = (block, end)
+        for bucket in range(pc >> INVALIDATION_SHIFT, ((end - 1) >> INVALIDATION_SHIFT) + 1):
+            self._buckets.setdefault(bucket, set()).add(pc)
+        self.translated += 1
+
+    def invalidate(self, address: int) -> None:
+        """Drop every translated block containing a written code word and restore its stub."""
+        starts = self._buckets.get(address >> INVALIDATION_SHIFT)
+        if not starts:
+            return
+
+        for start in [start for start in starts if start <= address < self.blocks[start][1]]:
+            _, end = self.blocks.pop(start)
+            for bucket in range(start >> INVALIDATION_SHIFT, ((end - 1) >> INVALIDATION_SHIFT) + 1):
+                self._buckets[bucket].discard(start)
+            self.machine.handlers.pop(start, None)
+            self._install_stub(start)
+            self.invalidated += 1
+
+    # ---- Translation ----
+
+    def translate(self, pc: int) -> Optional[Tuple[Handler, int]]:
+        """
+        Generate and compile the block starting at a PC.
+
+        Args:
+            pc (int): The block's first instruction.
+
+        Returns:
+            Optional[Tuple[Handler, int]]: The block function and the PC after
+            its last instruction, or None if its first instruction cannot be translated.
+        """
+        instructions = self._read_block(pc)
+        body: List[str] = []
+        translated: List[DecodedInstruction] = []
+        live = self._flags_live(instructions)
+        terminated = False
+
+        for instruction, flags_live in zip(instructions, live):
+            try:
+                lines = self._generate(instruction, flags_live)
+            except UntranslatableInstruction:
+                break
+            if self._may_fault(instruction):
+                # Index of the instruction running, for the count if it raises
+                body.append(f"at = {len(translated)}")
+            body.extend(lines)
+            translated.append(instruction)
+            if instruction.valid and instruction.opcode in BLOCK_END_OPCODES:
+                terminated = True
+                break
+
+        if not translated:
+            return None
+
+        end = translated[-1].next_pc
+        if terminated and self._is_self_loop(translated):
+            body = self._loop_body(translated, body)
+        else:
+            if not terminated:
+                # Hand over to the interpreter at the first instruction left out
+                body.append(f"return {end}")
+
+            # Count every instruction after the first, which the dispatch loop counts,
+            # taking back those after an instruction that raises
+            after_first = len(translated) - 1
+            if after_first:
+                body = [f"count[0] += {after_first}"] + _guarded(body, f"count[0] -= {after_first} - at", translated)
+
+        name = f"block_{pc:x}"
+        source = "\n".join(
+            [f"def make({', '.join(FACTORY_PARAMETERS)}):", f"    def {name}():"]
+            + [f"        {line}" for line in body]
+            + [f"    return {name}"]
+        )
+        namespace: Dict[str, object] = {}
+        exec(compile(source, f"<{name}>", "exec"), namespace)
+        return namespace["make"](*self._factory_arguments()), end
+
+    def _is_self_loop(self, translated: List[DecodedInstruction]) -> bool:
+        """Whether a block ends with a direct jump back to its start."""
+        last = translated[-1]
+        return last.name in JUMP_TABLES and last.modes[0] == IMM and last.operands[0] == translated[0].pc
+
+    def _loop_body(self, translated: List[DecodedInstruction], body: List[str]) -> List[str]:
+        """Wrap a self-looping block's lines in a bounded loop."""
+        last = translated[-1]
+        count = len(translated)
+        condition = JUMP_TABLES[last.name]
+
+        writes_code = any("write_memory(" in line for line in body)
+
+        # Everything but the final branch, which becomes the loop test
+        # At least one iteration, and no more than the dispatcher's limit allows
+        lines = [f"for i in range(1, min(max(limit[0] // {count}, 1), {self.loop_iterations}) + 1):"]
+        lines += [f"    {line}" for line in body[:-1]]
+        if condition is not None:
+            lines += [
+                f"    if not {condition!r}[regs[{FLAGS}] & {CONDITION_FLAGS}]:",
+                f"        count[0] += i * {count} - 1",
+                f"        return {last.next_pc}",
+            ]
+        if writes_code:
+            # Code was written: go back to the dispatcher, which may have a new block here
+            lines += [
+                "    if code_version[0] != version:",
+                f"        count[0] += i * {count} - 1",
+                f"        return {translated[0].pc}",
+            ]
+        # An instruction that raises counts the iterations before it and the instructions it follows
+        lines = _guarded(lines, f"count[0] += (i - 1) * {count} + at", translated)
+        if writes_code:
+            lines.insert(0, "version = code_version[0]")
+        lines += [
+            f"count[0] += i * {count} - 1",
+            f"return {translated[0].pc}",
+        ]
+        return lines
+
+    def _read_block(self, pc: int) -> List[DecodedInstruction]:
+        """Read the instructions of a block from memory, ending at a control-flow instruction."""
+        read = self.machine.memory.read
+        instructions: List[DecodedInstruction] = []
+        while len(instructions) < MAX_BLOCK_INSTRUCTIONS:
+            try:
+                word = read(pc)
+                count = (word >> 20) & 0xF if word & 0xF == DESIGNATION else 0
+                operands = [read(pc + 1 + i) for i in range(count)]
+            except MemoryFault:
+                break
+
+            instruction = DecodedInstruction(pc, word, operands)
+            instructions.append(instruction)
+            if instruction.valid and instruction.opcode in BLOCK_END_OPCODES:
+                break
+            pc = instruction.next_pc
+        return instructions
+
+    def _flags_live(self, instructions: List[DecodedInstruction]) -> List[bool]:
+        """
+        Work out, for each instruction, whether the flags it sets are read later.
+
+        Flags are live at the end of the block. An instruction setting all four
+        arithmetic flags kills them; a flag-reading instruction or any operand
+        naming the FLAGS register makes them live. Instructions that only set
+        some flags pass liveness through unchanged.
+        """
+        live: List[bool] = [True] * len(instructions)
+        flags_live = True
+        for index in range(len(instructions) - 1, -1, -1):
+            live[index] = flags_live
+            instruction = instructions[index]
+            if not instruction.valid:
+                continue
+            if instruction.opcode in FLAG_READING or _names_flags(instruction):
+                flags_live = True
+            elif instruction.opcode in FLAG_DEFINING:
+                flags_live = False
+        return live
+
+    @staticmethod
+    def _may_fault(instruction: DecodedInstruction) -> bool:
+        """Whether an instruction can raise: a memory or port operand, or an opcode that may."""
+        if not instruction.valid:
+            return False
+        if instruction.opcode not in REGISTER_SAFE:
+            return True
+        return any(mode not in (IMM, REG) for mode in instruction.modes[:len(instruction.operands)])
+
+    def _factory_arguments(self) -> List[object]:
+        machine = self.machine
+        memory = machine.memory
+        return [
+            machine.regs, memory.read, memory.write, machine.write_memory,
+            machine.read_port, machine.write_port, machine.push, machine.pop,
+            machine.interrupt, machine.return_from_interrupt, MachineHalt,
+            machine.block_instructions, machine.block_limit,
+            {**BINARY_OPERATIONS, **UNARY_OPERATIONS, **SHIFT_OPERATIONS},
+            machine.dirty_rows, machine.code_version, machine.fault_pc,
+        ]
+
+    # ---- Code generation ----
+
+    def _generate(self, instruction: DecodedInstruction, flags_live: bool) -> List[str]:
+        """Return the Python lines for one instruction."""
+        if not instruction.valid:
+            return []
+
+        name = instruction.name
+        generate = _GENERATORS.get(name)
+        if generate is None:
+            raise UntranslatableInstruction(name)
+
+        # Writing PC through a register operand is left to the interpreter
+        dest = destination_operand(name, len(instruction.operands))
+        if dest is not None and instruction.modes[dest] == REG and instruction.operands[dest] == PC:
+            raise UntranslatableInstruction(name)
+
+        return generate(self, instruction, flags_live)
+
+    def _source(self, instruction: DecodedInstruction, index: int) -> str:
+        """Return an expression reading a source operand."""
+        _require(instruction, index + 1)
+        mode = instruction.modes[index]
+        value = instruction.operands[index]
+
+        if mode == IMM:
+            return str(value)
+        if mode == REG:
+            _check_register(value)
+            return str(instruction.next_pc) if value == PC else f"regs[{value}]"
+        if mode == MEM:
+            return f"read({value})"
+        if mode == IND:
+            _check_register(value)
+            return f"read(regs[{value}])"
+        raise UntranslatableInstruction(f"mode {mode:#x}")
+
+    def _store(self, instruction: DecodedInstruction, index: int, expression: str) -> str:
+        """Return a statement storing an expression into a destination operand."""
+        _require(instruction, index + 1)
+        mode = instruction.modes[index]
+        value = instruction.operands[index]
+
+        if mode == REG:
+            _check_register(value)
+            return f"regs[{value}] = {expression}"
+        if mode == MEM:
+            graphics = self.machine.graphics_range
+            if value in graphics:
+                row = (value - graphics.start) // GRAPHICS_ROW_WORDS
+                return f"write({value}, {expression}); dirty_rows[{row}] = 1"
+            if value in self.machine.code_range:
+                return f"write_memory({value}, {expression})"
+            return f"write({value}, {expression})"
+        if mode == IND:
+            _check_register(value)
+            return f"write_memory(regs[{value}], {expression})"
+        raise UntranslatableInstruction(f"mode {mode:#x}")
+
+    def _port(self, instruction: DecodedInstruction, index: int) -> int:
+        _require(instruction, index + 1)
+        if instruction.modes[index] != PORT or instruction.operands[index] >= PORT_COUNT:
+            raise UntranslatableInstruction("port operand")
+        return instruction.operands[index]
+
+
+# ---- Generators by instruction ----
+
+def _generate_nop(_translator: BlockTranslator, _instruction: DecodedInstruction, _live: bool) -> List[str]:
+    return []
+
+
+def _generate_hlt(_translator: BlockTranslator, instruction: DecodedInstruction, _live: bool) -> List[str]:
+    return [f"raise Halt({instruction.next_pc})"]
+
+
+def _generate_mov(translator: BlockTranslator, instruction: DecodedInstruction, _live: bool) -> List[str]:
+    return [translator._store(instruction, 1, translator._source(instruction, 0))]
+
+
+def _generate_cmp(translator: BlockTranslator, instruction: DecodedInstruction, live: bool) -> List[str]:
+    if not live:
+        # Still read the operands, which may fault
+        return [f"{translator._source(instruction, 0)}, {translator._source(instruction, 1)}"]
+    return [
+        f"a = {translator._source(instruction, 0)}",
+        f"b = {translator._source(instruction, 1)}",
+        f"r = (a - b) & {WORD_MASK}",
+        *_sub_flag_lines(),
+    ]
+
+
+def _generate_add(translator: BlockTranslator, instruction: DecodedInstruction, live: bool) -> List[str]:
+    dest = 2 if len(instruction.operands) > 2 else 0
+    first = translator._source(instruction, 0)
+    second = translator._source(instruction, 1)
+    if not live:
+        return [translator._store(instruction, dest, f"({first} + {second}) & {WORD_MASK}")]
+    return [
+        f"a = {first}",
+        f"b = {second}",
+        "t = a + b",
+        f"r = t & {WORD_MASK}",
+        *_result_flag_lines(),
+        f"if t > {WORD_MASK}: f |= {FLAG_C}",
+        f"if (a ^ r) & (b ^ r) & {SIGN_BIT}: f |= {FLAG_O}",
+        f"regs[{FLAGS}] = f",
+        translator._store(instruction, dest, "r"),
+    ]
+
+
+def _generate_sub(translator: BlockTranslator, instruction: DecodedInstruction, live: bool) -> List[str]:
+    dest = 2 if len(instruction.operands) > 2 else 0
+    first = translator._source(instruction, 0)
+    second = translator._source(instruction, 1)
+    if not live:
+        return [translator._store(instruction, dest, f"({first} - {second}) & {WORD_MASK}")]
+    return [
+        f"a = {first}",
+        f"b = {second}",
+        f"r = (a - b) & {WORD_MASK}",
+        *_sub_flag_lines(),
+        translator._store(instruction, dest, "r"),
+    ]
+
+
+def _generate_logic(translator: BlockTranslator, instruction: DecodedInstruction, live: bool) -> List[str]:
+    dest = 2 if len(instruction.operands) > 2 else 0
+    operator = {"and": "&", "or": "|", "xor": "^"}[instruction.name]
+    expression = f"{translator._source(instruction, 0)} {operator} {translator._source(instruction, 1)}"
+    if not live:
+        return [translator._store(instruction, dest, expression)]
+    return [
+        f"r = {expression}",
+        *_result_flag_lines(),
+        f"regs[{FLAGS}] = f",
+        translator._store(instruction, dest, "r"),
+    ]
+
+
+def _generate_binary(translator: BlockTranslator, instruction: DecodedInstruction, live: bool) -> List[str]:
+    """mul and div, and the shifts: call the interpreter's operation."""
+    if instruction.name in SHIFT_OPERATIONS:
+        # value, dest: shift dest by value
+        arguments = f"{translator._source(instruction, 1)}, {translator._source(instruction, 0)}"
+        dest = 1
+    else:
+        arguments = f"{translator._source(instruction, 0)}, {translator._source(instruction, 1)}"
+        dest = 2 if len(instruction.operands) > 2 else 0
+
+    lines = [f"r, f = operations[{instruction.name!r}]({arguments})"]
+    if live:
+        lines.append(f"regs[{FLAGS}] = (regs[{FLAGS}] & {KEEP_FLAGS}) | f")
+    lines.append(translator._store(instruction, dest, "r"))
+    return lines
+
+
+def _generate_unary(translator: BlockTranslator, instruction: DecodedInstruction, live: bool) -> List[str]:
+    value = translator._source(instruction, 0)
+    if not live:
+        expression = _UNARY_EXPRESSIONS.get(instruction.name)
+        if expression is not None:
+            return [translator._store(instruction, 0, expression.format(value))]
+    return [
+        f"r, regs[{FLAGS}] = operations[{instruction.name!r}]({value}, regs[{FLAGS}])",
+        translator._store(instruction, 0, "r"),
+    ]
+
+
+def _generate_jump(translator: BlockTranslator, instruction: DecodedInstruction, _live: bool) -> List[str]:
+    target = translator._source(instruction, 0)
+    if instruction.name == "jmp":
+        return [f"return {target}"]
+    # The condition table is inlined as a constant tuple
+    return [
+        f"return {target} if {JUMP_TABLES[instruction.name]!r}[regs[{FLAGS}] & {CONDITION_FLAGS}] "
+        f"else {instruction.next_pc}"
+    ]
+
+
+def _generate_call(translator: BlockTranslator, instruction: DecodedInstruction, _live: bool) -> List[str]:
+    return [
+        f"t = {translator._source(instruction, 0)}",
+        f"push({instruction.next_pc})",
+        "return t",
+    ]
+
+
+def _generate_ret(_translator: BlockTranslator, _instruction: DecodedInstruction, _live: bool) -> List[str]:
+    return ["return pop()"]
+
+
+def _generate_int(translator: BlockTranslator, instruction: DecodedInstruction, _live: bool) -> List[str]:
+    return [f"return interrupt({translator._source(instruction, 0)}, {instruction.next_pc})"]
+
+
+def _generate_iret(_translator: BlockTranslator, _instruction: DecodedInstruction, _live: bool) -> List[str]:
+    return ["return return_from_interrupt()"]
+
+
+def _generate_push(translator: BlockTranslator, instruction: DecodedInstruction, _live: bool) -> List[str]:
+    return [f"push({translator._source(instruction, 0)})"]
+
+
+def _generate_pop(translator: BlockTranslator, instruction: DecodedInstruction, _live: bool) -> List[str]:
+    return [translator._store(instruction, 0, "pop()")]
+
+
+def _generate_in(translator: BlockTranslator, instruction: DecodedInstruction, _live: bool) -> List[str]:
+    port = translator._port(instruction, 0)
+    return [translator._store(instruction, 1, f"read_port({port})")]
+
+
+def _generate_out(translator: BlockTranslator, instruction: DecodedInstruction, _live: bool) -> List[str]:
+    value = translator._source(instruction, 0)
+    port = translator._port(instruction, 1)
+    if port == TIMER_PORT:
+        # Read-only to programs, as in the interpreter; the source is still read, which may fault
+        return [value]
+    return [f"write_port({port}, {value})"]
+
+
+def _guarded(lines: List[str], correction: str, translated: List[DecodedInstruction]) -> List[str]:
+    """
+    Wrap block lines that can raise so the count correction runs first, and
+    the PC of the instruction that raised is left in fault_pc. Lines that
+    cannot raise are left as they are.
+    """
+    if not any(line.lstrip().startswith("at = ") for line in lines):
+        return lines
+    pcs = tuple(instruction.pc for instruction in translated)
+    return ["try:"] + [f"    {line}" for line in lines] + [
+        "except Exception:",
+        f"    {correction}",
+        f"    fault_pc[0] = {pcs!r}[at]",
+        "    raise",
+    ]
+
+
+def _result_flag_lines() -> List[str]:
+    """Lines starting f from the kept FLAGS bits plus the Z and S flags of r."""
+    return [
+        f"f = regs[{FLAGS}] & {KEEP_FLAGS}",
+        f"if r == 0: f |= {FLAG_Z}",
+        f"elif r & {SIGN_BIT}: f |= {FLAG_S}",
+    ]
+
+
+def _sub_flag_lines() -> List[str]:
+    """Lines setting FLAGS for r = a - b."""
+    return [
+        *_result_flag_lines(),
+        f"if a < b: f |= {FLAG_C}",
+        f"if (a ^ b) & (a ^ r) & {SIGN_BIT}: f |= {FLAG_O}",
+        f"regs[{FLAGS}] = f",
+    ]
+
+
+def _require(instruction: DecodedInstruction, count: int) -> None:
+    if len(instruction.operands) < count:
+        raise UntranslatableInstruction("missing operand")
+
+
+def _check_register(index: int) -> None:
+    if index >= REGISTER_COUNT:
+        raise UntranslatableInstruction(f"register {index:#x}")
+
+
+def _names_flags(instruction: DecodedInstruction) -> bool:
+    """Whether any operand is the FLAGS register, directly or as a pointer."""
+    return any(mode in (REG, IND) and operand == FLAGS
+               for mode, operand in zip(instruction.modes, instruction.operands))
+
+
+# Results of unary operations whose flags are dead
+_UNARY_EXPRESSIONS: Dict[str, str] = {
+    "inc": f"({{}} + 1) & {WORD_MASK}",
+    "dec": f"({{}} - 1) & {WORD_MASK}",
+    "neg": f"-{{}} & {WORD_MASK}",
+    "not": f"~{{}} & {WORD_MASK}",
+}
+
+_GENERATORS = {
+    "nop": _generate_nop,
+    "hlt": _generate_hlt,
+    "mov": _generate_mov,
+    "cmp": _generate_cmp,
+    "add": _generate_add,
+    "sub": _generate_sub,
+    "and": _generate_logic,
+    "or": _generate_logic,
+    "xor": _generate_logic,
+    "mul": _generate_binary,
+    "div": _generate_binary,
+    "shl": _generate_binary,
+    "shr": _generate_binary,
+    "rol": _generate_binary,
+    "ror": _generate_binary,
+    "inc": _generate_unary,
+    "dec": _generate_unary,
+    "neg": _generate_unary,
+    "not": _generate_unary,
+    "bswap": _generate_unary,
+    "jmp": _generate_jump,
+    "jz": _generate_jump,
+    "jnz": _generate_jump,
+    "jl": _generate_jump,
+    "jle": _generate_jump,
+    "jg": _generate_jump,
+    "jge": _generate_jump,
+    "call": _generate_call,
+    "ret": _generate_ret,
+    "int": _generate_int,
+    "iret": _generate_iret,
+    "push": _generate_push,
+    "pop": _generate_pop,
+    "in": _generate_in,
+    "out": _generate_out,
+}
+
+
+def run_machine(rom: str, max_instructions: int, threshold: Optional[int],
+                loop_iterations: int = DEFAULT_LOOP_ITERATIONS,
+                slice_instructions: int = -1) -> Tuple[Machine, Optional[BlockTranslator], int, float]:
+    """
+    Boot a ROM and run it, with or without the translation tier.
+
+    Args:
+        rom (str): ROM file to run.
+        max_instructions (int): Instruction budget, or -1 for no limit.
+        threshold (Optional[int]): Promotion threshold, or None for the plain interpreter.
+        loop_iterations (int): Iterations of a self-looping block per dispatch.
+        slice_instructions (int): Budget of each Machine.run call, as a frontend
+            pacing the machine would use, or -1 to run in a single call.
+
+    Returns:
+        Tuple[Machine, Optional[BlockTranslator], int, float]: The machine, its
+        translator, the instructions executed and the seconds taken.
+    """
+    machine = Machine()
+    machine.load_rom(rom)
+    translator = None
+    if threshold is not None:
+        translator = BlockTranslator(machine, threshold, loop_iterations)
+        translator.install()
+
+    start = time.perf_counter()
+    if slice_instructions > 0:
+        executed = 0
+        while not machine.halted and (max_instructions < 0 or executed < max_instructions):
+            budget = slice_instructions
+            if max_instructions >= 0:
+                budget = min(budget, max_instructions - executed)
+            executed += machine.run(budget)
+    else:
+        executed = machine.run(max_instructions)
+    return machine, translator, executed, max(time.perf_counter() - start, 1e-9)
+
+
+def main() -> None:
+    """Run a ROM with block translation and report the speedup over the plain interpreter."""
+    parser = argparse.ArgumentParser(
+        description="Run a VFOX ROM with basic-block translation and compare it to the interpreter."
+    )
+    parser.add_argument('rom', help="ROM file to run")
+    parser.add_argument('--max-instructions', type=int, default=-1,
+                        help="stop after about this many instructions (default: run until hlt)")
+    parser.add_argument('--threshold', type=int, default=DEFAULT_THRESHOLD,
+                        help=f"executions before a block is translated (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument('--loop-iterations', type=int, default=DEFAULT_LOOP_ITERATIONS,
+                        help="iterations of a self-looping block per dispatch "
+                             f"(default: {DEFAULT_LOOP_ITERATIONS})")
+    parser.add_argument('--slice', type=int, default=-1,
+                        help="run in calls of at most this many instructions, to report bounded-budget speed "
+                             "(default: a single call)")
+    parser.add_argument('--no-compare', action='store_true',
+                        help="skip the plain interpreter run")
+    parser.add_argument('--version', action='version', version=f"translator version {VERSION}")
+    args = parser.parse_args()
+
+    runs: List[Tuple[str, Optional[int]]] = [("Translated", args.threshold)]
+    if not args.no_compare:
+        runs.insert(0, ("Interpreter", None))
+
+    results = []
+    for label, threshold in runs:
+        try:
+            machine, translator, executed, elapsed = run_machine(
+                args.rom, args.max_instructions, threshold, args.loop_iterations, args.slice)
+        except FileNotFoundError:
+            print(f"Error: File '{args.rom}' not found.")
+            sys.exit(1)
+        except (ValueError, EmulatorError, MemoryFault) as error:
+            print(f"Error: {error}")
+            sys.exit(1)
+        results.append((label, executed, elapsed))
+
+    sys.stdout.write(machine.console.decode('ascii', errors='replace'))
+    if machine.console:
+        sys.stdout.write("\n")
+
+    print("---- Translation Summary ----")
+    if args.slice > 0:
+        print(f"Slices:       {args.slice:,} instructions per run")
+    for label, executed, elapsed in results:
+        print(f"{label + ':':<13} {executed:,} instructions in {elapsed:.3f}s "
+              f"({executed / elapsed:,.0f} IPS)")
+
+    print(f"Blocks translated: {translator.translated:,} (invalidated {translator.invalidated:,})")
+
+    if len(results) == 2:
+        (_, interpreted, interpreted_time), (_, translated, translated_time) = results
+        speedup = (translated / translated_time) / (interpreted / interpreted_time)
+        print(f"Speedup: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""Utility module for checking instruction words against the operand rules of instruction-table.md."""
+
+import re
+import sys
+
+from array import array
+from itertools import accumulate
+from typing import List, NamedTuple, Tuple
+
+from addressing_table import code_to_addressing_mode
+from opcode_table import OPCODE_LUT
+from operand_table import OPERAND_TABLE, OperandSpec
+from memory_map import CODE_SEGMENT_START
+
+# Valid instruction designation
+DESIGNATION = 0xF
+
+# Most operands an instruction word can describe
+MODE_FIELDS = 3
+
+# Byte tables: the low and high nibble of a byte, and each nibble moved to the other half
+LOW_NIBBLE = bytes(byte & 0xF for byte in range(256))
+HIGH_NIBBLE = bytes(byte >> 4 for byte in range(256))
+LOW_TO_HIGH = bytes((byte & 0xF) << 4 for byte in range(256))
+PLUS_ONE = bytes(min(byte + 1, 255) for byte in range(256))
+
+# Byte tables: 1 for a byte other than the designation, 1 for opcode class 0
+BAD_DESIGNATION = bytes(int(byte != DESIGNATION) for byte in range(256))
+UNKNOWN_CLASS = bytes([1]) + bytes(255)
+
+# Per operand position, 0x10 for an operand count that includes the position
+OPERAND_PRESENT = tuple(bytes(0x10 if count > position else 0 for count in range(256))
+                        for position in range(MODE_FIELDS))
+
+# Opcodes numbered as classes: class n is OPCODE_CLASSES[n - 1], class 0 any unknown opcode
+OPCODE_CLASSES: Tuple[int, ...] = tuple(OPCODE_LUT)
+
+# Operand rules per opcode class
+CLASS_SPECS: Tuple[OperandSpec, ...] = (OperandSpec(0, ()),) + tuple(
+    OPERAND_TABLE[OPCODE_LUT[opcode]] for opcode in OPCODE_CLASSES
+)
+
+# Mnemonic and accepted operand count of each opcode class, for messages
+CLASS_NAMES: Tuple[str, ...] = ("",) + tuple(OPCODE_LUT[opcode] for opcode in OPCODE_CLASSES)
+CLASS_COUNT_TEXT: Tuple[str, ...] = tuple(
+    str(spec.min_operands) if spec.min_operands == len(spec.modes) else f"{spec.min_operands}-{len(spec.modes)}"
+    for spec in CLASS_SPECS
+)
+
+# Per operand position, the modes each opcode class accepts there, for messages
+ALLOWED_TEXT: Tuple[Tuple[str, ...], ...] = tuple(
+    tuple(", ".join(code_to_addressing_mode(mode) for mode in range(16)
+                    if position < len(spec.modes) and spec.modes[position] >> mode & 1)
+          for spec in CLASS_SPECS)
+    for position in range(MODE_FIELDS)
+)
+
+# Violation codes of the mode check
+MODE_NOT_ALLOWED = 1
+MODE_WITHOUT_OPERAND = 2
+
+
+class Violation(NamedTuple):
+    """A rule an instruction breaks."""
+    index: int    # instruction index in the code section
+    pc: int
+    message: str
+
+
+def _mode_tables() -> Tuple[List[bytes], bytes]:
+    """
+    Build the lookup tables of the mode check.
+
+    An operand position is checked by a byte key: rule << 5 | present << 4 | mode,
+    where the rule numbers the allowed-mode bitmask of the opcode at that
+    position. Rule 0 skips the check, for unknown opcodes and operands beyond
+    the maximum count, which the other checks report.
+
+    Returns:
+        Tuple[List[bytes], bytes]: Per position, the translate table of opcode class to rule << 5;
+        and the translate table of key to violation code.
+    """
+    masks = sorted({mask for spec in CLASS_SPECS for mask in spec.modes})
+    rules = {mask: number for number, mask in enumerate(masks, start=1)}
+    if len(rules) >= 8:
+        raise ValueError("Too many distinct operand rules for a byte key.")
+
+    class_rules = []
+    for position in range(MODE_FIELDS):
+        table = bytearray(256)
+        for opcode_class, spec in enumerate(CLASS_SPECS):
+            if opcode_class and position < len(spec.modes):
+                table[opcode_class] = rules[spec.modes[position]] << 5
+        class_rules.append(bytes(table))
+
+    violations = bytearray(256)
+    for key in range(256):
+        rule, present, mode = key >> 5, (key >> 4) & 1, key & 0xF
+        if not present:
+            violations[key] = MODE_WITHOUT_OPERAND if mode else 0
+        elif 0 < rule <= len(masks) and not masks[rule - 1] >> mode & 1:
+            violations[key] = MODE_NOT_ALLOWED
+    return class_rules, bytes(violations)
+
+
+def _count_tables() -> Tuple[bytes, bytes]:
+    """
+    Build the lookup tables of the operand count check, keyed by range << 4 | count.
+
+    Returns:
+        Tuple[bytes, bytes]: The translate table of opcode class to its numbered
+        (min, max) range << 4, range 0 skipping the check; and of key to 1 for a wrong count.
+    """
+    ranges = sorted({(spec.min_operands, len(spec.modes)) for spec in CLASS_SPECS[1:]})
+    numbers = {bounds: number for number, bounds in enumerate(ranges, start=1)}
+    if len(numbers) >= 16:
+        raise ValueError("Too many distinct operand count ranges for a byte key.")
+
+    class_ranges = bytearray(256)
+    for opcode_class, spec in enumerate(CLASS_SPECS[1:], start=1):
+        class_ranges[opcode_class] = numbers[(spec.min_operands, len(spec.modes))] << 4
+
+    violations = bytearray(256)
+    for key in range(256):
+        number, count = key >> 4, key & 0xF
+        if 0 < number <= len(ranges) and not ranges[number - 1][0] <= count <= ranges[number - 1][1]:
+            violations[key] = 1
+    return bytes(class_ranges), bytes(violations)
+
+
+def _opcode_class_table() -> bytes:
+    """The class of every 16-bit opcode."""
+    table = bytearray(0x10000)
+    for opcode_class, opcode in enumerate(OPCODE_CLASSES, start=1):
+        table[opcode] = opcode_class
+    return bytes(table)
+
+
+# Opcode -> opcode class
+OPCODE_CLASS = _opcode_class_table()
+
+# Position -> opcode class -> mode rule << 5, and mode key -> violation code
+MODE_CLASS_RULES, MODE_VIOLATIONS = _mode_tables()
+
+# Opcode class -> count range << 4, and count key -> violation
+COUNT_CLASS_RANGES, COUNT_VIOLATIONS = _count_tables()
+
+
+def _or(length: int, *columns: bytes) -> bytes:
+    """Bitwise OR of byte columns of the same length."""
+    result: int = 0
+    for column in columns:
+        result |= int.from_bytes(column, 'little')
+    return result.to_bytes(length, 'little')
+
+
+def _flagged(column: bytes) -> List[int]:
+    """Indexes of the nonzero bytes of a column."""
+    return [match.start() for match in re.finditer(rb"[^\x00]", column)]
+
+
+def validate_instruction_words(words: array, base: int = CODE_SEGMENT_START) -> List[Violation]:
+    """
+    Check every instruction word of a program at once.
+
+    Each field of the instruction words becomes a byte column, cut from the
+    raw words with strided slices and nibble translate tables. Opcodes map
+    to a class byte through OPCODE_CLASS, and every check is then a byte
+    translate of a key column built from bitwise ORs of the field columns,
+    so only instructions that break a rule are looked at one by one.
+
+    Args:
+        words (array): 'Q', the instruction words, as find_instruction_words returns them.
+        base (int): Address of the first instruction, for the reported PCs.
+
+    Returns:
+        List[Violation]: Every violation, ordered by instruction.
+    """
+    count_of_words = len(words)
+    if not count_of_words:
+        return []
+
+    little_endian = words
+    if sys.byteorder == 'big':
+        little_endian = array('Q', words)
+        little_endian.byteswap()
+    raw = little_endian.tobytes()
+    byte = [raw[offset::8] for offset in range(8)]
+
+    designation = byte[0].translate(LOW_NIBBLE)
+    operand_count = byte[2].translate(HIGH_NIBBLE)
+    modes = (byte[3].translate(LOW_NIBBLE), byte[3].translate(HIGH_NIBBLE), byte[4].translate(LOW_NIBBLE))
+    reserved = _or(count_of_words, byte[4].translate(HIGH_NIBBLE), byte[5], byte[6], byte[7])
+
+    # Opcode bits 4-19 as 16-bit lanes, then their class
+    lanes = bytearray(2 * count_of_words)
+    low_lane, high_lane = (0, 1) if sys.byteorder == 'little' else (1, 0)
+    lanes[low_lane::2] = _or(count_of_words, byte[0].translate(HIGH_NIBBLE), byte[1].translate(LOW_TO_HIGH))
+    lanes[high_lane::2] = _or(count_of_words, byte[1].translate(HIGH_NIBBLE), byte[2].translate(LOW_TO_HIGH))
+    opcode_class = bytes(map(OPCODE_CLASS.__getitem__, memoryview(lanes).cast('H')))
+
+    # (index, message) per violation, check by check; a stable sort orders them by instruction
+    found: List[Tuple[int, str]] = []
+
+    found += [(index, f"missing 0x{DESIGNATION:X} designation (found 0x{designation[index]:X})")
+              for index in _flagged(designation.translate(BAD_DESIGNATION))]
+
+    found += [(index, f"unknown opcode 0x{(words[index] >> 4) & 0xFFFF:04X}")
+              for index in _flagged(opcode_class.translate(UNKNOWN_CLASS))]
+
+    count_keys = _or(count_of_words, opcode_class.translate(COUNT_CLASS_RANGES), operand_count)
+    found += [(index, f"{CLASS_NAMES[opcode_class[index]]} takes {CLASS_COUNT_TEXT[opcode_class[index]]} "
+                      f"operands, found {operand_count[index]}")
+              for index in _flagged(count_keys.translate(COUNT_VIOLATIONS))]
+
+    for position in range(MODE_FIELDS):
+        present = operand_count.translate(OPERAND_PRESENT[position])
+        keys = _or(count_of_words, opcode_class.translate(MODE_CLASS_RULES[position]), present, modes[position])
+        codes = keys.translate(MODE_VIOLATIONS)
+        mode_column, allowed = modes[position], ALLOWED_TEXT[position]
+        found += [(index, f"mode {position + 1} is {code_to_addressing_mode(mode_column[index])} "
+                          f"but the instruction has {operand_count[index]} operands")
+                  if codes[index] == MODE_WITHOUT_OPERAND else
+                  (index, f"{CLASS_NAMES[opcode_class[index]]} operand {position + 1} cannot be "
+                          f"{code_to_addressing_mode(mode_column[index])} (allowed: {allowed[opcode_class[index]]})")
+                  for index in _flagged(codes)]
+
+    found += [(index, f"reserved bits 36-63 are 0x{words[index] >> 36:X}") for index in _flagged(reserved)]
+
+    if not found:
+        return []
+    found.sort(key=lambda violation: violation[0])
+
+    # PCs of the flagged instructions, from the words each instruction occupies
+    starts = array('Q', accumulate(operand_count.translate(PLUS_ONE), initial=0))
+    return [Violation(index, base + starts[index], message) for index, message in found]